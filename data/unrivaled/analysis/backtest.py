@@ -0,0 +1,351 @@
+import argparse
+import csv
+import json
+import sys
+import time
+import numpy as np
+from analysis.freshness import DEGRADED_SOURCES
+from database.local_store import to_doc_id
+
+# Backtests confidence levels against what actually happened. Historical prop lines
+# (PrizePicks snapshots like unr_bets.json), box-score outcomes (csv/sql tables/game_stats.csv)
+# and stored analyses (a CSV export or the Firestore {stat}_latest docs) are loaded into column arrays and joined by
+# sorted-key lookups; hit rates, calibration, ROI and the breakdowns are array operations.
+# A "model" is any array of 0-100 confidence levels aligned with the props (NaN = no pick),
+# so stored analyses and candidate models are scored the same way.
+#
+# Run from data/unrivaled:
+#   python -m analysis.backtest --lines unr_bets.json snapshots/*.json --model prior_average
+
+# Box-score columns summed for each supported stat type
+STAT_COLUMNS = {
+    "Points": ("pts",),
+    "Rebounds": ("reb",),
+    "Assists": ("ast",),
+    "Pts+Rebs+Asts": ("pts", "reb", "ast"),
+}
+# The bands the final evaluation prompt defines: extreme under, moderate under, moderate over, extreme over
+CONFIDENCE_EDGES = np.array([26, 51, 76])
+CONFIDENCE_LABELS = np.array(["0-25", "26-50", "51-75", "76-100"])
+CALIBRATION_BINS = 10
+DEFAULT_ODDS = -110
+# A stored analysis is for one prop: this player, stat type and game
+ANALYSIS_KEYS = ("player", "stat_type", "game_date")
+
+
+def _join_keys(*columns):
+    keys = columns[0].astype(str)
+    for column in columns[1:]:
+        keys = np.char.add(np.char.add(keys, "|"), column.astype(str))
+    return keys
+
+
+def _lookup(sorted_keys, keys):
+    """Positions of `keys` in `sorted_keys` and whether each was found."""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=int), np.zeros(len(keys), dtype=bool)
+    index = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return index, sorted_keys[index] == keys
+
+
+def load_lines(paths, odds_type="standard"):
+    """
+    Prop lines from PrizePicks projection snapshots. A prop seen in several snapshots
+    keeps the line from the most recently updated one. Only `odds_type` lines are kept,
+    since demon/goblin lines pay differently.
+
+    Returns:
+        dict: Column arrays player, stat_type, line, game_date, opponent.
+    """
+    latest = {}
+    for path in paths:
+        with open(path, "r") as f:
+            snapshot = json.load(f)
+        players = {item["id"]: item["attributes"] for item in snapshot.get("included", []) if item["type"] == "new_player"}
+        for projection in snapshot.get("data", []):
+            attributes = projection["attributes"]
+            if attributes.get("odds_type", "standard") != odds_type or attributes.get("line_score") is None:
+                continue
+            player = players.get(projection["relationships"]["new_player"]["data"]["id"], {})
+            name = player.get("display_name") or player.get("name")
+            if not name or not attributes.get("start_time"):
+                continue
+            # start_time carries the local offset, so its date is the box score's game_date
+            key = (to_doc_id(name), attributes["stat_display_name"], attributes["start_time"][:10])
+            updated_at = attributes.get("updated_at") or ""
+            if key not in latest or updated_at >= latest[key][0]:
+                latest[key] = (updated_at, float(attributes["line_score"]), attributes.get("description", ""))
+
+    keys = list(latest)
+    return {
+        "player": np.array([key[0] for key in keys], dtype=str),
+        "stat_type": np.array([key[1] for key in keys], dtype=str),
+        "game_date": np.array([key[2] for key in keys], dtype=str),
+        "line": np.array([latest[key][1] for key in keys], dtype=float),
+        "opponent": np.array([latest[key][2] for key in keys], dtype=str),
+    }
+
+
+def load_outcomes(path):
+    """
+    Box scores from game_stats.csv, sorted by player then date.
+
+    Returns:
+        dict: Column arrays key ("player|date"), player, game_date, min, pts, reb, ast.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    player = np.array([to_doc_id(row["player_name"]) for row in rows], dtype=str)
+    game_date = np.array([row["game_date"] for row in rows], dtype=str)
+    keys = _join_keys(player, game_date)
+    order = np.argsort(keys, kind="stable")
+    outcomes = {"key": keys[order], "player": player[order], "game_date": game_date[order]}
+    for field in ("min", "pts", "reb", "ast"):
+        outcomes[field] = np.array([float(row[field] or 0) for row in rows])[order]
+    return outcomes
+
+
+def load_analyses(path):
+    """
+    Stored analyses exported to CSV. The export needs `stat_type` and `game_date` columns
+    to join against the props; older exports (like the bundled analysis_results.csv) only
+    identify the player and are rejected rather than matched against every prop.
+
+    Returns:
+        dict: Column arrays player, stat_type, game_date, confidence.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = [field for field in ("stat_type", "game_date") if field not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path} has no {' or '.join(missing)} column; use an export that has them, or --analyses firestore")
+        rows = list(reader)
+    return {
+        "player": np.array([to_doc_id(row["player_name"]) for row in rows], dtype=str),
+        "stat_type": np.array([row["stat_type"] for row in rows], dtype=str),
+        "game_date": np.array([row["game_date"] for row in rows], dtype=str),
+        "confidence": np.array([_confidence(row.get("confidence_level")) for row in rows]),
+    }
+
+
+def load_firestore_analyses(db):
+    """
+    Stored analyses from the `players/{name}/analysis_results/{stat}_latest` docs that
+    analysis/main.py writes. The stat type comes from the doc id and the game date from
+    the analysis timestamp, since props are analysed on the day of the game. Fallback
+    decisions (analysis/freshness.py DEGRADED_SOURCES) are not analyses and are skipped.
+
+    Returns:
+        dict: Column arrays player, stat_type, game_date, confidence.
+    """
+    stat_types = {stat_type.lower(): stat_type for stat_type in STAT_COLUMNS}
+    rows = []
+    for doc in db.collection_group("analysis_results").stream():
+        player_ref = doc.reference.parent.parent
+        if player_ref is None or not doc.id.endswith("_latest"):
+            continue
+        analysis = doc.to_dict()
+        if not analysis.get("timestamp") or analysis.get("source") in DEGRADED_SOURCES:
+            continue
+        stat_type = doc.id[:-len("_latest")]
+        rows.append((player_ref.id, stat_types.get(stat_type, stat_type), analysis["timestamp"][:10], _confidence(analysis.get("confidence_level"))))
+    return {
+        "player": np.array([row[0] for row in rows], dtype=str),
+        "stat_type": np.array([row[1] for row in rows], dtype=str),
+        "game_date": np.array([row[2] for row in rows], dtype=str),
+        "confidence": np.array([row[3] for row in rows], dtype=float),
+    }
+
+
+def _confidence(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def attach_outcomes(lines, outcomes):
+    """
+    Add the `actual` stat value for each prop. NaN when the game is not in the outcomes,
+    the player did not play (the prop is void) or the stat type is unsupported.
+    """
+    index, found = _lookup(outcomes["key"], _join_keys(lines["player"], lines["game_date"]))
+    actual = np.full(len(lines["line"]), np.nan)
+    played = found & (outcomes["min"][index] > 0) if len(outcomes["key"]) else found
+    for stat_type, columns in STAT_COLUMNS.items():
+        mask = played & (lines["stat_type"] == stat_type)
+        actual[mask] = sum(outcomes[column][index[mask]] for column in columns)
+    return {**lines, "actual": actual}
+
+
+def stored_confidence(props, analyses):
+    """Confidence from stored analyses, joined on player, stat type and game date."""
+    analysis_keys = _join_keys(*(analyses[field] for field in ANALYSIS_KEYS))
+    # Later rows win when an analysis was stored more than once
+    reversed_keys = analysis_keys[::-1]
+    unique_keys, first = np.unique(reversed_keys, return_index=True)
+    confidence = analyses["confidence"][::-1][first]
+
+    index, found = _lookup(unique_keys, _join_keys(*(props[field] for field in ANALYSIS_KEYS)))
+    result = np.full(len(props["line"]), np.nan)
+    result[found] = confidence[index[found]]
+    return result
+
+
+def prior_average(props, outcomes):
+    """Each prop's stat averaged over the player's games before the prop date (NaN if none)."""
+    played = (outcomes["min"] > 0).astype(float)
+    start = np.searchsorted(outcomes["key"], np.char.add(props["player"], "|"))
+    end = np.searchsorted(outcomes["key"], _join_keys(props["player"], props["game_date"]))
+    games = np.concatenate(([0.0], np.cumsum(played)))
+    count = games[end] - games[start]
+
+    average = np.full(len(props["player"]), np.nan)
+    for stat_type, columns in STAT_COLUMNS.items():
+        values = sum(outcomes[column] for column in columns) * played
+        totals = np.concatenate(([0.0], np.cumsum(values)))
+        mask = (props["stat_type"] == stat_type) & (count > 0)
+        average[mask] = (totals[end[mask]] - totals[start[mask]]) / count[mask]
+    return average
+
+
+def prior_average_confidence(props, outcomes, scale=1.0):
+    """
+    Baseline candidate model: lean over or under by how far the player's average in
+    games before the prop date sits from the line. NaN when there is no prior game.
+    """
+    average = prior_average(props, outcomes)
+    edge = (average - props["line"]) / np.maximum(props["line"], 1.0)
+    return 50 + 50 * np.tanh(scale * edge)
+
+
+def decimal_odds(american):
+    return 1 + (100 / abs(american) if american < 0 else american / 100)
+
+
+def _grouped(labels, graded, hit, profit, bet):
+    """Per-label bets, hits, hit rate, units and ROI with one bincount per measure."""
+    names, group = np.unique(labels, return_inverse=True)
+    size = len(names)
+    bets = np.bincount(group, weights=bet, minlength=size)
+    graded_count = np.bincount(group, weights=graded, minlength=size)
+    hits = np.bincount(group, weights=hit, minlength=size)
+    units = np.bincount(group, weights=profit, minlength=size)
+    return {
+        str(name): {
+            "bets": int(bets[i]),
+            "pushes": int(bets[i] - graded_count[i]),
+            "hits": int(hits[i]),
+            "hit_rate": round(float(hits[i] / graded_count[i]), 4) if graded_count[i] else None,
+            "units": round(float(units[i]), 3),
+            "roi": round(float(units[i] / bets[i]), 4) if bets[i] else None,
+        }
+        for i, name in enumerate(names) if bets[i]
+    }
+
+
+def evaluate(props, confidence, odds=DEFAULT_ODDS, min_edge=0.0):
+    """
+    Score a model's confidence levels against the outcomes.
+
+    A confidence above 50 is a pick on the over and below 50 on the under; props at
+    exactly 50, closer than `min_edge` to 50, without an outcome or without a
+    confidence are not bet. Pushes return the stake.
+
+    Args:
+        props (dict): Column arrays from attach_outcomes.
+        confidence (np.ndarray): 0-100 confidence per prop (NaN for no pick).
+        odds (int): American odds every pick is assumed to be placed at.
+        min_edge (float): Minimum distance from 50 to place a bet.
+
+    Returns:
+        dict: Overall results, per stat type and per confidence bucket breakdowns,
+        calibration of P(over) = confidence / 100 and the Brier score.
+    """
+    confidence = np.clip(np.asarray(confidence, dtype=float), 0, 100)
+    actual = props["actual"]
+    valid = ~np.isnan(actual) & ~np.isnan(confidence)
+    pick = np.sign(np.where(valid, confidence, 50) - 50)
+    result = np.sign(np.where(valid, actual, 0) - props["line"])
+
+    bet = valid & (pick != 0) & (np.abs(confidence - 50) >= min_edge)
+    graded = bet & (result != 0)
+    hit = graded & (pick == result)
+    profit = np.where(hit, decimal_odds(odds) - 1, np.where(graded, -1.0, 0.0))
+
+    buckets = CONFIDENCE_LABELS[np.searchsorted(CONFIDENCE_EDGES, np.where(valid, confidence, 0), side="right")]
+    bet_f, graded_f, hit_f = bet.astype(float), graded.astype(float), hit.astype(float)
+    overall = _grouped(np.zeros(len(actual), dtype=int), graded_f, hit_f, profit, bet_f).get("0", {"bets": 0})
+
+    # Calibration over every decided prop, bet or not
+    decided = valid & (result != 0)
+    probability = confidence[decided] / 100
+    went_over = (result[decided] > 0).astype(float)
+    bins = np.minimum((probability * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    counts = np.bincount(bins, minlength=CALIBRATION_BINS)
+    predicted = np.bincount(bins, weights=probability, minlength=CALIBRATION_BINS)
+    observed = np.bincount(bins, weights=went_over, minlength=CALIBRATION_BINS)
+    calibration = [
+        {
+            "bin": f"{i / CALIBRATION_BINS:.1f}-{(i + 1) / CALIBRATION_BINS:.1f}",
+            "props": int(counts[i]),
+            "mean_predicted": round(float(predicted[i] / counts[i]), 4),
+            "observed_over_rate": round(float(observed[i] / counts[i]), 4),
+        }
+        for i in range(CALIBRATION_BINS) if counts[i]
+    ]
+
+    return {
+        "props": int(len(actual)),
+        "with_outcome": int(np.count_nonzero(~np.isnan(actual))),
+        "with_confidence": int(np.count_nonzero(valid)),
+        "odds": odds,
+        "break_even_hit_rate": round(1 / decimal_odds(odds), 4),
+        "overall": overall,
+        "by_stat_type": _grouped(props["stat_type"], graded_f, hit_f, profit, bet_f),
+        "by_confidence_bucket": _grouped(buckets, graded_f, hit_f, profit, bet_f),
+        "calibration": calibration,
+        "brier_score": round(float(np.mean((probability - went_over) ** 2)), 4) if len(probability) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest confidence levels against historical prop outcomes.")
+    parser.add_argument("--lines", nargs="+", default=["unr_bets.json"], help="PrizePicks projection snapshots")
+    parser.add_argument("--outcomes", default="csv/sql tables/game_stats.csv")
+    parser.add_argument("--analyses", default="csv/sql tables/analysis_results.csv",
+                        help="CSV export with stat_type and game_date columns, or 'firestore' for the stored {stat}_latest docs")
+    parser.add_argument("--model", choices=("stored", "prior_average"), default="stored")
+    parser.add_argument("--odds", type=int, default=DEFAULT_ODDS, help="American odds per pick (default -110)")
+    parser.add_argument("--min-edge", type=float, default=0.0, help="Only bet picks at least this far from 50")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    outcomes = load_outcomes(args.outcomes)
+    props = attach_outcomes(load_lines(args.lines), outcomes)
+    loaded = time.perf_counter()
+    if args.model == "stored":
+        if args.analyses == "firestore":
+            from database.firebase import db
+            analyses = load_firestore_analyses(db)
+        else:
+            try:
+                analyses = load_analyses(args.analyses)
+            except ValueError as e:
+                print(f"⚠ Cannot backtest stored analyses: {e}.", file=sys.stderr)
+                sys.exit(1)
+        confidence = stored_confidence(props, analyses)
+    else:
+        confidence = prior_average_confidence(props, outcomes)
+    report = evaluate(props, confidence, args.odds, args.min_edge)
+    finished = time.perf_counter()
+
+    if report["with_outcome"] == 0:
+        print("⚠ None of the prop lines have an outcome in the box scores; check the snapshot dates.", file=sys.stderr)
+    report["load_seconds"] = round(loaded - started, 4)
+    report["evaluate_seconds"] = round(finished - loaded, 4)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
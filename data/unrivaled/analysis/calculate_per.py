@@ -1,3 +1,14 @@
+from datetime import datetime
+from database.feature_store import apply_games, rebuild_features
+
+# Box-score fields UPER is computed from
+PER_FIELDS = ("pts", "ast", "offensive_rebounds", "defensive_rebounds", "stl", "blk",
+              "fg_a", "fg_m", "ft_a", "ft_m", "turnovers", "pf", "min")
+
+# League aggregate kept by update_player_uper: each player's current UPER plus their sum
+# and count, so a refresh only touches the players with new games
+LEAGUE_PER_DOC = ("meta", "league_per")
+
 def calculate_per(player_name, db, league_average_uper=None):
     """
     Calculate the Player Efficiency Rating (PER) for a given player using the updated formulas.
@@ -23,75 +34,18 @@ def calculate_per(player_name, db, league_average_uper=None):
     games_ref = player_ref.collection("games")
     games = games_ref.stream()
 
-    # Initialize total stats
-    total_points = 0
-    total_assists = 0
-    total_offensive_rebounds = 0
-    total_defensive_rebounds = 0
-    total_steals = 0
-    total_blocks = 0
-    total_fg_attempted = 0
-    total_fg_made = 0
-    total_ft_attempted = 0
-    total_ft_made = 0
-    total_turnovers = 0
-    total_fouls = 0
-    total_minutes = 0
-
     # Aggregate stats from individual games
+    totals = {field: 0 for field in PER_FIELDS}
     for game in games:
         game_stats = game.to_dict()
+        for field in PER_FIELDS:
+            totals[field] += int(game_stats.get(field, 0))
 
-        # Convert all stats to integers or floats
-        total_points += int(game_stats.get("pts", 0))
-        total_assists += int(game_stats.get("ast", 0))
-        total_offensive_rebounds += int(game_stats.get("offensive_rebounds", 0))
-        total_defensive_rebounds += int(game_stats.get("defensive_rebounds", 0))
-        total_steals += int(game_stats.get("stl", 0))
-        total_blocks += int(game_stats.get("blk", 0))
-        total_fg_attempted += int(game_stats.get("fg_a", 0))
-        total_fg_made += int(game_stats.get("fg_m", 0))
-        total_ft_attempted += int(game_stats.get("ft_a", 0))
-        total_ft_made += int(game_stats.get("ft_m", 0))
-        total_turnovers += int(game_stats.get("turnovers", 0))
-        total_fouls += int(game_stats.get("pf", 0))
-        total_minutes += int(game_stats.get("min", 0))
-
-    # Calculate averages
-    num_games = player_stats.get("gp", 1)
-    points = total_points / num_games
-    assists = total_assists / num_games
-    offensive_rebounds = total_offensive_rebounds / num_games
-    defensive_rebounds = total_defensive_rebounds / num_games
-    steals = total_steals / num_games
-    blocks = total_blocks / num_games
-    fg_attempted = total_fg_attempted / num_games
-    fg_made = total_fg_made / num_games
-    ft_attempted = total_ft_attempted / num_games
-    ft_made = total_ft_made / num_games
-    turnovers = total_turnovers / num_games
-    fouls = total_fouls / num_games
-    minutes_played = total_minutes / num_games
-
-    # Check if minutes_played is 0
-    if minutes_played <= 0:
+    uPER = uper_from_totals(totals)
+    if uPER is None:
         print(f"⚠ Player {player_name} has 0 minutes played. Skipping PER calculation.")
         return None
 
-    # Compute UPER (Unadjusted PER)
-    uPER = (
-        points
-        + 0.7 * assists
-        + 0.85 * offensive_rebounds
-        + 0.5 * defensive_rebounds
-        + steals
-        + blocks
-        - 0.7 * (fg_attempted - fg_made)
-        - 0.5 * (ft_attempted - ft_made)
-        - turnovers
-        - 0.3 * fouls
-    ) / minutes_played
-
     # If league average UPER isn't provided, return UPER only
     if league_average_uper is None:
         return uPER
@@ -101,6 +55,30 @@ def calculate_per(player_name, db, league_average_uper=None):
 
     return uPER
 
+def uper_from_totals(totals):
+    """
+    Unadjusted PER from season totals. Per-game averages share the games-played divisor,
+    so this is the weighted season total per minute played.
+
+    Returns:
+        float: The UPER, or None if the player has no minutes played.
+    """
+    minutes_played = totals.get("min", 0)
+    if minutes_played <= 0:
+        return None
+    return (
+        totals.get("pts", 0)
+        + 0.7 * totals.get("ast", 0)
+        + 0.85 * totals.get("offensive_rebounds", 0)
+        + 0.5 * totals.get("defensive_rebounds", 0)
+        + totals.get("stl", 0)
+        + totals.get("blk", 0)
+        - 0.7 * (totals.get("fg_a", 0) - totals.get("fg_m", 0))
+        - 0.5 * (totals.get("ft_a", 0) - totals.get("ft_m", 0))
+        - totals.get("turnovers", 0)
+        - 0.3 * totals.get("pf", 0)
+    ) / minutes_played
+
 def compute_league_average_uper(db):
     """
     Compute the league-wide average UPER by iterating over all players.
@@ -137,3 +115,62 @@ def get_league_average_per(league_average_uper):
     """
     return 15  # By definition
 
+def load_league_per(db):
+    """The stored league aggregate, or None if it has never been built."""
+    doc = db.collection(LEAGUE_PER_DOC[0]).document(LEAGUE_PER_DOC[1]).get()
+    return doc.to_dict() if doc.exists else None
+
+def save_league_per(db, league):
+    league["updated_at"] = datetime.now().isoformat()
+    db.collection(LEAGUE_PER_DOC[0]).document(LEAGUE_PER_DOC[1]).set(league)
+
+def league_average(league):
+    """League-wide average UPER from the aggregate (15.0 when empty, as in compute_league_average_uper)."""
+    return league["total"] / league["count"] if league and league["count"] > 0 else 15.0
+
+def update_player_uper(db, player_name, new_games, league):
+    """
+    Apply a player's newly scraped games to their running totals (player_features) and
+    refresh their share of the league aggregate. Already-applied games are ignored, so
+    the cost follows the number of new games rather than the season length.
+
+    Args:
+        db: The Firebase database connection object.
+        player_name (str): The player's `players/` document id.
+        new_games (list): Game stat dicts (fg_m, fg_a, ..., min) with `game_id`.
+        league (dict): Aggregate from load_league_per, updated in place.
+
+    Returns:
+        float: The player's UPER, or None if they have no minutes played.
+    """
+    features, _ = apply_games(db, player_name, new_games)
+    uper = uper_from_totals(features["totals"])
+
+    previous = league["upers"].get(player_name)
+    if previous is not None:
+        league["total"] -= previous
+        league["count"] -= 1
+    if uper is not None:
+        league["total"] += uper
+        league["count"] += 1
+        league["upers"][player_name] = uper
+    else:
+        league["upers"].pop(player_name, None)
+    return uper
+
+def rebuild_league_per(db):
+    """
+    Full rebuild: recompute every player's running totals from their game logs and the
+    league aggregate from scratch. Run on demand (unr_player_scrape --rebuild-per).
+    """
+    league = {"upers": {}, "total": 0.0, "count": 0}
+    plays_by_game = {}
+    for player in db.collection("players").stream():
+        uper = uper_from_totals(rebuild_features(db, player.id, plays_by_game)["totals"])
+        if uper is not None:
+            league["upers"][player.id] = uper
+            league["total"] += uper
+            league["count"] += 1
+    save_league_per(db, league)
+    return league
+
@@ -0,0 +1,170 @@
+import math
+import os
+import sys
+from datetime import datetime
+from database.player_data import player_cache
+
+# Statistical fast path run before the LLM pipeline. A count distribution is fitted to
+# each player's game log for the prop's stat type; props whose P(over) falls outside the
+# uncertainty band are decided locally and only the rest are sent to DeepSeek.
+
+STAT_FIELDS = {
+    "Points": ("pts",),
+    "Rebounds": ("reb",),
+    "Assists": ("ast",),
+    "Pts+Rebs+Asts": ("pts", "reb", "ast"),
+}
+
+# Props with lower <= P(over) <= upper go to the LLM. Override with FAST_PATH_BAND="0.2,0.8".
+FAST_PATH_BAND = tuple(float(value) for value in os.getenv("FAST_PATH_BAND", "0.25,0.75").split(","))
+FAST_PATH_MIN_GAMES = int(os.getenv("FAST_PATH_MIN_GAMES", "4"))
+
+
+def played(game_stats):
+    """A game where the player accrued 0 in every stat is treated as a DNP."""
+    return any(float(game_stats.get(field, 0) or 0) > 0 for field in ("min", "pts", "reb", "ast"))
+
+
+def stat_values(game_logs, stat_type):
+    """
+    Per-game totals for a prop's stat type, skipping DNPs.
+
+    Args:
+        game_logs (list): Game stat dicts from `players/{name}/games`.
+        stat_type (str): PrizePicks stat type, e.g. "Pts+Rebs+Asts".
+
+    Returns:
+        list: One total per game played, or None if the stat type is not supported.
+    """
+    fields = STAT_FIELDS.get(stat_type)
+    if fields is None:
+        return None
+    return [sum(float(game.get(field, 0) or 0) for field in fields) for game in game_logs if played(game)]
+
+
+def _poisson_cdf(k, mean):
+    term = math.exp(-mean)
+    total = term
+    for i in range(1, k + 1):
+        term *= mean / i
+        total += term
+    return total
+
+
+def _negative_binomial_cdf(k, mean, r):
+    # Parameterised by mean and dispersion r: variance = mean + mean^2 / r
+    q = mean / (r + mean)
+    term = (1 - q) ** r
+    total = term
+    for i in range(1, k + 1):
+        term *= (i - 1 + r) / i * q
+        total += term
+    return total
+
+
+def probability_over(values, line):
+    """
+    P(stat > line) from a count distribution fitted by the method of moments:
+    negative binomial when the game log is overdispersed, Poisson otherwise.
+
+    Args:
+        values (list): Per-game totals.
+        line (float): The prop's line_score.
+
+    Returns:
+        float: Probability of going over the line.
+    """
+    n = len(values)
+    mean = sum(values) / n
+    if mean <= 0:
+        return 0.0
+    variance = sum((value - mean) ** 2 for value in values) / (n - 1) if n > 1 else mean
+    k = math.floor(line)
+    if variance > mean:
+        cdf = _negative_binomial_cdf(k, mean, mean ** 2 / (variance - mean))
+    else:
+        cdf = _poisson_cdf(k, mean)
+    return min(1.0, max(0.0, 1 - cdf))
+
+
+def evaluate_prop(game_logs, stat_type, line, band=FAST_PATH_BAND, min_games=FAST_PATH_MIN_GAMES):
+    """
+    Decide a prop locally if the game log makes it clear-cut.
+
+    Returns:
+        dict: `p_over`, `games` and `decision` ("over", "under" or None when the prop
+        should go to the LLM pipeline).
+    """
+    values = stat_values(game_logs, stat_type)
+    if values is None or len(values) < min_games:
+        return {"p_over": None, "games": len(values or []), "decision": None}
+
+    p_over = probability_over(values, float(line))
+    lower, upper = band
+    if p_over > upper:
+        decision = "over"
+    elif p_over < lower:
+        decision = "under"
+    else:
+        decision = None
+    return {"p_over": p_over, "games": len(values), "mean": sum(values) / len(values), "decision": decision}
+
+
+def save_fast_path_result(player_ref, stat_type, line, result, source="fast_path"):
+    """Store a fast-path decision in the same shape final_evaluation writes."""
+    confidence_level = int(round(result["p_over"] * 100))
+    side = result["decision"]
+    summary = (
+        f"Averaging {result['mean']:.1f} {stat_type.lower()} over {result['games']} games; "
+        f"the fitted distribution gives P(over {line}) = {result['p_over']:.2f}."
+    )
+    analysis = {
+        "confidence_level": confidence_level,
+        "reason_1": summary,
+        "reason_2": "",
+        "reason_3": "",
+        "reason_4": "",
+        "final_conclusion": f"Statistical fast path: taking the {side} with confidence {confidence_level}.",
+        "source": source,
+        "timestamp": datetime.now().isoformat()
+    }
+    player_ref.collection("analysis_results").document(f"{stat_type.lower()}_latest").set(analysis)
+    return {
+        "confidence_level": confidence_level,
+        "reasons": [summary],
+        "final_conclusion": analysis["final_conclusion"]
+    }
+
+
+def route_props(db, enriched_data, band=FAST_PATH_BAND):
+    """
+    Split a slate into props decided by the fast path and props that need the LLM.
+
+    Args:
+        db: The Firebase database connection object.
+        enriched_data (list): Prop dicts with `player_data` and `projection_data`.
+        band (tuple): (lower, upper) P(over) band routed to the LLM.
+
+    Returns:
+        tuple: ({(name, stat_type): analysis} for decided props, list of props for the LLM).
+    """
+    decided = {}
+    uncertain = []
+
+    for player in enriched_data:
+        player_name = player["player_data"]["name"].replace(" ", "_")
+        stat_type = player["projection_data"]["stat_type"]
+        line = player["projection_data"]["line_score"]
+        player_ref = db.collection("players").document(player_name)
+
+        game_logs = list(player_cache.game_log(player_name).values())
+        result = evaluate_prop(game_logs, stat_type, line, band)
+        if result["decision"] is None:
+            uncertain.append(player)
+            continue
+
+        print(f"⚡ Fast path: {player_name} ({stat_type}) {line} -> {result['decision']} (P(over)={result['p_over']:.2f})", file=sys.stderr)
+        decided[(player["player_data"]["name"], stat_type)] = save_fast_path_result(player_ref, stat_type, line, result)
+
+    print(f"Fast path decided {len(decided)} of {len(enriched_data)} props; {len(uncertain)} sent to the LLM.", file=sys.stderr)
+    return decided, uncertain
@@ -0,0 +1,182 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from helpers.play_events import EventType, TYPED_FIELDS, typed, points_scored
+from helpers.streaks import analyze_streaks
+
+# Feature-computation stage. Play classification, streaks and the per-game breakdowns are
+# CPU-bound and used to run on the event loop, stalling every in-flight LLM request. The
+# callers fetch a player's plays (I/O), trim them with compact_play and hand the bundle to
+# `feature_pool`, which computes it in a worker process while the loop keeps serving
+# requests. This module imports no database code, so worker processes start cheaply.
+
+# Worker processes for the stage; 0 computes inline on the calling thread
+FEATURE_WORKERS = int(os.getenv("FEATURE_WORKERS", str(os.cpu_count() or 1)))
+
+# Play fields the features read; everything else stays in the parent process
+PLAY_FIELDS = ("quarter", "time", "play_description", "home_score", "away_score", "player") + TYPED_FIELDS
+
+
+def compact_play(play):
+    return {field: play[field] for field in PLAY_FIELDS if field in play}
+
+
+def game_flow_features_from_plays(plays, player_name):
+    """
+    Stat-independent inputs for the game-flow prompts from one game's plays for the player:
+    counts, streaks and the simplified play list.
+    """
+    # Typed event fields are read directly; older plays are parsed once here
+    plays = [typed(play) for play in plays]
+    shots = [play for play in plays if play["event"] in (EventType.SHOT.value, EventType.FREE_THROW.value)]
+
+    # Simplify the play-by-play data for analysis
+    simplified_plays = []
+    for play in plays:
+        try:
+            simplified_plays.append({
+                "quarter": play["quarter"],
+                "time": play["time"],
+                "description": play["play_description"],
+                "score": f"{play['home_score']}-{play['away_score']}"
+            })
+        except KeyError as e:
+            print(f"⚠️ Missing key in play data: {e}", file=sys.stderr)
+            continue
+
+    return {
+        # One pass covers the streaks for every stat type
+        "streaks": analyze_streaks(plays, player_name),
+        "total_points": sum(points_scored(play) for play in shots),
+        "total_misses": sum(1 for play in shots if not play["made"]),
+        "offensive_rebounds": sum(1 for play in plays if play["rebound_type"] == "offensive"),
+        "defensive_rebounds": sum(1 for play in plays if play["rebound_type"] == "defensive"),
+        "total_assists": sum(1 for play in plays if play["event"] == EventType.ASSIST.value),
+        "simplified_plays": simplified_plays,
+    }
+
+
+def player_game_flow_features(inputs):
+    """
+    Game-flow features for every game of one player.
+
+    Args:
+        inputs (dict): `player_name` and `plays`, a dict of game id -> compact plays.
+
+    Returns:
+        dict: game id -> features, or None for games without play-by-play.
+    """
+    player_name = inputs["player_name"]
+    features = {}
+    for game_id, plays in inputs["plays"].items():
+        if not plays:
+            print(f"No play-by-play data found for {player_name} in Game {game_id}.", file=sys.stderr)
+            features[game_id] = None
+        else:
+            features[game_id] = game_flow_features_from_plays(plays, player_name)
+    return features
+
+
+def player_scoring_breakdown(plays):
+    scoring_data = {
+        "2pt_made": 0,
+        "2pt_missed": 0,
+        "3pt_made": 0,
+        "3pt_missed": 0,
+        "free_throws_made": 0,
+        "free_throws_missed": 0
+    }
+    for play in plays:
+        play = typed(play)
+        if play["event"] == EventType.SHOT.value:
+            key = "2pt" if play["shot_value"] == 2 else "3pt"
+            scoring_data[f"{key}_made" if play["made"] else f"{key}_missed"] += 1
+        elif play["event"] == EventType.FREE_THROW.value:
+            scoring_data["free_throws_made" if play["made"] else "free_throws_missed"] += 1
+    return scoring_data
+
+
+def turnover_foul_analysis(plays):
+    turnover_foul_data = {"turnovers": 0, "fouls": 0}
+    for play in plays:
+        event = typed(play)["event"]
+        if event == EventType.TURNOVER.value:
+            turnover_foul_data["turnovers"] += 1
+        elif event == EventType.FOUL.value:
+            turnover_foul_data["fouls"] += 1
+    return turnover_foul_data
+
+
+def teammate_interaction_analysis(plays, player_name, player_teams):
+    interaction_data = defaultdict(int)
+    previous_play = None
+    for play in plays:
+        play = typed(play)
+        player = play.get("player")
+        if player is None:
+            continue
+        if play["event"] == EventType.ASSIST.value and previous_play and previous_play.get("player"):
+            teammate = previous_play.get("player")
+            if teammate is None:
+                continue
+            if (teammate.lower() in player_teams and
+                player.lower() in player_teams and
+                player.lower() == player_name.lower() and
+                player_name.lower() != teammate.lower()):
+                if player_teams[teammate.lower()] == player_teams[player.lower()]:
+                    interaction_data[teammate.lower()] += 1
+        previous_play = play if player else None
+    return dict(interaction_data)
+
+
+def player_play_breakdowns(inputs):
+    """
+    Per-game scoring, turnover/foul and teammate-interaction breakdowns for one player
+    (predict/play_by_play_analysis_gpt.py).
+
+    Args:
+        inputs (dict): `player_name`, `player_teams` and `plays` (game id -> compact plays).
+
+    Returns:
+        dict: game id -> breakdowns, for games with plays.
+    """
+    player_name = inputs["player_name"]
+    return {
+        game_id: {
+            "scoring_breakdown": player_scoring_breakdown(plays),
+            "turnover_foul_data": turnover_foul_analysis(plays),
+            "interaction_data": teammate_interaction_analysis(plays, player_name, inputs["player_teams"]),
+        }
+        for game_id, plays in inputs["plays"].items() if plays
+    }
+
+
+class FeaturePool:
+    """
+    Runs feature functions in worker processes. The pool is started on first use and
+    reused for the rest of the run; with `workers=0` functions run inline.
+    """
+
+    def __init__(self, workers=FEATURE_WORKERS):
+        self.workers = workers
+        self._executor = None
+
+    async def run(self, function, inputs):
+        if self.workers <= 0:
+            return function(inputs)
+        if self._executor is None:
+            # Spawned, not forked: by now the parent holds a gRPC client, an event loop and
+            # possibly the profiler's sampler thread, none of which survive a fork
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, inputs)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+feature_pool = FeaturePool()
@@ -1,60 +1,58 @@
-import re
 import aiohttp
+import asyncio
 import sys
 import json
 from database.firebase import DEEPSEEK_API_KEY, DEEPSEEK_MODEL, DEEPSEEK_API_URL, db
-import asyncio
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from datetime import datetime, timedelta  # Import datetime for timestamp functionality
-
-@retry(
-    stop=stop_after_attempt(5),  # Retry up to 5 times
-    wait=wait_exponential(multiplier=1, min=4, max=10),  # Exponential backoff
-    retry=retry_if_exception_type(Exception),  # Retry on any exception
-)
-async def calculate_final_confidence_level(session, player_name, player_team, past_performance_analysis, player_prop, opposing_team, injury_reports, stat_type):
-    # Add a delay to avoid rate limiting
-    await asyncio.sleep(1)  # 1-second delay between requests
-
-    # Fetch player data from Firebase
-    player_ref = db.collection("players").document(player_name)
-    player_stats = player_ref.get().to_dict()
-
-    # Check if there's already an analysis for this player and stat type
-    analysis_results_ref = player_ref.collection("analysis_results").document(f"{stat_type.lower()}_latest")
-    latest_analysis = analysis_results_ref.get().to_dict()
-
-    if latest_analysis:
-        # Get the timestamp of the latest analysis
-        analysis_timestamp = latest_analysis.get("timestamp", None)
-        if analysis_timestamp:
-            # Convert the timestamp to a datetime object
-            analysis_date = datetime.fromisoformat(analysis_timestamp)
-            final_conclusion = latest_analysis.get("final_conclusion", "")
-            # Get the current date
-            current_date = datetime.now()
-
-            # Calculate the time difference between now and the analysis timestamp
-            time_difference = current_date - analysis_date
-            # Check if the analysis is from the last 3 hours
-            if time_difference < timedelta(hours=3) and final_conclusion != "":
-                print(f"Skipping {player_name} ({stat_type}) - Analysis already exists within the last 3 hours.", file=sys.stderr)
-                return None  # Skip this player
-
-    # If no analysis exists or it's not from today, proceed with the analysis
-
-    headers = {
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        "Content-Type": "application/json"
+from database.player_data import player_cache, last_n_games, games_vs_opponent
+from analysis.structured_output import parse_final_evaluation, missing_fields, repair_prompt, response_format_instructions, IncrementalFieldParser
+from helpers.llm_http import post_chat_completion, completion_text, LLM_STREAMING
+from helpers.tracing import span, traced
+from helpers.injury_reports import InjuryReports, normalize_team
+from datetime import datetime  # Import datetime for timestamp functionality
+
+# Follow-up requests allowed for fields missing from a reply
+MAX_REPAIR_ATTEMPTS = 1
+
+async def _chat_completion(session, headers, messages, timeout, on_field=None, **labels):
+    """
+    Send one JSON-mode chat request and return the reply text. Transport failures
+    are retried inside post_chat_completion; anything else raises LLMRequestError.
+    When streaming (LLM_STREAMING=1), `on_field(field, value)` is called as each
+    field of the reply completes. `labels` (stage, player, stat_type) go to the ledger.
+    """
+    data = {
+        "model": DEEPSEEK_MODEL,
+        "messages": messages,
+        "response_format": {"type": "json_object"}
     }
-
+    on_delta = on_stream_start = None
+    if LLM_STREAMING and on_field is not None:
+        parser = IncrementalFieldParser()
+
+        def on_stream_start():
+            # A retried request is a new reply; never join it to a failed attempt's text
+            nonlocal parser
+            parser = IncrementalFieldParser()
+
+        def on_delta(delta):
+            for field, value in parser.feed(delta):
+                on_field(field, value)
+
+    result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, timeout=timeout, on_delta=on_delta,
+                                        on_stream_start=on_stream_start, **labels)
+    return completion_text(result)
+
+def final_evaluation_prompt(player_name, player_team, opposing_team, player_prop, stat_type, past_performance_analysis,
+                            injury_reports, player_stats, team_stats, recent_rows, matchup_rows):
+    """
+    The final evaluation prompt from data already fetched: the player and team docs,
+    the recent game rows and the rows against the opponent.
+    """
     # Fetch PER and uPER from player stats
     player_per = player_stats.get("per", None)
     player_uper = player_stats.get("uper", None)
 
     # Fetch team data for points scored and points allowed
-    team_ref = db.collection("teams").document(player_team)
-    team_stats = team_ref.get().to_dict()
     points_scored = team_stats.get("pts_y", None)  # Points scored by the team
     points_allowed = team_stats.get("pts_a", None)  # Points allowed by the team
 
@@ -65,165 +63,177 @@ async def calculate_final_confidence_level(session, player_name, player_team, pa
     streak = team_stats.get("streak", 0)
 
     # Fetch matchup history (player performance against opposing team)
-    matchup_history = []
-    games_ref = player_ref.collection("games").stream()
-    for game in games_ref:
-        game_stats = game.to_dict()
-        if game_stats.get("opposing_team", "").lower() == opposing_team.lower():
-            matchup_history.append({
-                "points": game_stats.get("pts", 0),
-                "rebounds": game_stats.get("reb", 0),
-                "assists": game_stats.get("ast", 0),
-                "date": game_stats.get("game_date", "Unknown")
-            })
+    matchup_history = [{
+        "points": game_stats.get("pts", 0),
+        "rebounds": game_stats.get("reb", 0),
+        "assists": game_stats.get("ast", 0),
+        "date": game_stats.get("game_date", "Unknown")
+    } for game_stats in matchup_rows]
 
     # Fetch recent player performance (last 5 games)
-    recent_games = []
-    games_ref = player_ref.collection("games").stream()
-    for game in games_ref:
-        game_stats = game.to_dict()
-        recent_games.append({
-            "points": game_stats.get("pts", 0),
-            "rebounds": game_stats.get("reb", 0),
-            "assists": game_stats.get("ast", 0),
-            "date": game_stats.get("game_date", "Unknown")
-        })
-    recent_games = sorted(recent_games, key=lambda x: x["date"], reverse=True)[:5]  # Last 5 games
-
-    # Fetch injury reports (already passed as an argument)
+    recent_games = [{
+        "points": game_stats.get("pts", 0),
+        "rebounds": game_stats.get("reb", 0),
+        "assists": game_stats.get("ast", 0),
+        "date": game_stats.get("game_date", "Unknown")
+    } for game_stats in recent_rows]
+
+    # Injury reports for the two teams (already passed as an argument), looked up by team
     injury_context = ""
-    if injury_reports:
-        for report in injury_reports:
-            if report["team"].lower() == player_team.lower():
-                injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}. This could lead to increased playtime for {player_name}.\n"
-            elif report["team"].lower() == opposing_team.lower():
-                injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}.\n"
+    for report in InjuryReports.of(injury_reports).for_teams(player_team, opposing_team):
+        if normalize_team(report["team"]) == normalize_team(player_team):
+            injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}. This could lead to increased playtime for {player_name}.\n"
+        else:
+            injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}.\n"
 
     # Prepare the analysis prompt with all stats
-    data = {
-        "model": DEEPSEEK_MODEL,
-        "messages": [
-            {
-                "role": "user",
-                "content": (
-                    f"Analyze the following data for {player_name}:\n\n"
-                    f"Player Efficiency Rating (PER): {player_per} (League Average: 15)\n"
-                    f"Unadjusted PER (UPER): {player_uper} (League Average: 0.851)\n"
-                    f"Team Points Scored (Offensive Proxy): {points_scored}\n"
-                    f"Team Points Allowed (Defensive Proxy): {points_allowed}\n"
-                    f"Team Record: {team_record}\n"
-                    f"Team Win/Lose Streak: {streak} games\n\n"
-                    f"Past Performance Analysis: {past_performance_analysis}\n\n"
-                    f"Matchup History Against {opposing_team}:\n"
-                    f"{json.dumps(matchup_history, indent=2)}\n\n"
-                    f"Recent Performance (Last 5 Games):\n"
-                    f"{json.dumps(recent_games, indent=2)}\n\n"
-                    f"Injury Reports:\n{injury_context}\n\n"
-                    f"Player Prop: {player_prop} {stat_type.lower()}\n\n"
-                    f"Opposing Team: {opposing_team}\n\n"
-                    "Take into account these weights: recent_performance_weight = 0.3, matchup_weight = 0.25, defensive_weight = 0.2, injury_weight = 0.25, when making your decision. "
-                    "Provide a definitive confidence level (0-100) and 4 detailed reasons for taking the over or under on the player's prop line, as well as a final summary. "
-                    "The confidence level should reflect a strong belief in the outcome, with 0-25 indicating an extreme under, 26-50 indicating a moderate under, 51-75 indicating a moderate over, and 76-100 indicating an extreme over. "
-                    "Avoid clustering around 65 unless the data is truly inconclusive. If the data strongly suggests an over or under, provide a more definitive confidence level (e.g., 80 for a strong over or 30 for a strong under). "
-                    "If a player accrued 0 in all of their stats, assume they did NOT play in that game. "
-                    "Do not be conservative with your decision...I already know there is a chance the player could or could not hit their prop. Go as far left or right as you wish based on the data."
-                    "Please format your response as follows:\n"
-                    "Confidence Level: <confidence_level>\n"
-                    "Reason 1 (Performance Against Opposing Team): <reason_1>\n"
-                    "Reason 2 (Scoring Trends - Clutch Performance in Critical Moments, Hot/Cold Streaks): <reason_2>\n"
-                    "Reason 3 (Opposing Team's Defensive Weaknesses): <reason_3>\n"
-                    "Reason 4 (Recent Performance - Last 5 Games): <reason_4>\n"
-                    "Final Conclusion: <final_conclusion>\n\n"
-                    "For the reasons, please provide detailed insights like:\n"
-                    "- How the opposing team's defense ranks in points allowed and how it impacts the player's performance.\n"
-                    "- The player's consistency in scoring above the prop line in past encounters with the opposing team.\n"
-                    "- The player's role in their team and how it affects their scoring opportunities.\n"
-                    "- The player's recent performance trends over the last 5 games.\n\n"
-                    "Additionally, consider the following factors:\n"
-                    "- **Injury Impact**: Highlight how injuries to key players (e.g., Azura Stevens being out) affect player performance and team dynamics.\n"
-                    "- **Playoff Implications**: Consider teams' playoff standings and urgency. Teams need 7 wins to clinch.\n"
-                    "- **Team Records and Playoff Scenarios**: Incorporate the current standings and playoff implications into the analysis.\n\n"
-                    "Example format for reasons (make sure it's for the proper stat, not just points. Use what is necessary):\n"
-                    "Reason 1 (Performance Against Opposing Team): {opposing_team} allowed {points_allowed} points this season. On top of this, {player_name} has scored above the prop line consistently in each of their past encounters with {opposing_team}, averaging {average_points_against_opponent} points per game. This suggests a favorable matchup for {player_name}.\n"
-                    "Reason 2 (Scoring Trends - Clutch Performance in Critical Moments, Hot/Cold Streaks): {player_name} has shown a tendency to elevate their game in critical moments, particularly in the second half. In their last three games, they have had strong fourth-quarter performances, including an 8-point burst in one game and multiple three-pointers in another. This indicates they have the potential to exceed the prop line, especially if the game is close.\n"
-                    "Reason 3 (Opposing Team's Defensive Weaknesses): {opposing_team} is missing key players like {injured_player} due to injuries, which could weaken their perimeter defense and rebounding. {player_name}'s strength in three-point shooting ({three_point_percentage}% against {opposing_team}) could be even more effective against a depleted defense. Additionally, {opposing_team}'s defensive rebounding may suffer without {injured_player}, potentially giving {player_name} more opportunities for second-chance points or open looks.\n"
-                    "Reason 4 (Recent Performance - Last 5 Games): Over their last five games, {player_name} has averaged approximately {average_points_last_5} points per game, slightly below the prop line. However, they have shown the ability to exceed {player_prop} points in key games, such as their {best_game_points}-point performance against {opposing_team} and an 8-point burst in the fourth quarter of another game. Their recent trend of strong second-half performances suggests they could hit the over if they maintain their rhythm and take advantage of {opposing_team}'s defensive vulnerabilities.\n"
-                    "Final Conclusion: While {player_name}'s recent scoring average ({average_points_last_5} points) is slightly below the prop line, their ability to perform in clutch moments, their strong three-point shooting, and {opposing_team}'s defensive weaknesses due to injuries make the over a reasonable bet. Their inconsistency in the first half is a concern, but their tendency to elevate their game in critical moments and their recent performances against {opposing_team} provide enough confidence to lean toward the over. Confidence level: {confidence_level}."
-                )
-            }
-        ]
+    return (
+        f"Analyze the following data for {player_name}:\n\n"
+        f"Player Efficiency Rating (PER): {player_per} (League Average: 15)\n"
+        f"Unadjusted PER (UPER): {player_uper} (League Average: 0.851)\n"
+        f"Team Points Scored (Offensive Proxy): {points_scored}\n"
+        f"Team Points Allowed (Defensive Proxy): {points_allowed}\n"
+        f"Team Record: {team_record}\n"
+        f"Team Win/Lose Streak: {streak} games\n\n"
+        f"Past Performance Analysis: {past_performance_analysis}\n\n"
+        f"Matchup History Against {opposing_team}:\n"
+        f"{json.dumps(matchup_history, indent=2)}\n\n"
+        f"Recent Performance (Last 5 Games):\n"
+        f"{json.dumps(recent_games, indent=2)}\n\n"
+        f"Injury Reports:\n{injury_context}\n\n"
+        f"Player Prop: {player_prop} {stat_type.lower()}\n\n"
+        f"Opposing Team: {opposing_team}\n\n"
+        "Take into account these weights: recent_performance_weight = 0.3, matchup_weight = 0.25, defensive_weight = 0.2, injury_weight = 0.25, when making your decision. "
+        "Provide a definitive confidence level (0-100) and 4 detailed reasons for taking the over or under on the player's prop line, as well as a final summary. "
+        "The confidence level should reflect a strong belief in the outcome, with 0-25 indicating an extreme under, 26-50 indicating a moderate under, 51-75 indicating a moderate over, and 76-100 indicating an extreme over. "
+        "Avoid clustering around 65 unless the data is truly inconclusive. If the data strongly suggests an over or under, provide a more definitive confidence level (e.g., 80 for a strong over or 30 for a strong under). "
+        "If a player accrued 0 in all of their stats, assume they did NOT play in that game. "
+        "Do not be conservative with your decision...I already know there is a chance the player could or could not hit their prop. Go as far left or right as you wish based on the data."
+        f"{response_format_instructions()}"
+        "For the reasons, please provide detailed insights like:\n"
+        "- How the opposing team's defense ranks in points allowed and how it impacts the player's performance.\n"
+        "- The player's consistency in scoring above the prop line in past encounters with the opposing team.\n"
+        "- The player's role in their team and how it affects their scoring opportunities.\n"
+        "- The player's recent performance trends over the last 5 games.\n\n"
+        "Additionally, consider the following factors:\n"
+        "- **Injury Impact**: Highlight how injuries to key players (e.g., Azura Stevens being out) affect player performance and team dynamics.\n"
+        "- **Playoff Implications**: Consider teams' playoff standings and urgency. Teams need 7 wins to clinch.\n"
+        "- **Team Records and Playoff Scenarios**: Incorporate the current standings and playoff implications into the analysis.\n\n"
+        "Example content for the reasons (make sure it's for the proper stat, not just points. Use what is necessary):\n"
+        "Reason 1 (Performance Against Opposing Team): {opposing_team} allowed {points_allowed} points this season. On top of this, {player_name} has scored above the prop line consistently in each of their past encounters with {opposing_team}, averaging {average_points_against_opponent} points per game. This suggests a favorable matchup for {player_name}.\n"
+        "Reason 2 (Scoring Trends - Clutch Performance in Critical Moments, Hot/Cold Streaks): {player_name} has shown a tendency to elevate their game in critical moments, particularly in the second half. In their last three games, they have had strong fourth-quarter performances, including an 8-point burst in one game and multiple three-pointers in another. This indicates they have the potential to exceed the prop line, especially if the game is close.\n"
+        "Reason 3 (Opposing Team's Defensive Weaknesses): {opposing_team} is missing key players like {injured_player} due to injuries, which could weaken their perimeter defense and rebounding. {player_name}'s strength in three-point shooting ({three_point_percentage}% against {opposing_team}) could be even more effective against a depleted defense. Additionally, {opposing_team}'s defensive rebounding may suffer without {injured_player}, potentially giving {player_name} more opportunities for second-chance points or open looks.\n"
+        "Reason 4 (Recent Performance - Last 5 Games): Over their last five games, {player_name} has averaged approximately {average_points_last_5} points per game, slightly below the prop line. However, they have shown the ability to exceed {player_prop} points in key games, such as their {best_game_points}-point performance against {opposing_team} and an 8-point burst in the fourth quarter of another game. Their recent trend of strong second-half performances suggests they could hit the over if they maintain their rhythm and take advantage of {opposing_team}'s defensive vulnerabilities.\n"
+        "Final Conclusion: While {player_name}'s recent scoring average ({average_points_last_5} points) is slightly below the prop line, their ability to perform in clutch moments, their strong three-point shooting, and {opposing_team}'s defensive weaknesses due to injuries make the over a reasonable bet. Their inconsistency in the first half is a concern, but their tendency to elevate their game in critical moments and their recent performances against {opposing_team} provide enough confidence to lean toward the over. Confidence level: {confidence_level}."
+    )
+
+@traced("final_evaluation")
+async def calculate_final_confidence_level(session, player_name, player_team, past_performance_analysis, player_prop, opposing_team, injury_reports, stat_type):
+    # Fetch player data from Firebase
+    player_ref = db.collection("players").document(player_name)
+    player_stats = player_cache.player(player_name) or {}
+
+    headers = {
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+        "Content-Type": "application/json"
     }
 
+    team_stats = player_cache.team(player_team)
+
+    # Recent games and the matchup history come from the materialized features in one
+    # lookup; the game-log queries are the fallback for players not in the store yet
+    features = player_cache.features(player_name)
+    if features:
+        recent_rows = features["recent"]
+        matchup_rows = next((opponent["history"] for team, opponent in features["opponents"].items()
+                             if team.lower() == opposing_team.lower()), [])
+    else:
+        recent_rows = last_n_games(player_name, 5)
+        matchup_rows = games_vs_opponent(player_name, opposing_team)
+
+    with span("build_prompt"):
+        messages = [{
+            "role": "user",
+            "content": final_evaluation_prompt(player_name, player_team, opposing_team, player_prop, stat_type, past_performance_analysis,
+                                               injury_reports, player_stats, team_stats, recent_rows, matchup_rows)
+        }]
+
+    analysis_results_ref = player_ref.collection("analysis_results").document(f"{stat_type.lower()}_latest")
+
+    early_writes = []
+
+    def publish_early_confidence(field, value):
+        # The dashboard can show the lean while the reasons are still streaming; the final
+        # write below replaces the whole doc, and freshness ignores these fields. The write
+        # runs in a thread so the stream keeps being read.
+        if field == "confidence_level":
+            early_writes.append(asyncio.create_task(asyncio.to_thread(
+                analysis_results_ref.set, {"partial_confidence_level": value, "partial_at": datetime.now().isoformat()}, merge=True
+            )))
+
+    async def finish_early_writes(failed):
+        """Wait for the early writes, and clear their fields when no analysis will be saved."""
+        if not early_writes:
+            return
+        for outcome in await asyncio.gather(*early_writes, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                print(f"Error publishing early confidence for {player_name} ({stat_type}): {outcome}", file=sys.stderr)
+        if failed:
+            await asyncio.to_thread(analysis_results_ref.set, {"partial_confidence_level": None, "partial_at": None}, merge=True)
+
+    timeout = aiohttp.ClientTimeout(total=180)
     try:
-        timeout = aiohttp.ClientTimeout(total=180)  # 120-second timeout
-        async with session.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=timeout) as response:
-            if response.status == 200:
-                result = await response.json()
-                if result and "choices" in result and len(result["choices"]) > 0:
-                    response_content = result["choices"][0]["message"]["content"]
-
-                    # Parse the response
-                    confidence_level = None
-                    reasons = []
-                    final_conclusion = None
-
-                    # Split the response into lines
-                    lines = response_content.split("\n")
-
-                    # Iterate through the lines to extract data
-                    i = 0
-                    while i < len(lines):
-                        line = lines[i].strip()
-                        if line.startswith("Confidence Level:"):
-                            # Clean the confidence level string by removing non-numeric characters
-                            confidence_str = line.split(":")[1].strip()
-                            confidence_str_cleaned = re.sub(r"[^0-9]", "", confidence_str)  # Remove non-numeric characters
-                            confidence_level = int(confidence_str_cleaned)  # Convert to integer
-                            i += 1
-                        elif line.startswith("Reason"):
-                            reason_text = []
-                            reason_part = line.split("):", 1)
-                            if len(reason_part) > 1:
-                                reason_text.append(reason_part[1].strip())
-                            i += 1
-                            reasons.append(" ".join(reason_text).strip())
-                        elif line.startswith("Final Conclusion:"):
-                            conclusion = []
-                            final = line.split(":", 1)
-                            if len(final) > 1:
-                                conclusion.append(final[1].strip())
-                            i += 1
-                            final_conclusion = "\n".join(conclusion).strip()
-                            break
-                        else:
-                            i += 1
-
-                    if confidence_level is not None and len(reasons) == 4 and final_conclusion is not None:
-                        # Save the results to Firebase under the "{stat_type}_latest" document
-                        analysis_results_ref = player_ref.collection("analysis_results").document(f"{stat_type.lower()}_latest")
-                        analysis_results_ref.set({
-                            "confidence_level": confidence_level,
-                            "reason_1": reasons[0],
-                            "reason_2": reasons[1],
-                            "reason_3": reasons[2],
-                            "reason_4": reasons[3],
-                            "final_conclusion": final_conclusion,
-                            "timestamp": datetime.now().isoformat()  # Add a timestamp
-                        })
-
-                        return {
-                            "confidence_level": confidence_level,
-                            "reasons": reasons,
-                            "final_conclusion": final_conclusion
-                        }
-                    else:
-                        print("Failed to parse DeepSeek response correctly.", file=sys.stderr)
-            else:
-                error_text = await response.text()
-                print(f"DeepSeek API Error {response.status}: {error_text}", file=sys.stderr)
-                raise RuntimeError(f"DeepSeek API Error {response.status}: {error_text}")
+        response_content = await _chat_completion(session, headers, messages, timeout, on_field=publish_early_confidence,
+                                                  stage="final_evaluation", player=player_name, stat_type=stat_type)
     except Exception as e:
         print(f"Error during DeepSeek API request for final analysis of {player_name}: {e}", file=sys.stderr)
-        raise  # Re-raise the exception to trigger retry
+        await finish_early_writes(failed=True)
+        return None
+    if response_content is None:
+        await finish_early_writes(failed=True)
+        return None
+
+    with span("parse_response"):
+        parsed = parse_final_evaluation(response_content)
+
+    # Re-ask for missing fields only instead of repeating the whole analysis
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        missing = missing_fields(parsed)
+        if not missing:
+            break
+        print(f"Repairing final analysis for {player_name} ({stat_type}); missing {missing}.", file=sys.stderr)
+        try:
+            repair_content = await _chat_completion(session, headers, [{"role": "user", "content": repair_prompt(missing, response_content)}], timeout,
+                                                    stage="final_evaluation_repair", player=player_name, stat_type=stat_type)
+        except Exception as e:
+            print(f"Error during repair request for {player_name}: {e}", file=sys.stderr)
+            break
+        repaired = parse_final_evaluation(repair_content or "")
+        parsed.update({field: value for field, value in repaired.items() if field in missing})
+
+    if missing_fields(parsed):
+        print(f"Failed to parse DeepSeek response correctly; missing {missing_fields(parsed)}.", file=sys.stderr)
+        await finish_early_writes(failed=True)
+        return None
+
+    reasons = [parsed["reason_1"], parsed["reason_2"], parsed["reason_3"], parsed["reason_4"]]
+
+    # Save the results to Firebase under the "{stat_type}_latest" document, after any early
+    # write so that one cannot land on top of it
+    await finish_early_writes(failed=False)
+    with span("save"):
+        analysis_results_ref.set({
+            "confidence_level": parsed["confidence_level"],
+            "reason_1": reasons[0],
+            "reason_2": reasons[1],
+            "reason_3": reasons[2],
+            "reason_4": reasons[3],
+            "final_conclusion": parsed["final_conclusion"],
+            "timestamp": datetime.now().isoformat()  # Add a timestamp
+        })
 
-    return None
\ No newline at end of file
+    return {
+        "confidence_level": parsed["confidence_level"],
+        "reasons": reasons,
+        "final_conclusion": parsed["final_conclusion"]
+    }
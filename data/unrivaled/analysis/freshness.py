@@ -0,0 +1,69 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Which props already have a recent analysis, loaded with one collection-group query at
+# run start. Fresh props are answered from the index and never enter the work queue.
+
+# Analyses newer than this are reused. Override with ANALYSIS_FRESHNESS_HOURS=6.
+FRESHNESS_WINDOW = timedelta(hours=float(os.getenv("ANALYSIS_FRESHNESS_HOURS", "3")))
+
+# Fallback decisions the scheduler stores when the LLM could not run in time or the token
+# budget was spent. They stand in for an analysis until the next run but are never reused as one.
+DEGRADED_SOURCES = {"fast_path_deadline", "fast_path_budget"}
+
+
+def load_freshness_index(db, window=FRESHNESS_WINDOW, now=None):
+    """
+    Read every recent `players/{name}/analysis_results/{stat}_latest` doc in one query.
+
+    Args:
+        db: The Firebase database connection object.
+        window (timedelta): How old an analysis may be and still count as fresh.
+        now (datetime): Reference time, defaults to datetime.now().
+
+    Returns:
+        dict: (player doc id, stat type lowercased) -> analysis doc, for analyses that
+        are inside the window, have a final conclusion and are not degraded fallbacks.
+    """
+    cutoff = ((now or datetime.now()) - window).isoformat()
+    # Timestamps are ISO strings, so the range filter compares them chronologically
+    query = db.collection_group("analysis_results").where("timestamp", ">=", cutoff)
+
+    index = {}
+    for doc in query.stream():
+        player_ref = doc.reference.parent.parent
+        # predict/ writes a root-level analysis_results collection and a plain `latest` doc
+        if player_ref is None or not doc.id.endswith("_latest"):
+            continue
+        analysis = doc.to_dict()
+        if not analysis.get("final_conclusion") or analysis.get("source") in DEGRADED_SOURCES:
+            continue
+        index[(player_ref.id, doc.id[:-len("_latest")])] = analysis
+    return index
+
+
+def split_fresh_props(enriched_data, index):
+    """
+    Separate props that already have a fresh analysis from those that need work.
+
+    Returns:
+        tuple: ({(name, stat_type): analysis} for fresh props, list of stale props).
+    """
+    fresh = {}
+    stale = []
+    for player in enriched_data:
+        player_name = player["player_data"]["name"]
+        stat_type = player["projection_data"]["stat_type"]
+        analysis = index.get((player_name.replace(" ", "_"), stat_type.lower()))
+        if analysis is None:
+            stale.append(player)
+            continue
+        fresh[(player_name, stat_type)] = {
+            "confidence_level": analysis.get("confidence_level"),
+            "reasons": [analysis[key] for key in ("reason_1", "reason_2", "reason_3", "reason_4") if analysis.get(key)],
+            "final_conclusion": analysis.get("final_conclusion")
+        }
+
+    print(f"Skipping {len(fresh)} of {len(enriched_data)} props that already have a fresh analysis.", file=sys.stderr)
+    return fresh, stale
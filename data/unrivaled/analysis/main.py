@@ -1,67 +1,109 @@
+import argparse
 import asyncio
 import aiohttp
 import json
 import sys
 from database.firebase import db
-from datetime import datetime, timedelta  # Import datetime for timestamp functionality
 from analysis.game_flow import analyze_game_flow
 from analysis.past_performance import analyze_past_performance
 from analysis.final_evaluation import calculate_final_confidence_level
+from analysis.fast_path import route_props
+from analysis.freshness import load_freshness_index, split_fresh_props
+from analysis.scheduler import run_scheduled
 from helpers.injury_reports import fetch_injury_reports
-from database.player_data import get_game_ids_for_player
+from analysis.features import feature_pool, player_game_flow_features, compact_play
+from database.player_data import get_game_ids_for_player, fetch_plays_for_player, player_cache
+from helpers.tracing import tracer, span, traced
+from helpers.profiling import add_profile_argument, start_profiling
 
 semaphore = asyncio.Semaphore(4)
 
-async def analyze_player(player):
+def group_props_by_player(props):
+    """One list of props per player, so shared data is fetched once per player."""
+    groups = {}
+    for player in props:
+        groups.setdefault(player["player_data"]["name"], []).append(player)
+    return list(groups.values())
+
+def split_inactive_props(props, injury_reports):
+    """
+    Separate props of players the injury report rules out from the rest.
+
+    Returns:
+        tuple: ({(name, stat_type): reason} for inactive players' props, list of other props).
+    """
+    inactive = {}
+    active = []
+    for player in props:
+        report = injury_reports.inactive(player["player_data"]["name"])
+        if report is None:
+            active.append(player)
+            continue
+        inactive[(player["player_data"]["name"], player["projection_data"]["stat_type"])] = \
+            f"Not analysed: {report['player']} is {report['status']} ({report['injury']})."
+    if inactive:
+        print(f"Skipping {len(inactive)} props of players listed as out.", file=sys.stderr)
+    return inactive, active
+
+async def build_player_context(session, props, injury_reports):
+    """
+    Fetch and featurize everything a player's props share: game ids, game-flow
+    features, the past performance analysis against the opponent and the injury
+    reports. Features for games that still need a game-flow prompt are computed in
+    the feature pool while the past performance request is in flight.
+    """
+    player = props[0]
+    player_name = player["player_data"]["name"].replace(" ", "_")
+    opposing_team = player["projection_data"]["description"]
+
+    with span("load_plays", player=player_name):
+        game_ids = get_game_ids_for_player(player_name)
+        if not game_ids:
+            print(f"No games found for player: {player_name}", file=sys.stderr)
+            return None
+
+        analysis_fields = {f"{prop['projection_data']['stat_type'].lower()}_analysis" for prop in props}
+        pending_games = [game_id for game_id in game_ids
+                         if not analysis_fields <= set(player_cache.game_stats(player_name, game_id) or {})]
+        inputs = {
+            "player_name": player_name,
+            "plays": {game_id: [compact_play(play) for play in fetch_plays_for_player(game_id, player_name)] for game_id in pending_games},
+        }
+    game_features = asyncio.ensure_future(traced("features", player=player_name)(feature_pool.run)(player_game_flow_features, inputs))
+
+    try:
+        async with semaphore:
+            # The same for every stat type
+            past_performance_analysis = await analyze_past_performance(session, player_name, opposing_team)
+    finally:
+        game_features = await game_features
+
+    return {
+        "game_ids": game_ids,
+        "game_features": game_features,
+        "past_performance_analysis": past_performance_analysis,
+        "injury_reports": injury_reports,
+    }
+
+async def analyze_player(player, context, session):
     async with semaphore:
         player_name = player["player_data"]["name"].replace(" ", "_")
         player_team = player["player_data"]["team"]
         opposing_team = player["projection_data"]["description"]
         player_prop = player["projection_data"]["line_score"]
         stat_type = player["projection_data"]["stat_type"]  # Get the stat type from projection data
-        
-        # Fetch player data from Firebase
-        player_ref = db.collection("players").document(player_name)
-
-        # Check if there's already an analysis for this player and stat type
-        analysis_results_ref = player_ref.collection("analysis_results").document(f"{stat_type.lower()}_latest")
-        latest_analysis = analysis_results_ref.get().to_dict()
-
-        if latest_analysis:
-            # Get the timestamp of the latest analysis
-            analysis_timestamp = latest_analysis.get("timestamp", None)
-            if analysis_timestamp:
-                # Convert the timestamp to a datetime object
-                analysis_date = datetime.fromisoformat(analysis_timestamp)
-                # Get the current date
-                current_date = datetime.now()
-
-                time_difference = current_date - analysis_date
-                # Check if the analysis is from the last 3 hours
-                if time_difference < timedelta(hours=3):
-                    print(f"Skipping {player_name} ({stat_type}) - Analysis already exists within the last 3 hours.", file=sys.stderr)
-                    return None  # Skip this player
-                
-        if not player_team:
-            print(f"No team found for player: {player_name}", file=sys.stderr)
-            return None
 
-        game_ids = get_game_ids_for_player(player_name)
-        if not game_ids:
-            print(f"No games found for player: {player_name}", file=sys.stderr)
-            return None
-
-        async with aiohttp.ClientSession() as session:
+        with span("prop", player=player_name, stat_type=stat_type):
             try:
                 # Process game flow analyses sequentially
                 game_flow_analyses = []
-                for game_id in game_ids:
-                    game_flow_analysis = await analyze_game_flow(session, player_name, game_id, stat_type)
+                for game_id in context["game_ids"]:
+                    with span("game", player=player_name, game_id=game_id, stat_type=stat_type):
+                        game_flow_analysis = await analyze_game_flow(session, player_name, game_id, stat_type, context["game_features"])
                     game_flow_analyses.append(game_flow_analysis)
 
-                # Analyze past performance
-                past_performance_analysis = await analyze_past_performance(session, player_name, opposing_team)
-                injury_reports = fetch_injury_reports()  # Doesn't need async
+                past_performance_analysis = context["past_performance_analysis"]
+                injury_reports = context["injury_reports"]
 
                 # Log inputs for debugging
                 print(f"Inputs for {player_name} ({stat_type}):")
@@ -86,22 +128,68 @@ async def analyze_player(player):
                 print(f"Error analyzing player {player_name} ({stat_type}): {e}", file=sys.stderr)
                 return None
 
+async def analyze_player_props(props, injury_reports):
+    """
+    Analyze all of one player's props: the shared context is built once and the
+    stat-specific game-flow and final prompts fan out from it.
+
+    Returns:
+        list: One analysis (or None) per prop.
+    """
+    player = props[0]
+    player_name = player["player_data"]["name"].replace(" ", "_")
+    if not player["player_data"]["team"]:
+        print(f"No team found for player: {player_name}", file=sys.stderr)
+        return [None] * len(props)
+
+    async with aiohttp.ClientSession() as session:
+        try:
+            context = await build_player_context(session, props, injury_reports)
+        except Exception as e:
+            print(f"Error building context for player {player_name}: {e}", file=sys.stderr)
+            return [None] * len(props)
+        if context is None:
+            return [None] * len(props)
+        return await asyncio.gather(*(analyze_player(prop, context, session) for prop in props))
+
 async def main():
     """
     Main function to analyze all players asynchronously.
     """
-    prop_lines_ref = db.collection("prop_lines").stream()
-    enriched_data = [{"player_data": doc.to_dict().get("player_data", {}), "projection_data": doc.to_dict().get("projection_data", {})} for doc in prop_lines_ref]
-    
-    # Create a list of tasks for analyzing each player and stat type asynchronously
-    tasks = [analyze_player(player) for player in enriched_data]
-
-    # Run all tasks concurrently using asyncio.gather
-    results = await asyncio.gather(*tasks)
+    # Player docs, game logs and play-by-play are read once per run unless an ingest ran since
+    player_cache.refresh_if_stale()
+
+    with span("load_props"):
+        prop_lines_ref = db.collection("prop_lines").stream()
+        enriched_data = [{"player_data": doc.to_dict().get("player_data", {}), "projection_data": doc.to_dict().get("projection_data", {})} for doc in prop_lines_ref]
+
+    # Injury reports are the same for every prop; players ruled out are dropped before any other work
+    with span("injury_reports"):
+        injury_reports = fetch_injury_reports()
+        inactive_results, enriched_data = split_inactive_props(enriched_data, injury_reports)
+
+    # One collection-group read decides which props already have a recent analysis
+    with span("freshness"):
+        fresh_results, stale_props = split_fresh_props(enriched_data, load_freshness_index(db))
+
+    # Decide clear-cut props from the game logs; only uncertain ones go to DeepSeek
+    with span("fast_path"):
+        fast_path_results, llm_props = route_props(db, stale_props)
+
+    # Work the remaining props player by player, earliest tip-off first, degrading to
+    # the fast path when a deadline is at risk
+    groups = group_props_by_player(llm_props)
+    try:
+        with span("analyze", props=len(llm_props)):
+            group_results, _ = await run_scheduled(db, groups, lambda props: analyze_player_props(props, injury_reports))
+    finally:
+        feature_pool.shutdown()
 
     # Map results to player names and stat types
     output = {}
-    for player, result in zip(enriched_data, results):
+    for (player_name, stat_type), result in list(inactive_results.items()) + list(fresh_results.items()) + list(fast_path_results.items()):
+        output.setdefault(player_name, {})[stat_type] = {"analysis": result}
+    for player, result in zip([prop for group in groups for prop in group], [result for results in group_results for result in results]):
         player_name = player["player_data"]["name"]
         stat_type = player["projection_data"]["stat_type"]
         if player_name not in output:
@@ -118,4 +206,9 @@ async def test_single_request():
         print(result)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyse every prop in prop_lines.")
+    add_profile_argument(parser)
+    start_profiling(parser.parse_args(), "analysis")
+    asyncio.run(main())
+    # TRACE_FILE set: print the slowest stages and props of this run
+    tracer.finish()
\ No newline at end of file
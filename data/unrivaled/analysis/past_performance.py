@@ -2,14 +2,10 @@ import aiohttp
 import sys
 from database.player_data import get_past_performance_against_opponent
 from database.firebase import DEEPSEEK_API_KEY, DEEPSEEK_MODEL, DEEPSEEK_API_URL
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-
-@retry(
-    stop=stop_after_attempt(3),  # Retry 3 times
-    wait=wait_exponential(multiplier=1, min=4, max=10),  # Exponential backoff
-    retry=retry_if_exception_type(Exception),  # Retry on any exception
-)
+from helpers.llm_http import post_chat_completion, completion_text
+from helpers.tracing import traced
 
+@traced("past_performance")
 async def analyze_past_performance(session, player_name, opposing_team):
     """
     Analyze past performance against a specific opposing team using DeepSeek API.
@@ -43,14 +39,9 @@ async def analyze_past_performance(session, player_name, opposing_team):
     }
 
     try:
-        async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-            if response.status == 200:
-                result = await response.json()
-                if result and "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-            else:
-                print(f"Failed to get analysis from DeepSeek API for past performance analysis of {player_name} against {opposing_team}. Status: {response.status}", file=sys.stderr)
-                return f"Error analyzing past performance for {player_name} against {opposing_team}."
+        # Transport failures are retried at the request layer
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, stage="past_performance", player=player_name)
+        return completion_text(result)
     except Exception as e:
         print(f"Error during DeepSeek API request for past performance analysis of {player_name} against {opposing_team}: {e}", file=sys.stderr)
         return f"Error analyzing past performance for {player_name} against {opposing_team}."
\ No newline at end of file
@@ -0,0 +1,194 @@
+import math
+import numpy as np
+
+# Exact points distribution for a player's next game, built from shot-type make-count
+# PMFs. Unrivaled scoring: field goals are worth 2 or 3 and each free throw is a single
+# shot worth 1, 2 or 3 points (the value of the shot that was fouled).
+
+# Share of made free throws worth 1/2/3 points across the bundled play-by-play
+# ("makes free throw (1pt.)" etc.), used when a player has no free-throw history.
+LEAGUE_FT_VALUE_WEIGHTS = (0.25, 0.73, 0.02)
+
+
+def binomial_pmf(n, p):
+    """
+    PMF of the number of makes from n attempts at make probability p.
+
+    Returns:
+        np.ndarray: Array of length n + 1 where entry k is P(k makes).
+    """
+    pmf = np.zeros(n + 1)
+    if p <= 0:
+        pmf[0] = 1.0
+    elif p >= 1:
+        pmf[n] = 1.0
+    else:
+        k = np.arange(1, n + 1)
+        # C(n, k) p^k (1-p)^(n-k) built as a running product of term ratios
+        ratios = (n - k + 1) / k * (p / (1 - p))
+        pmf[0] = 1.0
+        pmf[1:] = np.cumprod(ratios)
+        pmf *= (1 - p) ** n
+    return pmf
+
+
+def _scale_points(make_pmf, value):
+    """Spread a make-count PMF onto the points axis (k makes -> value * k points)."""
+    points_pmf = np.zeros(value * (len(make_pmf) - 1) + 1)
+    points_pmf[::value] = make_pmf
+    return points_pmf
+
+
+def free_throw_points_pmf(n, p, value_weights):
+    """PMF of free-throw points from n single-shot attempts worth 1, 2 or 3."""
+    per_attempt = np.array([1 - p, p * value_weights[0], p * value_weights[1], p * value_weights[2]])
+    pmf = np.array([1.0])
+    for _ in range(n):
+        pmf = np.convolve(pmf, per_attempt)
+    return pmf
+
+
+def points_pmf(profile):
+    """
+    Full points PMF for one shooting profile (see shooting_profile).
+
+    Returns:
+        np.ndarray: Entry i is P(points == i).
+    """
+    two_pmf = _scale_points(binomial_pmf(profile["two_pt_a"], profile["p_2pt"]), 2)
+    three_pmf = _scale_points(binomial_pmf(profile["three_pt_a"], profile["p_3pt"]), 3)
+    ft_pmf = free_throw_points_pmf(profile["ft_a"], profile["p_ft"], profile["ft_value_weights"])
+    return np.convolve(np.convolve(two_pmf, three_pmf), ft_pmf)
+
+
+def _ft_value_weights(ft_points, ft_made):
+    """
+    Mix of 1/2/3-point free throws matching a player's average value per make.
+    Box scores only give the average, so it is split between the two nearest values.
+    """
+    if ft_made <= 0:
+        return LEAGUE_FT_VALUE_WEIGHTS
+    mean_value = min(3.0, max(1.0, ft_points / ft_made))
+    low = math.floor(mean_value)
+    weights = [0.0, 0.0, 0.0]
+    if low >= 3:
+        weights[2] = 1.0
+    else:
+        weights[low - 1] = low + 1 - mean_value
+        weights[low] = mean_value - low
+    return tuple(weights)
+
+
+def shooting_profile(game_logs):
+    """
+    Build a shooting profile from a player's game stat documents.
+
+    Args:
+        game_logs (list): Game stat dicts from `players/{name}/games` (fg_m, fg_a,
+            three_pt_m, three_pt_a, ft_m, ft_a, pts).
+
+    Returns:
+        dict: Make probabilities and average attempts per game for 2PT, 3PT and FT,
+        plus the free-throw value weights, or None if the player has no attempts.
+    """
+    games = [game for game in game_logs if float(game.get("fg_a", 0) or 0) + float(game.get("ft_a", 0) or 0) > 0]
+    totals = {field: sum(float(game.get(field, 0) or 0) for game in games)
+              for field in ("fg_m", "fg_a", "three_pt_m", "three_pt_a", "ft_m", "ft_a", "pts")}
+    return profile_from_totals(totals, len(games))
+
+
+def profile_from_totals(totals, games):
+    """
+    Shooting profile from season totals over the `games` the player took a shot in
+    (the running sums kept in player_features).
+    """
+    if not games:
+        return None
+    # FG totals include threes, so two-pointers are the difference
+    two_pt_m = totals["fg_m"] - totals["three_pt_m"]
+    two_pt_a = totals["fg_a"] - totals["three_pt_a"]
+    ft_points = totals["pts"] - 2 * two_pt_m - 3 * totals["three_pt_m"]
+
+    return {
+        "p_2pt": two_pt_m / two_pt_a if two_pt_a > 0 else 0.0,
+        "p_3pt": totals["three_pt_m"] / totals["three_pt_a"] if totals["three_pt_a"] > 0 else 0.0,
+        "p_ft": totals["ft_m"] / totals["ft_a"] if totals["ft_a"] > 0 else 0.0,
+        "two_pt_a": int(round(two_pt_a / games)),
+        "three_pt_a": int(round(totals["three_pt_a"] / games)),
+        "ft_a": int(round(totals["ft_a"] / games)),
+        "ft_value_weights": _ft_value_weights(ft_points, totals["ft_m"]),
+    }
+
+
+def load_shooting_profiles(player_names, cache):
+    """
+    Build a shooting profile per player from their materialized features, reading
+    the game log only for players not in the feature store yet. Both go through the
+    run's cache, so later stages reuse the same docs.
+
+    Args:
+        player_names (iterable): Player names (spaces or underscores).
+        cache (PlayerDataCache): The run-scoped cache (database/cache.py).
+
+    Returns:
+        dict: Player name -> shooting profile (None when no data is available).
+    """
+    profiles = {}
+    for player_name in player_names:
+        if player_name in profiles:
+            continue
+        features = cache.features(player_name)
+        if features:
+            profiles[player_name] = profile_from_totals(features["totals"], features["shooting_games"])
+            continue
+        profiles[player_name] = shooting_profile(list(cache.game_log(player_name).values()))
+    return profiles
+
+
+def points_probabilities(profiles, lines):
+    """
+    P(points >= line) for a batch of props in one vectorized lookup.
+
+    Args:
+        profiles (list): Shooting profile per prop (None for no data).
+        lines (list): Prop line per prop.
+
+    Returns:
+        np.ndarray: Probability per prop; 0.5 where no profile is available.
+    """
+    # Props for the same player share one PMF
+    pmfs = {}
+    for profile in profiles:
+        if profile is not None and id(profile) not in pmfs:
+            pmfs[id(profile)] = points_pmf(profile)
+
+    width = max((len(pmf) for pmf in pmfs.values()), default=1) + 1
+    survival = np.zeros((len(profiles), width))
+    has_profile = np.zeros(len(profiles), dtype=bool)
+    for row, profile in enumerate(profiles):
+        if profile is None:
+            continue
+        pmf = pmfs[id(profile)]
+        # survival[row, i] = P(points >= i)
+        survival[row, :len(pmf)] = np.cumsum(pmf[::-1])[::-1]
+        has_profile[row] = True
+
+    thresholds = np.clip(np.ceil(np.asarray(lines, dtype=float)).astype(int), 0, width - 1)
+    probabilities = survival[np.arange(len(profiles)), thresholds]
+    return np.where(has_profile, np.clip(probabilities, 0.0, 1.0), 0.5)
+
+
+def estimate_points_probabilities(props, cache):
+    """
+    Estimate P(points >= line) for every (player_name, line) prop in a slate.
+
+    Args:
+        props (list): (player_name, line) tuples.
+        cache (PlayerDataCache): The run-scoped cache (database/cache.py).
+
+    Returns:
+        dict: (player_name, line) -> probability.
+    """
+    profiles = load_shooting_profiles([player_name for player_name, _ in props], cache)
+    probabilities = points_probabilities([profiles[player_name] for player_name, _ in props], [line for _, line in props])
+    return {prop: float(probability) for prop, probability in zip(props, probabilities)}
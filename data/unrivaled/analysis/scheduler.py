@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from analysis.fast_path import evaluate_prop, save_fast_path_result
+from database.player_data import player_cache
+from helpers.llm_ledger import ledger
+
+# Deadline-aware dispatch for the LLM stage. Players' prop groups are worked earliest tip-off first.
+# Each prop's cost is estimated from past props (per stat type, kept in `meta/prop_costs`);
+# when a prop can no longer finish before its deadline it is decided by the statistical
+# fast path instead, and any prop that still finishes late is reported. Once the slate's
+# LLM token budget is spent (LLM_TOKEN_BUDGET) the remaining props take the fast path too.
+
+# Analysis must be stored this long before start_time. Override with PROP_DEADLINE_MARGIN_MINUTES=30.
+DEADLINE_MARGIN = timedelta(minutes=float(os.getenv("PROP_DEADLINE_MARGIN_MINUTES", "15")))
+# Cost assumed for a stat type with no history yet
+DEFAULT_PROP_SECONDS = float(os.getenv("DEFAULT_PROP_SECONDS", "60"))
+# Weight of the latest run in the per-stat-type moving average
+COST_SMOOTHING = 0.3
+
+COST_HISTORY_DOC = ("meta", "prop_costs")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def prop_deadline(player, margin=DEADLINE_MARGIN):
+    """The time a prop's analysis is due (start_time minus the margin), or None if unknown."""
+    start_time = player["projection_data"].get("start_time")
+    if not start_time:
+        return None
+    try:
+        start = datetime.fromisoformat(start_time)
+    except ValueError:
+        return None
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start - margin
+
+
+def load_cost_history(db):
+    """Average seconds per prop by stat type from previous runs."""
+    doc = db.collection(COST_HISTORY_DOC[0]).document(COST_HISTORY_DOC[1]).get()
+    return doc.to_dict() if doc.exists else {}
+
+
+def record_cost(history, stat_type, seconds):
+    """Fold a finished prop's duration into its stat type's moving average."""
+    previous = history.get(stat_type)
+    history[stat_type] = seconds if previous is None else (1 - COST_SMOOTHING) * previous + COST_SMOOTHING * seconds
+
+
+def save_cost_history(db, history):
+    db.collection(COST_HISTORY_DOC[0]).document(COST_HISTORY_DOC[1]).set(history)
+
+
+def estimate_cost(group, history):
+    """A player's props fan out concurrently, so the group costs about its slowest stat type."""
+    return max(history.get(player["projection_data"]["stat_type"], DEFAULT_PROP_SECONDS) for player in group)
+
+
+def degrade_to_fast_path(db, player, source="fast_path_deadline"):
+    """
+    Decide a prop from its game log regardless of the uncertainty band. The result is
+    stored with `source` set, and the freshness index skips it (DEGRADED_SOURCES), so the
+    next run still gives the prop a full analysis.
+
+    Returns:
+        dict: The stored analysis, or None if the player has no usable game log.
+    """
+    player_name = player["player_data"]["name"].replace(" ", "_")
+    stat_type = player["projection_data"]["stat_type"]
+    line = player["projection_data"]["line_score"]
+    game_logs = list(player_cache.game_log(player_name).values())
+    result = evaluate_prop(game_logs, stat_type, line, band=(0.5, 0.5), min_games=1)
+    if result["decision"] is None:
+        return None
+    player_ref = db.collection("players").document(player_name)
+    return save_fast_path_result(player_ref, stat_type, line, result, source=source)
+
+
+async def run_scheduled(db, groups, analyze, concurrency=4):
+    """
+    Run `analyze(group)` over groups of props (one group per player), earliest deadline first.
+
+    Before a group is started its projected finish (now + estimated cost) is checked
+    against its deadline; props that would miss it are degraded to the fast path and
+    the rest of the group still runs. When the token budget is spent, every prop not yet
+    started is degraded.
+
+    Args:
+        db: The Firebase database connection object.
+        groups (list): Lists of prop dicts with `player_data` and `projection_data`.
+        analyze (callable): Coroutine function running the full pipeline for a group,
+            returning one result per prop.
+        concurrency (int): Number of groups worked at once.
+
+    Returns:
+        tuple: (per-group result lists in the order of `groups`, report dict with
+        `degraded`, `over_budget` and `missed` props).
+    """
+    history = load_cost_history(db)
+    far_future = datetime.max.replace(tzinfo=timezone.utc)
+    queue = []
+    for index, group in enumerate(groups):
+        deadlines = [prop_deadline(player) for player in group]
+        heapq.heappush(queue, (min((deadline for deadline in deadlines if deadline), default=far_future), index))
+
+    results = [[None] * len(group) for group in groups]
+    report = {"degraded": [], "over_budget": [], "missed": []}
+
+    def describe(player, deadline):
+        return {
+            "player": player["player_data"]["name"],
+            "stat_type": player["projection_data"]["stat_type"],
+            "deadline": deadline.isoformat() if deadline != far_future else None,
+        }
+
+    async def worker():
+        while queue:
+            deadline, index = heapq.heappop(queue)
+            group = groups[index]
+            pending = list(range(len(group)))
+            if await asyncio.to_thread(ledger.budget_exhausted):
+                for position in list(pending):
+                    degraded = degrade_to_fast_path(db, group[position], source="fast_path_budget")
+                    if degraded is not None:
+                        results[index][position] = degraded
+                        report["over_budget"].append(describe(group[position], deadline))
+                        pending.remove(position)
+                continue
+            projected_finish = _now() + timedelta(seconds=estimate_cost(group, history))
+            if projected_finish > deadline:
+                for position in list(pending):
+                    degraded = degrade_to_fast_path(db, group[position])
+                    if degraded is not None:
+                        print(f"⏱ {group[position]['player_data']['name']} ({group[position]['projection_data']['stat_type']}) would miss its deadline; using the fast path.", file=sys.stderr)
+                        results[index][position] = degraded
+                        report["degraded"].append(describe(group[position], deadline))
+                        pending.remove(position)
+            if not pending:
+                continue
+
+            started = time.perf_counter()
+            group_results = await analyze([group[position] for position in pending])
+            elapsed = time.perf_counter() - started
+            for position, result in zip(pending, group_results):
+                results[index][position] = result
+                # Later decisions in this run already use the updated estimate
+                record_cost(history, group[position]["projection_data"]["stat_type"], elapsed)
+                if _now() > deadline:
+                    report["missed"].append(describe(group[position], deadline))
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(groups)))))
+
+    save_cost_history(db, history)
+    if report["degraded"]:
+        print(f"Degraded {len(report['degraded'])} props to the fast path to meet their deadlines.", file=sys.stderr)
+    if report["over_budget"]:
+        print(f"LLM token budget spent ({ledger.slate_tokens()} of {ledger.budget}); {len(report['over_budget'])} props took the fast path.", file=sys.stderr)
+    for missed in report["missed"]:
+        print(f"❌ Missed deadline {missed['deadline']} for {missed['player']} ({missed['stat_type']}).", file=sys.stderr)
+    return results, report
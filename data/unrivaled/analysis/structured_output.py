@@ -0,0 +1,190 @@
+import json
+import re
+
+# Structured replies for the final evaluation. DeepSeek is asked for a JSON object
+# (response_format json_object) matching FINAL_EVALUATION_SCHEMA; the parser below also
+# accepts fenced JSON and the older "Confidence Level: ..." line format, and reports which
+# fields are still missing so only those are re-asked. When the reply is streamed,
+# IncrementalFieldParser surfaces each field as soon as its value is complete.
+
+REASON_LABELS = {
+    "reason_1": "Performance Against Opposing Team",
+    "reason_2": "Scoring Trends - Clutch Performance in Critical Moments, Hot/Cold Streaks",
+    "reason_3": "Opposing Team's Defensive Weaknesses",
+    "reason_4": "Recent Performance - Last 5 Games",
+}
+
+FINAL_EVALUATION_FIELDS = ("confidence_level", "reason_1", "reason_2", "reason_3", "reason_4", "final_conclusion")
+
+FINAL_EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "confidence_level": {"type": "integer", "minimum": 0, "maximum": 100},
+        **{field: {"type": "string", "description": label} for field, label in REASON_LABELS.items()},
+        "final_conclusion": {"type": "string"},
+    },
+    "required": list(FINAL_EVALUATION_FIELDS),
+}
+
+# "Confidence Level: 80", "**Reason 2 (Scoring Trends ...):** text", "Final Conclusion - text"
+LINE_PATTERN = re.compile(r"^[\W_]*(confidence level|reason\s*(\d)|final conclusion)\b[^:]*[:\-]\s*(.*)$", re.IGNORECASE)
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+# A complete `"field": value` pair in a partial JSON reply; numbers need a following delimiter
+STREAM_FIELD_PATTERN = re.compile(
+    r'"(%s)"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?=\s*[,}])|null(?=\s*[,}]))' % "|".join(FINAL_EVALUATION_FIELDS)
+)
+# "Confidence Level: 80" followed by the end of its line
+STREAM_CONFIDENCE_LINE = re.compile(r"confidence level\b[^:\n]*[:\-]\s*(\d+(?:\.\d+)?)[^\n]*\n", re.IGNORECASE)
+
+
+def response_format_instructions():
+    """The output-format section of the final evaluation prompt."""
+    example = {
+        "confidence_level": "<integer 0-100>",
+        **{field: f"<{label}>" for field, label in REASON_LABELS.items()},
+        "final_conclusion": "<final_conclusion>",
+    }
+    return (
+        "Respond with a single JSON object and nothing else, matching this JSON schema:\n"
+        f"{json.dumps(FINAL_EVALUATION_SCHEMA)}\n"
+        "For example:\n"
+        f"{json.dumps(example, indent=2)}\n\n"
+    )
+
+
+def _extract_json(content):
+    text = content.strip()
+    fence = FENCE_PATTERN.search(text)
+    if fence:
+        text = fence.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _parse_lines(content):
+    fields = {}
+    current = None
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        match = LINE_PATTERN.match(line)
+        if match:
+            label = match.group(1).lower()
+            if label.startswith("confidence"):
+                current = "confidence_level"
+            elif label.startswith("final"):
+                current = "final_conclusion"
+            else:
+                current = f"reason_{match.group(2)}"
+            fields[current] = match.group(3).strip(" *")
+        elif current and current != "confidence_level" and line:
+            # Reasons and conclusions sometimes wrap onto following lines
+            fields[current] = f"{fields[current]} {line}".strip()
+    return fields
+
+
+def _coerce_confidence(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = float(value)
+    else:
+        match = re.search(r"\d+(?:\.\d+)?", str(value))
+        if not match:
+            return None
+        number = float(match.group())
+    return max(0, min(100, int(round(number))))
+
+
+def parse_final_evaluation(content):
+    """
+    Extract the final evaluation fields from a reply, tolerating partial answers.
+
+    Args:
+        content (str): The model's reply (JSON object, fenced JSON or the line format).
+
+    Returns:
+        dict: The fields that could be read, a subset of FINAL_EVALUATION_FIELDS.
+    """
+    data = _extract_json(content or "")
+    if data is None:
+        fields = _parse_lines(content or "")
+    else:
+        fields = {field: data[field] for field in FINAL_EVALUATION_FIELDS if data.get(field) not in (None, "")}
+        if isinstance(data.get("reasons"), list):
+            for number, reason in enumerate(data["reasons"][:4], start=1):
+                fields.setdefault(f"reason_{number}", reason)
+        if data.get("confidence") is not None:
+            fields.setdefault("confidence_level", data["confidence"])
+
+    parsed = {}
+    for field, value in fields.items():
+        if field == "confidence_level":
+            confidence_level = _coerce_confidence(value)
+            if confidence_level is not None:
+                parsed[field] = confidence_level
+        elif str(value).strip():
+            parsed[field] = str(value).strip()
+    return parsed
+
+
+class IncrementalFieldParser:
+    """
+    Feed streamed text deltas and get back final-evaluation fields as they complete,
+    e.g. confidence_level long before the reasons have finished.
+
+    Only the text after the last complete field is kept for matching, so the work per
+    delta stays proportional to the field being streamed rather than the whole reply.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self._pending = ""
+
+    def feed(self, delta):
+        """
+        Args:
+            delta (str): The next piece of the reply.
+
+        Returns:
+            list: (field, value) pairs completed by this delta, in reply order.
+        """
+        self._pending += delta
+        completed = []
+        while True:
+            match = STREAM_FIELD_PATTERN.search(self._pending)
+            line_match = None if "confidence_level" in self.fields else STREAM_CONFIDENCE_LINE.search(self._pending)
+            if line_match and (match is None or line_match.start() < match.start()):
+                field, raw, end = "confidence_level", line_match.group(1), line_match.end()
+            elif match:
+                field, raw, end = match.group(1), json.loads(match.group(2)), match.end()
+            else:
+                break
+            self._pending = self._pending[end:]
+            if field in self.fields or raw in (None, ""):
+                continue
+            value = _coerce_confidence(raw) if field == "confidence_level" else str(raw).strip()
+            if value is None or value == "":
+                continue
+            self.fields[field] = value
+            completed.append((field, value))
+        return completed
+
+
+def missing_fields(parsed):
+    return [field for field in FINAL_EVALUATION_FIELDS if field not in parsed]
+
+
+def repair_prompt(missing, previous_reply):
+    """A short follow-up asking only for the fields the previous reply lacked."""
+    wanted = {field: "<integer 0-100>" if field == "confidence_level" else f"<{REASON_LABELS.get(field, field)}>"
+              for field in missing}
+    return (
+        "Your previous analysis is below. Some fields were missing or unreadable. "
+        "Return only the missing fields as a JSON object with exactly these keys, consistent with the analysis:\n"
+        f"{json.dumps(wanted, indent=2)}\n\n"
+        f"Previous analysis:\n{previous_reply}"
+    )
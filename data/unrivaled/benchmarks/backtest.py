@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Times analysis/backtest on a synthetic season. The bundled PrizePicks snapshot does not
+# overlap the bundled box scores, so lines are made from the outcomes: each player-game
+# gets a line per stat type at the player's prior average, rounded to a half point. The
+# season is replicated `--seasons` times (as distinct players) to size the run.
+#
+# Run from data/unrivaled:
+#   python -m benchmarks.backtest --seasons 100
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from analysis.backtest import (STAT_COLUMNS, attach_outcomes, decimal_odds, evaluate,  # noqa: E402
+                               load_outcomes, prior_average, prior_average_confidence)
+
+
+def replicate(outcomes, seasons):
+    """The outcomes repeated as `seasons` disjoint sets of players, still sorted by key."""
+    players = np.concatenate([np.char.add(outcomes["player"], f"~{season:04d}") for season in range(seasons)])
+    game_dates = np.tile(outcomes["game_date"], seasons)
+    keys = np.char.add(np.char.add(players, "|"), game_dates)
+    order = np.argsort(keys, kind="stable")
+    replicated = {"key": keys[order], "player": players[order], "game_date": game_dates[order]}
+    for field in ("min", "pts", "reb", "ast"):
+        replicated[field] = np.tile(outcomes[field], seasons)[order]
+    return replicated
+
+
+def synthetic_lines(outcomes):
+    """One line per played game and stat type at the player's prior average (x.5)."""
+    played = outcomes["min"] > 0
+    stat_types = np.repeat(np.array(list(STAT_COLUMNS)), np.count_nonzero(played))
+    lines = {
+        "player": np.tile(outcomes["player"][played], len(STAT_COLUMNS)),
+        "game_date": np.tile(outcomes["game_date"][played], len(STAT_COLUMNS)),
+        "stat_type": stat_types,
+        "opponent": np.full(len(stat_types), ""),
+    }
+    # First games have no prior average; give them a flat line
+    lines["line"] = np.floor(np.nan_to_num(prior_average(lines, outcomes), nan=10.0)) + 0.5
+    return lines
+
+
+def reference_units(props, confidence, odds):
+    """Per-prop loop with the same betting rules as evaluate, for checking its totals."""
+    hits = bets = 0
+    units = 0.0
+    for actual, line, conf in zip(props["actual"], props["line"], confidence):
+        if np.isnan(actual) or np.isnan(conf) or conf == 50:
+            continue
+        bets += 1
+        if actual == line:
+            continue
+        if (conf > 50) == (actual > line):
+            hits += 1
+            units += decimal_odds(odds) - 1
+        else:
+            units -= 1
+    return bets, hits, round(units, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized backtest on a synthetic season.")
+    parser.add_argument("--seasons", type=int, default=100, help="Copies of the bundled season to evaluate")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--odds", type=int, default=-110)
+    args = parser.parse_args()
+
+    outcomes = replicate(load_outcomes(os.path.join(DATA_DIR, "csv", "sql tables", "game_stats.csv")), args.seasons)
+    props = attach_outcomes(synthetic_lines(outcomes), outcomes)
+    print(f"{len(props['line'])} props over {len(outcomes['key'])} player-games")
+
+    def run():
+        return evaluate(props, prior_average_confidence(props, outcomes), args.odds)
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        report = run()
+        timings.append(time.perf_counter() - started)
+
+    expected = reference_units(props, prior_average_confidence(props, outcomes), args.odds)
+    overall = report["overall"]
+    matches = expected == (overall["bets"], overall["hits"], overall["units"])
+    print(f"overall: {overall}")
+    print(f"matches per-prop loop: {matches}")
+    print(f"model + evaluate: {min(timings) * 1000:.1f} ms (best of {args.repeat})")
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
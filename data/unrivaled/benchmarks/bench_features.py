@@ -0,0 +1,33 @@
+from helpers.streaks import analyze_streaks
+from analysis.features import (compact_play, game_flow_features_from_plays, player_play_breakdowns,
+                               player_scoring_breakdown, turnover_foul_analysis)
+
+
+def bench_analyze_streaks(benchmark, player_plays):
+    benchmark(lambda: [analyze_streaks(plays, player) for (_, player), plays in player_plays.items()])
+
+
+def bench_scoring_breakdown(benchmark, player_plays):
+    benchmark(lambda: [player_scoring_breakdown(plays) for plays in player_plays.values()])
+
+
+def bench_turnover_foul_analysis(benchmark, player_plays):
+    benchmark(lambda: [turnover_foul_analysis(plays) for plays in player_plays.values()])
+
+
+def bench_game_flow_features(benchmark, player_plays):
+    benchmark(lambda: [game_flow_features_from_plays(plays, player) for (_, player), plays in player_plays.items()])
+
+
+def bench_player_play_breakdowns(benchmark, player_plays, raw_plays):
+    # The predict stage's per-player bundle, computed inline (no process pool)
+    player_teams = {}
+    for plays in raw_plays.values():
+        for row in plays:
+            if row["player"] and row["team"]:
+                player_teams[row["player"].lower()] = row["team"]
+    inputs = {}
+    for (game_id, player), plays in player_plays.items():
+        bundle = inputs.setdefault(player, {"player_name": player, "player_teams": player_teams, "plays": {}})
+        bundle["plays"][game_id] = [compact_play(play) for play in plays]
+    benchmark(lambda: [player_play_breakdowns(bundle) for bundle in inputs.values()])
@@ -0,0 +1,31 @@
+import json
+import pytest
+from helpers.injury_reports import INJURY_REPORTS_PATH, fetch_injury_reports
+
+
+@pytest.fixture(scope="module")
+def matchups(enriched_players):
+    return [(player["Player Data"]["display_name"], player["Player Data"]["team"], player["Projection Data"]["description"])
+            for player in enriched_players]
+
+
+def bench_injury_reports_reparse_and_scan(benchmark, matchups):
+    # The old per-player path: open and parse the file, then scan every report lowercased
+    def scan():
+        for _, player_team, opposing_team in matchups:
+            with open(INJURY_REPORTS_PATH, "r") as f:
+                reports = json.load(f).get("injury_reports", [])
+            [report for report in reports
+             if report["team"].lower() == player_team.lower() or report["team"].lower() == opposing_team.lower()]
+
+    benchmark(scan)
+
+
+def bench_injury_reports_cached_lookup(benchmark, matchups):
+    def lookup():
+        for player_name, player_team, opposing_team in matchups:
+            reports = fetch_injury_reports()
+            reports.inactive(player_name)
+            reports.for_teams(player_team, opposing_team)
+
+    benchmark(lookup)
@@ -0,0 +1,28 @@
+from analysis.calculate_per import calculate_per, compute_league_average_uper, league_average, uper_from_totals
+from database.feature_store import read_features
+
+
+def bench_calculate_per(benchmark, db, player_names):
+    # Streams each player's game log
+    benchmark(lambda: [calculate_per(player_name, db) for player_name in player_names])
+
+
+def bench_uper_from_totals(benchmark, db, player_names):
+    # The incremental path: UPER from the materialized running totals
+    totals = [features["totals"] for features in (read_features(db, player_name) for player_name in player_names) if features]
+    benchmark(lambda: [uper_from_totals(player_totals) for player_totals in totals])
+
+
+def bench_league_average_full_scan(benchmark, db):
+    benchmark(compute_league_average_uper, db)
+
+
+def bench_league_average_incremental(benchmark, db, player_names):
+    upers = {}
+    for player_name in player_names:
+        features = read_features(db, player_name)
+        uper = uper_from_totals(features["totals"]) if features else None
+        if uper is not None:
+            upers[player_name] = uper
+    league = {"upers": upers, "total": sum(upers.values()), "count": len(upers)}
+    benchmark(league_average, league)
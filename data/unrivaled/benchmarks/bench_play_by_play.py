@@ -0,0 +1,43 @@
+import pytest
+from helpers.play_events import annotate_plays, parse_play
+from database.cache import PlayerDataCache
+from database.local_store import to_doc_id
+
+
+def bench_parse_play_descriptions(benchmark, raw_plays):
+    descriptions = [row["play_description"] for plays in raw_plays.values() for row in plays]
+    benchmark(lambda: [parse_play(description) for description in descriptions])
+
+
+def bench_annotate_plays(benchmark, raw_plays):
+    # annotate_plays works in place, so each round gets fresh copies of the rows
+    def fresh_games():
+        return ([[dict(row) for row in plays] for plays in raw_plays.values()],), {}
+
+    benchmark.pedantic(lambda games: [annotate_plays(plays) for plays in games], setup=fresh_games, rounds=20)
+
+
+def bench_extract_player_name(benchmark, raw_plays, db):
+    scraper = pytest.importorskip("unr_play_by_play_scrape")
+    # One game's descriptions; the scraper checks each against the players/ collection
+    descriptions = [row["play_description"] for row in next(iter(raw_plays.values()))]
+    benchmark(lambda: [scraper.extract_player_name(description, db) for description in descriptions])
+
+
+def bench_to_doc_id(benchmark, prop_names):
+    benchmark(lambda: [to_doc_id(name) for name in prop_names])
+
+
+def bench_resolve_player_name_cold(benchmark, db, prop_names):
+    # First lookup of a run streams the players/ collection
+    def resolve():
+        cache = PlayerDataCache(db)
+        return [cache.resolve_player_name(name) for name in prop_names]
+
+    benchmark(resolve)
+
+
+def bench_resolve_player_name_warm(benchmark, db, prop_names):
+    cache = PlayerDataCache(db)
+    cache.resolve_player_name(prop_names[0])
+    benchmark(lambda: [cache.resolve_player_name(name) for name in prop_names])
@@ -0,0 +1,26 @@
+import pytest
+from analysis.points_probability import estimate_points_probabilities, load_shooting_profiles, points_probabilities
+from database.cache import PlayerDataCache
+from database.local_store import to_doc_id
+
+
+@pytest.fixture(scope="module")
+def points_props(bets):
+    players = {item["id"]: item["attributes"]["display_name"] for item in bets["included"] if item["type"] == "new_player"}
+    return [
+        (to_doc_id(players[projection["relationships"]["new_player"]["data"]["id"]]), projection["attributes"]["line_score"])
+        for projection in bets["data"] if projection["attributes"]["stat_display_name"] == "Points"
+    ]
+
+
+def bench_estimate_points_probabilities(benchmark, db, points_props):
+    # A fresh cache per round, as each run starts with one
+    benchmark(lambda: estimate_points_probabilities(points_props, PlayerDataCache(db)))
+
+
+def bench_points_probabilities_vectorized(benchmark, db, points_props):
+    # The PMF and lookup step alone, with profiles already loaded
+    profiles = load_shooting_profiles([player_name for player_name, _ in points_props], PlayerDataCache(db))
+    prop_profiles = [profiles[player_name] for player_name, _ in points_props]
+    lines = [line for _, line in points_props]
+    benchmark(points_probabilities, prop_profiles, lines)
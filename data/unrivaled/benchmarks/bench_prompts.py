@@ -0,0 +1,69 @@
+import pytest
+from analysis.features import game_flow_features_from_plays
+from analysis.game_flow import game_flow_prompt
+from analysis.final_evaluation import final_evaluation_prompt
+from analysis.structured_output import IncrementalFieldParser, parse_final_evaluation
+from benchmarks.mock_llm_server import canned_reply
+from database.feature_store import read_features
+from database.local_store import to_doc_id
+
+STAT_TYPES = ("Points", "Rebounds", "Assists", "Pts+Rebs+Asts")
+
+
+@pytest.fixture(scope="module")
+def game_features(player_plays):
+    return {key: game_flow_features_from_plays(plays, key[1]) for key, plays in player_plays.items()}
+
+
+@pytest.fixture(scope="module")
+def final_inputs(db, enriched_players):
+    """Arguments for final_evaluation_prompt for every enriched prop, fetched up front."""
+    inputs = []
+    for player in enriched_players:
+        player_name = to_doc_id(player["Player Data"]["display_name"])
+        player_team = player["Player Data"]["team"]
+        opposing_team = player["Projection Data"]["description"]
+        features = read_features(db, player_name) or {"recent": [], "opponents": {}}
+        player_doc = db.collection("players").document(player_name).get()
+        team_doc = db.collection("teams").document(player_team).get()
+        inputs.append((
+            player_name, player_team, opposing_team, player["Projection Data"]["line_score"],
+            player["Projection Data"]["stat_display_name"], "Past performance analysis text.", [],
+            player_doc.to_dict() if player_doc.exists else {}, team_doc.to_dict() if team_doc.exists else {},
+            features["recent"], features["opponents"].get(opposing_team, {}).get("history", []),
+        ))
+    return inputs
+
+
+@pytest.fixture(scope="module")
+def final_replies(final_inputs):
+    return [canned_reply(final_evaluation_prompt(*arguments)) for arguments in final_inputs]
+
+
+def bench_game_flow_prompts(benchmark, game_features):
+    def build():
+        return [game_flow_prompt(player, game_id, stat_type, features)
+                for (game_id, player), features in game_features.items() for stat_type in STAT_TYPES]
+
+    benchmark(build)
+
+
+def bench_final_evaluation_prompts(benchmark, final_inputs):
+    benchmark(lambda: [final_evaluation_prompt(*arguments) for arguments in final_inputs])
+
+
+def bench_parse_final_evaluation(benchmark, final_replies):
+    benchmark(lambda: [parse_final_evaluation(reply) for reply in final_replies])
+
+
+def bench_parse_final_evaluation_streamed(benchmark, final_replies):
+    # 16-character deltas, as the mock server streams them
+    chunked = [[reply[i:i + 16] for i in range(0, len(reply), 16)] for reply in final_replies]
+
+    def parse():
+        for deltas in chunked:
+            parser = IncrementalFieldParser()
+            for delta in deltas:
+                parser.feed(delta)
+
+    benchmark(parse)
@@ -0,0 +1,105 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from benchmarks.slate_throughput import DATA_DIR, _free_port, start_mock_server, server_stats
+
+# Smoke run of the Celery path in predict/play_by_play_analysis_gpt.py: prepare_slate,
+# the chord of analyze_player_task and collect_slate_results, then slate_output. Tasks
+# run eagerly in this process (task_always_eager) against the local CSV-backed store and
+# the mock LLM server, so no broker is needed. The first slate player is marked OUT in a
+# temporary injury report, and the assembled output is checked the way main() builds it:
+# every slate player present, the OUT player answered by prepare_slate, every analysed
+# player carrying the analysis its task stored and the rest given main()'s default.
+#
+# Run from data/unrivaled:
+#   python -m benchmarks.celery_slate
+
+
+def first_slate_player(db):
+    for doc in db.collection("prop_lines").stream():
+        name = doc.to_dict().get("player_data", {}).get("display_name")
+        if name:
+            return name
+    return None
+
+
+def check_output(output, summary, out_player):
+    """Problems with the assembled slate output, as messages (empty when it is correct)."""
+    problems = []
+    missing = set(summary["players"]) - set(output)
+    if missing:
+        problems.append(f"players missing from the output: {sorted(missing)}")
+    out_entry = output.get(out_player) or {}
+    if out_entry.get("confidence") is not None or not str(out_entry.get("reason", "")).startswith("Not analysed"):
+        problems.append(f"{out_player} is OUT but got {out_entry}")
+    for player_name in set(summary["players"]) - set(summary["skipped"]):
+        entry = output.get(player_name, {})
+        if player_name in summary["failed"]:
+            # main() answers a player without an analysis with the same default
+            if entry != {"confidence": 75, "reason": "No analysis available."}:
+                problems.append(f"{player_name} has no analysis but got {entry}")
+        elif entry.get("reason") == "No analysis available.":
+            problems.append(f"{player_name} was analysed but got the default answer")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Celery slate path eagerly against the local store and a mock LLM.")
+    parser.add_argument("--latency", default="fixed:0.01")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own output")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = start_mock_server(port, args.latency, 0.0, 0.0, 1.0, args.seed)
+    injury_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    try:
+        # Must be set before the predict module builds its store and reads the injury report
+        os.environ["UNRIVALED_LOCAL_DATA"] = DATA_DIR
+        os.environ["DEEPSEEK_API_URL"] = f"http://127.0.0.1:{port}/v1/chat/completions"
+        os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+        os.environ["INJURY_REPORTS_PATH"] = injury_file.name
+        from database.local_store import load_local_db
+        out_player = first_slate_player(load_local_db(DATA_DIR))
+        json.dump({"injury_reports": [{"team": "", "player": out_player, "status": "OUT", "injury": "Smoke test"}]}, injury_file)
+        injury_file.close()
+
+        import predict.play_by_play_analysis_gpt as predict
+        predict.celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+        sink = None if args.verbose else open(os.devnull, "w")
+        with contextlib.ExitStack() as stack:
+            if sink is not None:
+                stack.enter_context(sink)
+                stack.enter_context(contextlib.redirect_stdout(sink))
+                stack.enter_context(contextlib.redirect_stderr(sink))
+            try:
+                summary = predict.dispatch_slate().get()
+                output = predict.slate_output(summary["players"], summary["skipped"])
+            finally:
+                predict.feature_pool.shutdown()
+        stats = server_stats(port)
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(injury_file.name)
+
+    problems = check_output(output, summary, out_player)
+    print(json.dumps({
+        "players": len(output),
+        "skipped": len(summary["skipped"]),
+        "analysed": summary["analysed"],
+        "failed": len(set(summary["failed"])),
+        "out_player": {out_player: output.get(out_player)},
+        "llm_requests": stats.get("requests"),
+        "problems": problems,
+    }, indent=4))
+    for problem in problems:
+        print(f"⚠ {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
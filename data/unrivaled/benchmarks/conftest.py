@@ -0,0 +1,70 @@
+import csv
+import glob
+import json
+import os
+import pytest
+
+# Shared fixtures for the pytest-benchmark suite (benchmarks/bench_*.py). Everything is
+# built from the data bundled with the repo: csv/play_by_play, csv/sql tables,
+# unr_bets.json and unr_enriched_players.json, with database.firebase serving the
+# CSV-backed local store, so runs are comparable across commits and machines.
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("UNRIVALED_LOCAL_DATA", DATA_DIR)
+
+
+def _read_json(name):
+    with open(os.path.join(DATA_DIR, name), "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def db():
+    from database.firebase import db
+    return db
+
+
+@pytest.fixture(scope="session")
+def raw_plays():
+    """Play-by-play rows per game as read from the CSVs, before typed parsing."""
+    games = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "csv", "play_by_play", "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                games.setdefault(row["game_id"], []).append(row)
+    return games
+
+
+@pytest.fixture(scope="session")
+def player_plays(raw_plays):
+    """Typed plays per (game_id, player doc id), as the analysis stages receive them."""
+    from helpers.play_events import annotate_plays
+    from database.local_store import to_doc_id
+
+    grouped = {}
+    for plays in raw_plays.values():
+        for play in annotate_plays([dict(row) for row in plays]):
+            if play["player"]:
+                grouped.setdefault((play["game_id"], to_doc_id(play["player"])), []).append(play)
+    return grouped
+
+
+@pytest.fixture(scope="session")
+def bets():
+    return _read_json("unr_bets.json")
+
+
+@pytest.fixture(scope="session")
+def enriched_players():
+    return _read_json("unr_enriched_players.json")
+
+
+@pytest.fixture(scope="session")
+def player_names(db):
+    return [doc.id for doc in db.collection("players").stream()]
+
+
+@pytest.fixture(scope="session")
+def prop_names(bets):
+    """Display names of every player with a line in unr_bets.json."""
+    return [item["attributes"]["display_name"] for item in bets["included"] if item["type"] == "new_player"]
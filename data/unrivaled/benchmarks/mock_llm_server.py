@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from aiohttp import web
+
+# Local OpenAI-compatible chat completions server used to benchmark the pipeline
+# without calling api.deepseek.com. Replies are canned in the formats the analysis
+# stages parse, with configurable latency, error and rate-limit behaviour. Requests with
+# "stream": true are answered as server-sent events: part of the sampled latency is spent
+# before the first token and the rest is spread over the chunks.
+
+# Share of a streamed reply's latency spent before the first token
+STREAM_FIRST_TOKEN_SHARE = 0.2
+# Characters per streamed delta
+STREAM_CHUNK_CHARS = 16
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a zero-argument sampler returning seconds.
+
+    Supported specs:
+        fixed:<s>                   constant latency
+        uniform:<low>,<high>        uniform between low and high
+        exp:<mean>                  exponential with the given mean
+        lognormal:<median>,<sigma>  lognormal with the given median and shape
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _seeded_confidence(prompt):
+    # Same prompt -> same confidence so repeated runs are comparable
+    return int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16) % 101
+
+
+def _final_evaluation_fields(confidence, lean):
+    return {
+        "confidence_level": confidence,
+        "reason_1": f"Past matchups point to the {lean}.",
+        "reason_2": f"Streaks support the {lean}.",
+        "reason_3": f"The defensive profile favours the {lean}.",
+        "reason_4": f"Recent form leans {lean}.",
+        "final_conclusion": f"Taking the {lean} with confidence {confidence}.",
+    }
+
+
+def canned_reply(prompt, malformed=False):
+    """
+    Pick a reply in the format the calling stage expects, based on its prompt.
+    With `malformed`, structured replies drop some fields to exercise the repair path.
+    """
+    confidence = _seeded_confidence(prompt)
+    lean = "over" if confidence > 50 else "under"
+
+    if "Return only the missing fields" in prompt:
+        # analysis/final_evaluation.py repair request: answer exactly the keys asked for
+        wanted = json.loads(prompt[prompt.index("{"):prompt.index("}") + 1])
+        fields = _final_evaluation_fields(confidence, lean)
+        return json.dumps({key: fields.get(key, "") for key in wanted})
+    if '"confidence_level": "<integer 0-100>"' in prompt:
+        # analysis/final_evaluation.py
+        fields = _final_evaluation_fields(confidence, lean)
+        if malformed:
+            del fields["reason_3"], fields["final_conclusion"]
+        return json.dumps(fields)
+    if "Format your response as:\nScores:" in prompt:
+        # predict/play_by_play_analysis_gpt.py
+        return (
+            "Scores:\n"
+            f"1. Recent Performance Trends: {confidence}\n"
+            f"2. Opposing Team Defense: {confidence}\n"
+            f"3. Role and Teammate Interactions: {confidence}\n"
+            f"4. Injuries and Absences: {confidence}\n"
+            f"5. Consistency and Clutch Performance: {confidence}\n\n"
+            f"Confidence Level: {confidence}\n"
+            "Reason:\n"
+            f"1. Performance against the opposing team leans {lean}.\n"
+            f"2. Scoring trends lean {lean}.\n"
+            f"3. Role and teammate interactions lean {lean}.\n"
+            f"4. Game flow leans {lean}.\n"
+            f"5. Overall the {lean} is the stronger side."
+        )
+    if "Provide a confidence level (0-100) and 4 reasons" in prompt:
+        # predict/analysis.py
+        return (
+            f"Confidence Level: {confidence}%\n\n"
+            f"### Reasons for Taking the {lean.title()}:\n\n"
+            f"1. Matchup favours the {lean}.\n\n"
+            f"2. Scoring trends favour the {lean}.\n\n"
+            f"3. Role favours the {lean}.\n\n"
+            f"4. Game flow favours the {lean}.\n\n---\n\n"
+            f"### Final Summary: Taking the {lean}."
+        )
+    return (
+        "1. The player started strong and cooled off in the middle quarters.\n"
+        "2. Output was steady with a few short streaks.\n"
+        "3. The player had a moderate impact on the flow of the game."
+    )
+
+
+def create_app(latency="fixed:0.05", error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, seed=None, malformed_rate=0.0):
+    """
+    Build the aiohttp application.
+
+    Args:
+        latency (str): Latency distribution spec, see parse_latency.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+        rate_limit_rate (float): Fraction of requests answered with HTTP 429 and a Retry-After header.
+        retry_after (float): Value of the Retry-After header in seconds.
+        seed (int, optional): Seed for the latency and failure draws.
+        malformed_rate (float): Fraction of structured replies missing some fields.
+    """
+    if seed is not None:
+        random.seed(seed)
+    sample_latency = parse_latency(latency)
+    stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "malformed": 0, "service_seconds": 0.0}
+
+    async def chat_completions(request):
+        started = time.perf_counter()
+        stats["requests"] += 1
+        body = await request.json()
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+
+        latency = sample_latency()
+        stream = bool(body.get("stream"))
+        await asyncio.sleep(latency * STREAM_FIRST_TOKEN_SHARE if stream else latency)
+
+        draw = random.random()
+        if draw < rate_limit_rate:
+            stats["rate_limited"] += 1
+            stats["service_seconds"] += time.perf_counter() - started
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+        if draw < rate_limit_rate + error_rate:
+            stats["errors"] += 1
+            stats["service_seconds"] += time.perf_counter() - started
+            return web.json_response({"error": {"message": "Internal error", "type": "server_error"}}, status=500)
+
+        malformed = random.random() < malformed_rate
+        content = canned_reply(prompt, malformed)
+        if malformed and content.startswith("{") and "reason_3" not in content:
+            stats["malformed"] += 1
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        stats["ok"] += 1
+        if stream:
+            response = await _stream_reply(request, body, content, usage, latency * (1 - STREAM_FIRST_TOKEN_SHARE))
+            stats["service_seconds"] += time.perf_counter() - started
+            return response
+        stats["service_seconds"] += time.perf_counter() - started
+        return web.json_response({
+            "id": f"chatcmpl-mock-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    async def _stream_reply(request, body, content, usage, remaining_latency):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        pause = remaining_latency / len(pieces)
+        for number, piece in enumerate(pieces):
+            event = {
+                "id": f"chatcmpl-mock-{stats['requests']}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": piece},
+                    "finish_reason": "stop" if number == len(pieces) - 1 else None,
+                }],
+            }
+            if number == len(pieces) - 1:
+                event["usage"] = usage
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if pause:
+                await asyncio.sleep(pause)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.05", help="fixed:<s> | uniform:<lo>,<hi> | exp:<mean> | lognormal:<median>,<sigma>")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.error_rate, args.rate_limit_rate, args.retry_after, args.seed, args.malformed_rate)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+# End-to-end throughput benchmark for analysis/main.py. Runs the full slate in
+# prop_lines against the local CSV-backed store and the mock LLM server, then reports
+# props/sec, per-prop latency percentiles and the pipeline vs LLM time split.
+#
+# Run from data/unrivaled:
+#   python -m benchmarks.slate_throughput --latency lognormal:0.2,0.5 --rate-limit-rate 0.05
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_current_prop = contextvars.ContextVar("current_prop", default=None)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(port, latency, error_rate, rate_limit_rate, retry_after, seed, malformed_rate=0.0):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_llm_server",
+         "--port", str(port), "--latency", latency,
+         "--error-rate", str(error_rate), "--rate-limit-rate", str(rate_limit_rate),
+         "--retry-after", str(retry_after), "--seed", str(seed), "--malformed-rate", str(malformed_rate)],
+        cwd=DATA_DIR,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Mock LLM server did not start")
+
+
+def server_stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _TimedSemaphore:
+    """Wraps the pipeline semaphore so queueing time is not counted as work."""
+
+    def __init__(self, semaphore):
+        self._semaphore = semaphore
+
+    async def __aenter__(self):
+        waited = time.perf_counter()
+        await self._semaphore.acquire()
+        record = _current_prop.get()
+        if record is not None:
+            record["queue_seconds"] += time.perf_counter() - waited
+            record["started"] = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+
+
+def _llm_trace_config(aiohttp):
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        record = _current_prop.get()
+        if record is not None:
+            record["llm_seconds"] += time.perf_counter() - context.started
+            record["llm_calls"] += 1
+
+    async def on_request_exception(session, context, params):
+        record = _current_prop.get()
+        if record is not None:
+            record["llm_seconds"] += time.perf_counter() - context.started
+            record["llm_calls"] += 1
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+def _slate_clock(starts_in_minutes):
+    """Clock for analysis.scheduler that puts the slate's first tip-off `starts_in_minutes` away."""
+    from datetime import datetime, timedelta, timezone
+    from database.firebase import db
+
+    start_times = [datetime.fromisoformat(doc.to_dict()["projection_data"]["start_time"])
+                   for doc in db.collection("prop_lines").stream()
+                   if doc.to_dict().get("projection_data", {}).get("start_time")]
+    if not start_times:
+        return None
+    offset = min(start_times) - timedelta(minutes=starts_in_minutes) - datetime.now(timezone.utc)
+    return lambda: datetime.now(timezone.utc) + offset
+
+
+def _timed_field_parser(parser_class):
+    """IncrementalFieldParser that notes when a prop's confidence level first arrives."""
+
+    class TimedFieldParser(parser_class):
+        def feed(self, delta):
+            completed = super().feed(delta)
+            record = _current_prop.get()
+            if record is not None and record.get("first_result") is None and any(field == "confidence_level" for field, _ in completed):
+                record["first_result"] = time.perf_counter()
+            return completed
+
+    return TimedFieldParser
+
+
+def _timed_event_stream(read_event_stream):
+    """Streamed bodies arrive after on_request_end; count reading them as LLM time too."""
+
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await read_event_stream(*args, **kwargs)
+        finally:
+            record = _current_prop.get()
+            if record is not None:
+                record["llm_seconds"] += time.perf_counter() - started
+
+    return timed
+
+
+async def run_slate(verbose=False, starts_in_minutes=60.0):
+    import aiohttp
+    from unittest import mock
+    import analysis.main as analysis_main
+    import analysis.scheduler as scheduler
+    import analysis.final_evaluation as final_evaluation
+    import helpers.llm_http as llm_http
+
+    records = []
+    schedule = {}
+    original_analyze_player = analysis_main.analyze_player
+    original_run_scheduled = analysis_main.run_scheduled
+    session_class = aiohttp.ClientSession
+
+    def traced_session(*args, **kwargs):
+        kwargs["trace_configs"] = list(kwargs.get("trace_configs") or []) + [_llm_trace_config(aiohttp)]
+        return session_class(*args, **kwargs)
+
+    async def timed_analyze_player(player, *args, **kwargs):
+        record = {
+            "player": player["player_data"].get("name"),
+            "stat_type": player["projection_data"].get("stat_type"),
+            "queue_seconds": 0.0,
+            "llm_seconds": 0.0,
+            "llm_calls": 0,
+            "started": None,
+            "first_result": None,
+        }
+        _current_prop.set(record)
+        submitted = time.perf_counter()
+        try:
+            return await original_analyze_player(player, *args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            started = record.pop("started") or submitted
+            record["latency_seconds"] = finished - started
+            # Without streaming the confidence level is only known once the prop finishes
+            record["first_result_seconds"] = (record.pop("first_result") or finished) - started
+            record["pipeline_seconds"] = max(0.0, record["latency_seconds"] - record["llm_seconds"])
+            records.append(record)
+
+    async def reporting_run_scheduled(*args, **kwargs):
+        results, report = await original_run_scheduled(*args, **kwargs)
+        schedule.update(report)
+        return results, report
+
+    sink = None if verbose else open(os.devnull, "w")
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(analysis_main, "analyze_player", timed_analyze_player))
+        stack.enter_context(mock.patch.object(analysis_main, "semaphore", _TimedSemaphore(analysis_main.semaphore)))
+        stack.enter_context(mock.patch.object(aiohttp, "ClientSession", traced_session))
+        stack.enter_context(mock.patch.object(analysis_main, "run_scheduled", reporting_run_scheduled))
+        stack.enter_context(mock.patch.object(llm_http, "read_event_stream", _timed_event_stream(llm_http.read_event_stream)))
+        stack.enter_context(mock.patch.object(final_evaluation, "IncrementalFieldParser", _timed_field_parser(final_evaluation.IncrementalFieldParser)))
+        clock = _slate_clock(starts_in_minutes)
+        if clock is not None:
+            stack.enter_context(mock.patch.object(scheduler, "_now", clock))
+        if sink is not None:
+            stack.enter_context(sink)
+            stack.enter_context(contextlib.redirect_stdout(sink))
+            stack.enter_context(contextlib.redirect_stderr(sink))
+        await analysis_main.main()
+    elapsed = time.perf_counter() - started
+    return records, elapsed, schedule
+
+
+def summarize(records, elapsed, mock_stats, schedule):
+    latencies = [record["latency_seconds"] for record in records]
+    llm_seconds = sum(record["llm_seconds"] for record in records)
+    pipeline_seconds = sum(record["pipeline_seconds"] for record in records)
+    busy_seconds = llm_seconds + pipeline_seconds
+    return {
+        "props": len(records),
+        "wall_seconds": round(elapsed, 3),
+        "props_per_second": round(len(records) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_seconds": round(percentile(latencies, 50), 3),
+        "latency_p95_seconds": round(percentile(latencies, 95), 3),
+        "first_result_p50_seconds": round(percentile([record["first_result_seconds"] for record in records], 50), 3),
+        "queue_seconds_total": round(sum(record["queue_seconds"] for record in records), 3),
+        "llm_calls": sum(record["llm_calls"] for record in records),
+        "llm_seconds_total": round(llm_seconds, 3),
+        "pipeline_seconds_total": round(pipeline_seconds, 3),
+        "llm_share": round(llm_seconds / busy_seconds, 3) if busy_seconds else 0.0,
+        "degraded_for_deadline": len(schedule.get("degraded", [])),
+        "degraded_for_budget": len(schedule.get("over_budget", [])),
+        "missed_deadlines": len(schedule.get("missed", [])),
+        "mock_server": mock_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against a mock LLM.")
+    parser.add_argument("--latency", default="fixed:0.05")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of final-evaluation replies missing fields (exercises the repair path)")
+    parser.add_argument("--starts-in", type=float, default=60.0,
+                        help="Minutes from now to the slate's first tip-off, for the deadline scheduler")
+    parser.add_argument("--stream", action="store_true",
+                        help="Request streamed replies (LLM_STREAMING=1) and parse them incrementally")
+    parser.add_argument("--output", help="Write the JSON report (including per-prop rows) to this path")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own output")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = start_mock_server(port, args.latency, args.error_rate, args.rate_limit_rate, args.retry_after, args.seed, args.malformed_rate)
+    try:
+        # Must be set before the pipeline imports database.firebase
+        os.environ["UNRIVALED_LOCAL_DATA"] = DATA_DIR
+        os.environ["DEEPSEEK_API_URL"] = f"http://127.0.0.1:{port}/v1/chat/completions"
+        os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+        if args.stream:
+            os.environ["LLM_STREAMING"] = "1"
+        records, elapsed, schedule = asyncio.run(run_slate(args.verbose, args.starts_in))
+        report = summarize(records, elapsed, server_stats(port), schedule)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**report, "per_prop": records}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
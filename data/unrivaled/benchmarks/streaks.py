@@ -0,0 +1,113 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Compares the single-pass streak engine in database/player_data with the previous
+# per-play ThreadPoolExecutor implementation on every (game, player) in csv/play_by_play.
+#
+# Run from data/unrivaled:
+#   python -m benchmarks.streaks --repeat 5
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("UNRIVALED_LOCAL_DATA", DATA_DIR)
+
+from database.player_data import analyze_streaks  # noqa: E402
+from helpers.play_events import annotate_plays  # noqa: E402
+
+
+def legacy_analyze_streaks(plays, player_name, stat_type):
+    """The pre-engine implementation, kept here only as the benchmark baseline."""
+    streaks = {"hot_streaks": 0, "cold_streaks": 0, "assist_streaks": 0, "rebound_streaks": 0}
+
+    def process_play(play, previous_play):
+        description = play.get("play_description", "").lower()
+        result = {"hot": 0, "cold": 0, "assist": 0, "rebound": 0}
+        if stat_type == "Points":
+            if "makes" in description:
+                if previous_play and "makes" in previous_play.get("play_description", "").lower():
+                    result["hot"] = 1
+            elif "misses" in description:
+                if previous_play and "misses" in previous_play.get("play_description", "").lower():
+                    result["cold"] = 1
+        elif stat_type == "Assists":
+            if "assist" in description:
+                if previous_play and "turnover" not in previous_play.get("play_description", "").lower():
+                    result["assist"] = 1
+        elif stat_type == "Rebounds":
+            if "offensive rebound" in description or "defensive rebound" in description:
+                if previous_play and ("offensive rebound" in previous_play.get("play_description", "").lower() or
+                                      "defensive rebound" in previous_play.get("play_description", "").lower()):
+                    result["rebound"] = 1
+        return result
+
+    with ThreadPoolExecutor() as executor:
+        futures = []
+        previous_play = None
+        for play in plays:
+            futures.append(executor.submit(process_play, play, previous_play))
+            previous_play = play
+        for future in futures:
+            result = future.result()
+            streaks["hot_streaks"] += result["hot"]
+            streaks["cold_streaks"] += result["cold"]
+            streaks["assist_streaks"] += result["assist"]
+            streaks["rebound_streaks"] += result["rebound"]
+    return streaks
+
+
+def load_player_plays():
+    """Group the bundled play-by-play rows by (game_id, player), typed as at ingest."""
+    grouped = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "csv", "play_by_play", "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in annotate_plays(list(csv.DictReader(f))):
+                if row["player"]:
+                    grouped.setdefault((row["game_id"], row["player"]), []).append(row)
+    return grouped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analyze_streaks on the bundled play-by-play.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    grouped = load_player_plays()
+    plays_total = sum(len(plays) for plays in grouped.values())
+    print(f"{len(grouped)} player-games, {plays_total} plays")
+
+    # The old code ran once per stat type (three times for Pts+Rebs+Asts in game_flow)
+    legacy_stat_types = ("Points", "Rebounds", "Assists")
+    mismatches = 0
+    for (game_id, player), plays in grouped.items():
+        new = analyze_streaks(plays, player)
+        old = {stat: legacy_analyze_streaks(plays, player, stat) for stat in legacy_stat_types}
+        if (new["hot_streaks"], new["cold_streaks"], new["rebound_streaks"], new["assist_streaks"]) != (
+                old["Points"]["hot_streaks"], old["Points"]["cold_streaks"],
+                old["Rebounds"]["rebound_streaks"], old["Assists"]["assist_streaks"]):
+            mismatches += 1
+    print(f"Count mismatches vs legacy: {mismatches}")
+
+    def best_of(fn):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    legacy_seconds = best_of(lambda: [legacy_analyze_streaks(plays, player, stat)
+                                      for (_, player), plays in grouped.items() for stat in legacy_stat_types])
+    engine_seconds = best_of(lambda: [analyze_streaks(plays, player) for (_, player), plays in grouped.items()])
+
+    print(f"legacy (3 stat types, thread per play): {legacy_seconds * 1000:.1f} ms")
+    print(f"single-pass engine (all stat types):    {engine_seconds * 1000:.1f} ms")
+    print(f"speedup: {legacy_seconds / engine_seconds:.1f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
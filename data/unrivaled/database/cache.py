@@ -0,0 +1,139 @@
+import sys
+from datetime import datetime
+from database.feature_store import read_features
+from helpers.tracing import count
+
+# Run-scoped cache of the Firestore documents the analysis stages read repeatedly.
+# Each player's doc and game log, each game's play-by-play and each team doc are read
+# once and then served from memory to every stage and stat type. The cache is only
+# dropped when an ingest script bumps `meta/ingest` (see mark_ingest).
+
+INGEST_MARKER = ("meta", "ingest")
+
+
+def mark_ingest(db, source):
+    """
+    Record that new data was written so run-scoped caches reload on their next refresh.
+
+    Args:
+        db: The Firebase database connection object.
+        source (str): Name of the ingest script, stored for debugging.
+    """
+    db.collection(INGEST_MARKER[0]).document(INGEST_MARKER[1]).set({
+        "updated_at": datetime.now().isoformat(),
+        "source": source
+    })
+
+
+def _cached(store, key):
+    """Whether `key` is already loaded, counted as a cache hit or miss in the run's trace."""
+    hit = key in store
+    count("cache.hits" if hit else "cache.misses")
+    return hit
+
+
+class PlayerDataCache:
+    def __init__(self, db):
+        self._db = db
+        self._ingest_marker = None
+        self.clear()
+
+    def clear(self):
+        self._player_names = None
+        self._players = {}
+        self._game_logs = {}
+        self._games = {}
+        self._plays = {}
+        self._teams = {}
+        self._features = {}
+
+    def refresh_if_stale(self):
+        """Drop everything if an ingest has run since the cache was filled."""
+        marker_doc = self._db.collection(INGEST_MARKER[0]).document(INGEST_MARKER[1]).get()
+        marker = marker_doc.to_dict().get("updated_at") if marker_doc.exists else None
+        if marker != self._ingest_marker:
+            if self._ingest_marker is not None:
+                print(f"New ingest detected ({marker}); clearing player data cache.", file=sys.stderr)
+            self.clear()
+            self._ingest_marker = marker
+
+    def resolve_player_name(self, player_name):
+        """
+        Match a player name case-insensitively against the `players/` collection.
+        Returns the exact document id, or None if the player is unknown.
+        """
+        if self._player_names is None:
+            self._player_names = {doc.id.lower(): doc.id for doc in self._db.collection("players").stream()}
+        return self._player_names.get(player_name.replace(" ", "_").lower())
+
+    def _key(self, player_name):
+        return self.resolve_player_name(player_name) or player_name.replace(" ", "_")
+
+    def player(self, player_name):
+        """The player's document as a dict (None if missing)."""
+        key = self._key(player_name)
+        if not _cached(self._players, key):
+            doc = self._db.collection("players").document(key).get()
+            self._players[key] = doc.to_dict() if doc.exists else None
+        return self._players[key]
+
+    def game_log(self, player_name):
+        """All of the player's game docs as {game_id: stats}, ordered by game id."""
+        key = self._key(player_name)
+        if not _cached(self._game_logs, key):
+            games_ref = self._db.collection("players").document(key).collection("games")
+            self._game_logs[key] = {doc.id: doc.to_dict() for doc in games_ref.stream()}
+        return self._game_logs[key]
+
+    def features(self, player_name):
+        """The player's materialized features (database/feature_store.py), or None if not built."""
+        key = self._key(player_name)
+        if not _cached(self._features, key):
+            self._features[key] = read_features(self._db, key)
+        return self._features[key]
+
+    def loaded_game_log(self, player_name):
+        """The player's game log if it is already cached, else None (no read)."""
+        return self._game_logs.get(self._key(player_name))
+
+    def game_ids(self, player_name):
+        return list(self.game_log(player_name))
+
+    def game_stats(self, player_name, game_id):
+        return self.game_log(player_name).get(game_id)
+
+    def update_game_stats(self, player_name, game_id, fields):
+        """Merge fields into a player's game doc in Firestore and in the cache."""
+        key = self._key(player_name)
+        self._db.collection("players").document(key).collection("games").document(game_id).set(fields, merge=True)
+        game_log = self.game_log(key)
+        game_log.setdefault(game_id, {}).update(fields)
+
+    def games(self, game_ids):
+        """`games/` docs for the given ids, fetching any missing ones in one batched read."""
+        missing = [game_id for game_id in game_ids if not _cached(self._games, game_id)]
+        if missing:
+            refs = [self._db.collection("games").document(game_id) for game_id in missing]
+            for snapshot in self._db.get_all(refs):
+                self._games[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+            for game_id in missing:
+                self._games.setdefault(game_id, None)
+        return {game_id: self._games[game_id] for game_id in game_ids}
+
+    def plays(self, game_id):
+        """Every play in a game, read once and shared by all players in it."""
+        if not _cached(self._plays, game_id):
+            plays_ref = self._db.collection("games").document(game_id).collection("play_by_play")
+            self._plays[game_id] = [doc.to_dict() for doc in plays_ref.stream()]
+        return self._plays[game_id]
+
+    def plays_for_player(self, game_id, player_name):
+        key = self._key(player_name).lower().strip()
+        return [play for play in self.plays(game_id) if play.get("player") and play["player"].lower().strip() == key]
+
+    def team(self, team_name):
+        """A team's stats from `teams/` (empty dict if missing)."""
+        if not _cached(self._teams, team_name):
+            team_doc = self._db.collection("teams").document(team_name).get()
+            self._teams[team_name] = team_doc.to_dict() if team_doc.exists else {}
+        return self._teams[team_name]
@@ -0,0 +1,203 @@
+import sys
+from datetime import datetime
+from helpers.streaks import analyze_streaks
+
+# Materialized per-player features, one `player_features/{player}` doc per player.
+# Box-score totals, the last five games, per-opponent totals and history, quarter splits
+# and streak counts are kept as running sums that the ingest scripts update with each new
+# game (apply_game_stats, apply_game_plays), so analysis reads one doc instead of
+# re-aggregating game logs and play-by-play. Each game is applied at most once per
+# player; rebuild_features recomputes a player from scratch on demand.
+
+FEATURE_COLLECTION = "player_features"
+RECENT_GAMES = 5
+
+SUM_FIELDS = ("min", "pts", "reb", "offensive_rebounds", "defensive_rebounds", "ast", "stl", "blk",
+              "turnovers", "pf", "fg_m", "fg_a", "three_pt_m", "three_pt_a", "ft_m", "ft_a")
+# Made-attempted strings ("5-10") as written by unr_game_stats_scrape
+SPLIT_FIELDS = {"fg": ("fg_m", "fg_a"), "three_pt": ("three_pt_m", "three_pt_a"), "ft": ("ft_m", "ft_a")}
+STREAK_COUNT_FIELDS = ("hot_streaks", "cold_streaks", "assist_streaks", "rebound_streaks")
+STREAK_MAX_FIELDS = ("longest_hot_run", "longest_cold_run", "longest_rebound_run")
+QUARTER_FIELDS = ("makes", "misses", "assists", "rebounds")
+
+
+def _number(value):
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+def game_row(game_stats):
+    """
+    A compact box-score row from a `players/{name}/games/{game_id}` doc.
+    Accepts both split fields (fg_m, fg_a, ...) and "made-attempted" strings.
+    """
+    row = {
+        "game_id": game_stats.get("game_id"),
+        "game_date": game_stats.get("game_date"),
+        "opponent": game_stats.get("opponent"),
+    }
+    for field in SUM_FIELDS:
+        row[field] = _number(game_stats.get(field))
+    for field, (made, attempted) in SPLIT_FIELDS.items():
+        value = game_stats.get(field)
+        if made not in game_stats and isinstance(value, str) and "-" in value:
+            row[made], row[attempted] = (_number(part) for part in value.split("-", 1))
+    return row
+
+
+def empty_features(player_name):
+    return {
+        "player": player_name,
+        "games": 0,
+        "shooting_games": 0,
+        "totals": {field: 0 for field in SUM_FIELDS},
+        "recent": [],
+        "opponents": {},
+        "quarters": {},
+        "streaks": {field: 0 for field in STREAK_COUNT_FIELDS + STREAK_MAX_FIELDS},
+        "play_games": 0,
+        "applied_games": [],
+        "applied_plays": [],
+    }
+
+
+def fold_game(features, row):
+    """Add one game row to the running sums. Returns False if the game was already applied."""
+    if row["game_id"] in features["applied_games"]:
+        return False
+    features["applied_games"].append(row["game_id"])
+    features["games"] += 1
+    if row["fg_a"] + row["ft_a"] > 0:
+        # Shooting percentages and attempts per game ignore DNPs
+        features["shooting_games"] += 1
+    for field in SUM_FIELDS:
+        features["totals"][field] += row[field]
+
+    recent = features["recent"] + [row]
+    features["recent"] = sorted(recent, key=lambda game: game.get("game_date") or "", reverse=True)[:RECENT_GAMES]
+
+    if row["opponent"]:
+        opponent = features["opponents"].setdefault(row["opponent"], {"games": 0, "totals": {field: 0 for field in SUM_FIELDS}, "history": []})
+        opponent["games"] += 1
+        for field in SUM_FIELDS:
+            opponent["totals"][field] += row[field]
+        opponent["history"] = sorted(opponent["history"] + [row], key=lambda game: game.get("game_date") or "", reverse=True)
+    return True
+
+
+def fold_plays(features, game_id, plays, player_name):
+    """Add one game's plays for the player to the quarter splits and streak counts."""
+    if game_id in features["applied_plays"] or not plays:
+        return False
+    features["applied_plays"].append(game_id)
+    features["play_games"] += 1
+    streaks = analyze_streaks(plays, player_name)
+    for field in STREAK_COUNT_FIELDS:
+        features["streaks"][field] += streaks[field]
+    for field in STREAK_MAX_FIELDS:
+        features["streaks"][field] = max(features["streaks"][field], streaks[field])
+    for quarter, stats in streaks["by_quarter"].items():
+        totals = features["quarters"].setdefault(quarter or "unknown", {field: 0 for field in QUARTER_FIELDS})
+        for field in QUARTER_FIELDS:
+            totals[field] += stats[field]
+    return True
+
+
+def read_features(db, player_name):
+    """The player's feature doc, or None if it has not been built yet."""
+    doc = db.collection(FEATURE_COLLECTION).document(player_name.replace(" ", "_")).get()
+    return doc.to_dict() if doc.exists else None
+
+
+def _save(db, player_name, features):
+    features["updated_at"] = datetime.now().isoformat()
+    db.collection(FEATURE_COLLECTION).document(player_name).set(features)
+
+
+def apply_game_stats(db, player_name, game_stats):
+    """
+    Fold a newly ingested game into the player's features (one read, one write).
+
+    Args:
+        db: The Firebase database connection object.
+        player_name (str): The player's `players/` document id.
+        game_stats (dict): The game doc as written to `players/{name}/games/{game_id}`.
+    """
+    features = read_features(db, player_name) or empty_features(player_name)
+    if fold_game(features, game_row(game_stats)):
+        _save(db, player_name, features)
+
+
+def apply_games(db, player_name, games):
+    """
+    Fold any of `games` the player's features have not seen yet (one read, at most one
+    write), e.g. the full game list scraped from a player page.
+
+    Returns:
+        tuple: (features, number of games newly applied)
+    """
+    features = read_features(db, player_name) or empty_features(player_name)
+    applied = sum(1 for game_stats in games if fold_game(features, game_row(game_stats)))
+    if applied:
+        _save(db, player_name, features)
+    return features, applied
+
+
+def apply_game_plays(db, game_id, plays):
+    """
+    Fold a newly ingested game's play-by-play into the features of every player in it.
+
+    Args:
+        db: The Firebase database connection object.
+        game_id (str): The game's id.
+        plays (list): The game's plays in order, with `player` set to the `players/` doc id.
+    """
+    by_player = {}
+    for play in plays:
+        if play.get("player"):
+            by_player.setdefault(play["player"], []).append(play)
+    for player_name, player_plays in by_player.items():
+        features = read_features(db, player_name) or empty_features(player_name)
+        if fold_plays(features, game_id, player_plays, player_name):
+            _save(db, player_name, features)
+
+
+def rebuild_features(db, player_name, plays_by_game=None):
+    """
+    Recompute a player's features from their full game log and play-by-play.
+    Pass the same `plays_by_game` dict when rebuilding many players so each game's
+    play-by-play is streamed once.
+    """
+    if plays_by_game is None:
+        plays_by_game = {}
+    features = empty_features(player_name)
+    games = {doc.id: doc.to_dict() for doc in db.collection("players").document(player_name).collection("games").stream()}
+    key = player_name.lower()
+    for game_id, game_stats in games.items():
+        fold_game(features, game_row({"game_id": game_id, **game_stats}))
+        if game_id not in plays_by_game:
+            plays_by_game[game_id] = [doc.to_dict() for doc in db.collection("games").document(game_id).collection("play_by_play").stream()]
+        fold_plays(features, game_id, [play for play in plays_by_game[game_id] if (play.get("player") or "").lower() == key], player_name)
+    _save(db, player_name, features)
+    return features
+
+
+def averages(totals, games):
+    """Per-game averages of a totals dict."""
+    return {field: round(value / games, 2) for field, value in totals.items()} if games else {}
+
+
+if __name__ == "__main__":
+    import argparse
+    from database.firebase import db
+
+    parser = argparse.ArgumentParser(description="Rebuild player_features from the game logs and play-by-play.")
+    parser.add_argument("players", nargs="*", help="Player doc ids (default: every player)")
+    args = parser.parse_args()
+    plays_by_game = {}
+    for player_name in args.players or [doc.id for doc in db.collection("players").stream()]:
+        features = rebuild_features(db, player_name, plays_by_game)
+        print(f"Rebuilt features for {player_name} ({features['games']} games).", file=sys.stderr)
@@ -1,17 +1,28 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
 from dotenv import load_dotenv
+from database.instrumented import instrument_if_enabled
 
 # Load env vars
 load_dotenv("../../unrivaled-dash/.env.local")
 
 # Firebase Setup
-cred = credentials.Certificate("../../secrets/firebase_key.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client(database_id="unrivaled-db")
+# Setting UNRIVALED_LOCAL_DATA to the data/unrivaled directory swaps Firestore for an
+# in-memory store built from the bundled CSVs (used by the benchmarks and mock runs).
+LOCAL_DATA_DIR = os.getenv("UNRIVALED_LOCAL_DATA")
+if LOCAL_DATA_DIR:
+    from database.local_store import load_local_db
+    db = load_local_db(LOCAL_DATA_DIR)
+else:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    cred = credentials.Certificate("../../secrets/firebase_key.json")
+    firebase_admin.initialize_app(cred)
+    db = firestore.client(database_id="unrivaled-db")
+
+# TRACE_FILE or FIRESTORE_PROFILE set: count Firestore reads and writes (database/instrumented.py)
+db = instrument_if_enabled(db)
 
 # DeepSeek API Settings
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_MODEL = "deepseek-chat"
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
@@ -0,0 +1,273 @@
+import argparse
+import atexit
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from helpers.tracing import count, tracer
+
+# Counting wrapper around a Firestore client (or the local store). Document reads and
+# writes and each round trip to the server are recorded in the tracing counters
+# (firestore.reads, firestore.writes, firestore.round_trips). The entry points wrap their
+# client with instrument_if_enabled(db); anything not wrapped here passes through.
+#
+# With FIRESTORE_PROFILE set, every round trip is also charged to the function that made
+# it (the first caller outside this module and the tracing helpers), identical reads
+# repeated within the run are flagged, and a ranked report is printed to stderr when the
+# process exits. FIRESTORE_PROFILE=1 prints the report only; any other value is a path the
+# report is also written to as JSON, which can be printed again later with:
+#   python -m database.instrumented report.json [--top 20]
+
+FIRESTORE_PROFILE = os.getenv("FIRESTORE_PROFILE")
+# Round trips one function may make to the same collection shape before it is flagged
+N_PLUS_ONE_THRESHOLD = int(os.getenv("FIRESTORE_PROFILE_N_PLUS_ONE", "10"))
+
+QUERY_METHODS = ("where", "order_by", "limit", "limit_to_last", "offset", "select",
+                 "start_at", "start_after", "end_at", "end_before")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.join(ROOT_DIR, "helpers", "tracing.py")}
+# Comprehension frames are charged to the function they run in
+_COMPREHENSIONS = {"<listcomp>", "<dictcomp>", "<setcomp>", "<genexpr>"}
+_QUERY_NAME = re.compile(r"\?(\w+)\(")
+
+
+def _caller():
+    """'module/path.py:function' of the first frame outside the instrumentation."""
+    frame = sys._getframe(1)
+    while frame is not None and (frame.f_code.co_filename in _SKIPPED_FILES or frame.f_code.co_filename.startswith("<")
+                                 or frame.f_code.co_name in _COMPREHENSIONS):
+        frame = frame.f_back
+    if frame is None:
+        return "<unknown>"
+    filename = frame.f_code.co_filename
+    if filename.startswith(ROOT_DIR):
+        filename = os.path.relpath(filename, ROOT_DIR)
+    return f"{filename}:{frame.f_code.co_name}"
+
+
+def _shape(key):
+    """
+    A read or write key with document ids and query values dropped, e.g.
+    'players/Name/games?where(...)' -> 'players/*/games?where', so one function's
+    per-row lookups against the same collection group together.
+    """
+    path, _, query = key.partition("?")
+    prefix = "*/" if path.startswith("*/") else ""
+    segments = path[len(prefix):].split("/")
+    shape = prefix + "/".join("*" if i % 2 else segment for i, segment in enumerate(segments))
+    if query:
+        shape += "?" + "?".join(_QUERY_NAME.findall("?" + query))
+    return shape
+
+
+class FirestoreProfiler:
+    def __init__(self, target=FIRESTORE_PROFILE):
+        self.target = target
+        self.by_caller = defaultdict(lambda: {"reads": 0, "writes": 0, "streams": 0, "round_trips": 0})
+        self.by_shape = defaultdict(int)
+        self.reads = defaultdict(lambda: {"count": 0, "docs": 0, "callers": set()})
+
+    @property
+    def enabled(self):
+        return bool(self.target)
+
+    def record(self, op, key, docs, caller, stream=False):
+        stats = self.by_caller[caller]
+        stats["round_trips"] += 1
+        stats[f"{op}s"] += docs
+        if stream:
+            stats["streams"] += 1
+        self.by_shape[(caller, _shape(key))] += 1
+        if op == "read":
+            read = self.reads[key]
+            read["count"] += 1
+            read["docs"] += docs
+            read["callers"].add(caller)
+
+    def report(self):
+        """
+        The run's totals, per-function counts ranked by documents touched, identical
+        reads ranked by the documents re-read, and likely N+1 loops.
+        """
+        totals = {"reads": 0, "writes": 0, "streams": 0, "round_trips": 0}
+        for stats in self.by_caller.values():
+            for name in totals:
+                totals[name] += stats[name]
+        callers = sorted(({"caller": caller, **stats} for caller, stats in self.by_caller.items()),
+                         key=lambda row: (row["reads"] + row["writes"], row["round_trips"]), reverse=True)
+        repeated = sorted(({"key": key, "count": read["count"], "docs": read["docs"],
+                            "wasted_docs": read["docs"] - read["docs"] // read["count"],
+                            "callers": sorted(read["callers"])}
+                           for key, read in self.reads.items() if read["count"] > 1),
+                          key=lambda row: (row["wasted_docs"], row["count"]), reverse=True)
+        n_plus_one = sorted(({"caller": caller, "shape": shape, "round_trips": round_trips}
+                             for (caller, shape), round_trips in self.by_shape.items()
+                             if round_trips >= N_PLUS_ONE_THRESHOLD),
+                            key=lambda row: row["round_trips"], reverse=True)
+        return {"totals": totals, "callers": callers, "repeated_reads": repeated, "n_plus_one": n_plus_one}
+
+    def finish(self, top=15):
+        """Print the ranked report to stderr and write it to FIRESTORE_PROFILE if that is a path."""
+        if not self.enabled or not self.by_caller:
+            return
+        report = self.report()
+        print(format_report(report, top), file=sys.stderr)
+        if self.target != "1":
+            with open(self.target, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Firestore profile written to {self.target}", file=sys.stderr)
+
+
+profiler = FirestoreProfiler()
+if profiler.enabled:
+    atexit.register(profiler.finish)
+
+
+def format_report(report, top=15):
+    totals = report["totals"]
+    lines = [f"firestore: {totals['reads']} reads, {totals['writes']} writes, "
+             f"{totals['streams']} streams, {totals['round_trips']} round trips",
+             "",
+             f"{'function':<64}{'reads':>9}{'writes':>9}{'streams':>9}{'trips':>9}"]
+    lines.extend(f"{row['caller'][-64:]:<64}{row['reads']:>9}{row['writes']:>9}{row['streams']:>9}{row['round_trips']:>9}"
+                 for row in report["callers"][:top])
+    if report["repeated_reads"]:
+        lines.append(f"\nrepeated identical reads ({len(report['repeated_reads'])}):")
+        lines.extend(f"  {row['count']:>6}x {row['wasted_docs']:>8} docs re-read  {row['key'][:120]}  <- {', '.join(row['callers'])}"
+                     for row in report["repeated_reads"][:top])
+    if report["n_plus_one"]:
+        lines.append(f"\npossible N+1 loops (>= {N_PLUS_ONE_THRESHOLD} round trips to one collection from one function):")
+        lines.extend(f"  {row['round_trips']:>6}  {row['caller']}  {row['shape']}" for row in report["n_plus_one"][:top])
+    return "\n".join(lines)
+
+
+def _record(op, key, docs=1, stream=False, caller=None):
+    """One round trip that read or wrote `docs` documents at `key`."""
+    count("firestore.round_trips")
+    if docs:
+        count(f"firestore.{op}s", docs)
+    if profiler.enabled:
+        profiler.record(op, key, docs, caller or _caller(), stream)
+
+
+def _stream(snapshots, key):
+    """Yield a streamed result, recording it as one round trip once it is consumed or closed."""
+    # Taken before the first snapshot, while the consuming function is still the caller
+    caller = _caller() if profiler.enabled else None
+    docs = 0
+    try:
+        for snapshot in snapshots:
+            docs += 1
+            yield snapshot
+    finally:
+        _record("read", key, docs, stream=True, caller=caller)
+
+
+class _Proxy:
+    def __init__(self, target, path):
+        self._target = target
+        self._path = path
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def _unwrap(reference):
+    return reference._target if isinstance(reference, _Proxy) else reference
+
+
+def _describe(name, args, kwargs):
+    arguments = [repr(arg) for arg in args] + [f"{key}={value!r}" for key, value in kwargs.items()]
+    return f"?{name}({', '.join(arguments)})"
+
+
+class InstrumentedQuery(_Proxy):
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name in QUERY_METHODS:
+            # The path carries the query so identical queries are recognised as repeats
+            return lambda *args, **kwargs: InstrumentedQuery(attribute(*args, **kwargs),
+                                                             self._path + _describe(name, args, kwargs))
+        return attribute
+
+    def stream(self, *args, **kwargs):
+        return _stream(self._target.stream(*args, **kwargs), self._path)
+
+    def get(self, *args, **kwargs):
+        snapshots = list(self._target.get(*args, **kwargs))
+        _record("read", self._path, len(snapshots))
+        return snapshots
+
+
+class InstrumentedCollection(InstrumentedQuery):
+    def document(self, *args):
+        reference = self._target.document(*args)
+        return InstrumentedDocument(reference, f"{self._path}/{reference.id}")
+
+    def add(self, *args, **kwargs):
+        _record("write", self._path)
+        return self._target.add(*args, **kwargs)
+
+
+class InstrumentedDocument(_Proxy):
+    def collection(self, name):
+        return InstrumentedCollection(self._target.collection(name), f"{self._path}/{name}")
+
+    def get(self, *args, **kwargs):
+        _record("read", self._path)
+        return self._target.get(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        _record("write", self._path)
+        return self._target.set(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        _record("write", self._path)
+        return self._target.update(*args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        _record("write", self._path)
+        return self._target.create(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        _record("write", self._path)
+        return self._target.delete(*args, **kwargs)
+
+
+class InstrumentedClient(_Proxy):
+    def collection(self, name):
+        return InstrumentedCollection(self._target.collection(name), name)
+
+    def collection_group(self, collection_id):
+        return InstrumentedQuery(self._target.collection_group(collection_id), f"*/{collection_id}")
+
+    def get_all(self, references, *args, **kwargs):
+        references = list(references)
+        key = "get_all?refs(" + ", ".join(getattr(reference, "_path", "?") for reference in references) + ")"
+        return _stream(self._target.get_all([_unwrap(reference) for reference in references], *args, **kwargs), key)
+
+
+def instrument(db):
+    """Wrap a Firestore client so its reads and writes are counted."""
+    return db if isinstance(db, InstrumentedClient) else InstrumentedClient(db, "")
+
+
+def instrument_if_enabled(db):
+    """instrument(db) when TRACE_FILE or FIRESTORE_PROFILE is set, else db unchanged."""
+    return instrument(db) if tracer.enabled or profiler.enabled else db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a Firestore profile written with FIRESTORE_PROFILE=path.json.")
+    parser.add_argument("path")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    with open(args.path, "r") as f:
+        print(format_report(json.load(f), args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
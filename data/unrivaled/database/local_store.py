@@ -0,0 +1,262 @@
+import copy
+import csv
+import glob
+import json
+import os
+import unicodedata
+from helpers.play_events import annotate_plays
+from database.feature_store import rebuild_features
+
+# In-memory stand-in for the subset of the Firestore client API the pipeline uses.
+# It lets the analysis stages run end to end against the bundled CSV/JSON data without
+# credentials, which is what the mock LLM benchmarks rely on.
+
+
+def normalize_text(text):
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
+
+
+def to_doc_id(name):
+    """Convert a display name to the `players/` document id format used by the scrapers."""
+    return normalize_text(name).strip().replace(" ", "_")
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    def __init__(self, store, collection_path, doc_id):
+        self._store = store
+        self._collection_path = collection_path
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    @property
+    def parent(self):
+        return CollectionReference(self._store, self._collection_path)
+
+    def collection(self, name):
+        return CollectionReference(self._store, f"{self.path}/{name}")
+
+    def get(self):
+        data = self._store._collections.get(self._collection_path, {}).get(self.id)
+        return DocumentSnapshot(self, data)
+
+    def set(self, data, merge=False):
+        docs = self._store._collections.setdefault(self._collection_path, {})
+        if merge and self.id in docs:
+            docs[self.id].update(copy.deepcopy(data))
+        else:
+            docs[self.id] = copy.deepcopy(data)
+
+    def update(self, data):
+        self.set(data, merge=True)
+
+    def delete(self):
+        self._store._collections.get(self._collection_path, {}).pop(self.id, None)
+
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+class Query:
+    """Chained where/order_by/limit over one collection, evaluated on stream()."""
+
+    DESCENDING = "DESCENDING"
+    ASCENDING = "ASCENDING"
+
+    def __init__(self, collection, filters=(), orders=(), limit_count=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_count
+
+    def where(self, field_path, op_string, value):
+        return Query(self._collection, self._filters + ((field_path, op_string, value),), self._orders, self._limit)
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return Query(self._collection, self._filters, self._orders + ((field_path, direction),), self._limit)
+
+    def limit(self, count):
+        return Query(self._collection, self._filters, self._orders, count)
+
+    def stream(self):
+        snapshots = [snapshot for snapshot in self._collection._stream_all()
+                     if all(_OPERATORS[op](snapshot.get(field), value) for field, op, value in self._filters)]
+        # Like Firestore, documents missing an ordered field are excluded
+        for field, _ in self._orders:
+            snapshots = [snapshot for snapshot in snapshots if snapshot.get(field) is not None]
+        for field, direction in reversed(self._orders):
+            snapshots.sort(key=lambda snapshot: snapshot.get(field), reverse=direction == Query.DESCENDING)
+        if self._limit is not None:
+            snapshots = snapshots[:self._limit]
+        yield from snapshots
+
+    def get(self):
+        return list(self.stream())
+
+
+class CollectionReference:
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        # Root collections have no parent document
+        if "/" not in self.path:
+            return None
+        parent_path, doc_id = self.path.rsplit("/", 1)[0].rsplit("/", 1)
+        return DocumentReference(self._store, parent_path, doc_id)
+
+    def document(self, doc_id):
+        return DocumentReference(self._store, self.path, doc_id)
+
+    def _stream_all(self):
+        # Firestore returns documents ordered by id when no order_by is given
+        docs = self._store._collections.get(self.path, {})
+        for doc_id in sorted(docs):
+            yield DocumentSnapshot(self.document(doc_id), docs[doc_id])
+
+    def stream(self):
+        return self._stream_all()
+
+    def get(self):
+        return list(self.stream())
+
+    def where(self, field_path, op_string, value):
+        return Query(self).where(field_path, op_string, value)
+
+    def order_by(self, field_path, direction=Query.ASCENDING):
+        return Query(self).order_by(field_path, direction)
+
+    def limit(self, count):
+        return Query(self).limit(count)
+
+
+class CollectionGroup:
+    """Every collection with the given id, at any depth."""
+
+    def __init__(self, store, collection_id):
+        self._store = store
+        self.id = collection_id
+
+    def _stream_all(self):
+        for path in sorted(self._store._collections):
+            if path.rsplit("/", 1)[-1] == self.id:
+                yield from CollectionReference(self._store, path)._stream_all()
+
+
+class LocalFirestore:
+    """
+    Minimal Firestore look-alike backed by nested dictionaries.
+    Only the calls made by the pipeline are implemented.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def collection_group(self, collection_id):
+        return Query(CollectionGroup(self, collection_id))
+
+    def get_all(self, references):
+        for reference in references:
+            yield reference.get()
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _parse_value(value):
+    if value in ("", "NULL", None):
+        return None
+    try:
+        return float(value) if "." in value else int(value)
+    except ValueError:
+        return value
+
+
+def load_local_db(data_dir):
+    """
+    Build a LocalFirestore populated from the CSV and JSON files under `data_dir`
+    (the data/unrivaled directory), mirroring the layout the scrapers write:
+    players/{name}/games/{game_id}, games/{game_id}/play_by_play/{event_id}, teams/{team}
+    and prop_lines/{player_id}_{stat_type}, plus the derived player_features.
+    """
+    db = LocalFirestore()
+    csv_dir = os.path.join(data_dir, "csv")
+
+    for row in _read_csv(os.path.join(csv_dir, "unrivaled_player_stats.csv")):
+        player_data = {key: _parse_value(value) for key, value in row.items() if key not in ("name", "player_url")}
+        player_data["player_id"] = row["player_id"] or None
+        db.collection("players").document(to_doc_id(row["name"])).set(player_data)
+
+    for row in _read_csv(os.path.join(csv_dir, "sql tables", "game_stats.csv")):
+        game_stats = {key: _parse_value(value) for key, value in row.items() if key != "player_name"}
+        game_stats["game_id"] = row["game_id"]
+        db.collection("players").document(to_doc_id(row["player_name"])).collection("games").document(row["game_id"]).set(game_stats)
+
+    for row in _read_csv(os.path.join(csv_dir, "sql tables", "games.csv")):
+        game_data = {key: _parse_value(value) for key, value in row.items() if key not in ("game_id", "play_by_play")}
+        db.collection("games").document(row["game_id"]).set(game_data)
+
+    for row in _read_csv(os.path.join(csv_dir, "unrivaled_team_stats.csv")):
+        team_data = {key: _parse_value(value) for key, value in row.items() if key != "team"}
+        db.collection("teams").document(row["team"]).set(team_data)
+
+    for path in sorted(glob.glob(os.path.join(csv_dir, "play_by_play", "*.csv"))):
+        plays = _read_csv(path)
+        for play in plays:
+            play["play_description"] = normalize_text(play["play_description"])
+            play["player"] = to_doc_id(play["player"]) if play["player"] else None
+        # Same typed fields scrape_play_by_play adds at ingest
+        for index, play in enumerate(annotate_plays(plays)):
+            # Sequential ids keep the CSV (chronological) order when streamed
+            event_id = f"{play['quarter']}_{index:04d}"
+            db.collection("games").document(play["game_id"]).collection("play_by_play").document(event_id).set(play)
+
+    with open(os.path.join(data_dir, "unr_bets.json"), "r") as f:
+        projections = json.load(f)
+    players_by_id = {item["id"]: item["attributes"] for item in projections.get("included", []) if item["type"] == "new_player"}
+    for projection in projections["data"]:
+        player_id = projection["relationships"]["new_player"]["data"]["id"]
+        stat_type = projection["attributes"]["stat_display_name"]
+        db.collection("prop_lines").document(f"{player_id}_{stat_type}").set({
+            "player_data": players_by_id.get(player_id, {}),
+            "projection_data": projection["attributes"]
+        })
+
+    # The ingest scripts keep player_features current; build it once from the bundled data
+    plays_by_game = {}
+    for doc in db.collection("players").stream():
+        rebuild_features(db, doc.id, plays_by_game)
+
+    return db
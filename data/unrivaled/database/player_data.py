@@ -1,29 +1,23 @@
 from database.firebase import db
-from concurrent.futures import ThreadPoolExecutor
+from database.cache import PlayerDataCache
+from helpers.streaks import classify_play, analyze_streaks  # noqa: F401 (re-exported)
 import sys
 
+# Shared by every stage of an analysis run; call player_cache.refresh_if_stale() at run start
+player_cache = PlayerDataCache(db)
+
 def get_game_ids_for_player(player_name):
     """
     Fetch game IDs for a specific player from the `players/player_name/games/` subcollection.
     Match player names case-insensitively, but use the original name from the `players/` collection for queries.
     """
     try:
-        # Fetch all player names from the `players/` collection
-        players_ref = db.collection("players").stream()
-        player_names = {doc.id.lower(): doc.id for doc in players_ref}  # Map lowercase names to original names
-
-        # Check if the lowercase version of the input player_name exists in the map
-        lowercase_player_name = player_name.lower()
-        if lowercase_player_name not in player_names:
+        exact_player_name = player_cache.resolve_player_name(player_name)
+        if exact_player_name is None:
             print(f"No player found with name: {player_name}", file=sys.stderr)
             return []
 
-        # Use the original name from the `players/` collection
-        exact_player_name = player_names[lowercase_player_name]
-
-        # Fetch game IDs for the player
-        games_ref = db.collection("players").document(exact_player_name).collection("games").stream()
-        game_ids = [doc.id for doc in games_ref]
+        game_ids = player_cache.game_ids(exact_player_name)
 
         print(f"Found {len(game_ids)} games for player: {exact_player_name}")
         return game_ids
@@ -37,27 +31,13 @@ def fetch_plays_for_player(game_id, player_name):
     Use the exact name format from the `players/` collection for matching.
     """
     try:
-        # Fetch all player names from the `players/` collection
-        players_ref = db.collection("players").stream()
-        player_names = {doc.id.lower(): doc.id for doc in players_ref}  # Map lowercase names to original names
-
-        # Check if the lowercase version of the input player_name exists in the map
-        lowercase_player_name = player_name.lower()
-        if lowercase_player_name not in player_names:
+        exact_player_name = player_cache.resolve_player_name(player_name)
+        if exact_player_name is None:
             print(f"No player found with name: {player_name}", file=sys.stderr)
             return []
 
-        # Use the original name from the `players/` collection
-        exact_player_name = player_names[lowercase_player_name]
-
-        # Query the play_by_play subcollection for the game
-        plays_ref = db.collection("games").document(game_id).collection("play_by_play").stream()
-
-        # Filter plays for the specific player (case-insensitive and trimmed)
-        plays = [
-            play.to_dict() for play in plays_ref 
-            if play.to_dict().get("player") and play.to_dict().get("player").lower().strip() == exact_player_name.lower().strip()
-        ]
+        # The game's plays are read once and shared by every player in it
+        plays = player_cache.plays_for_player(game_id, exact_player_name)
 
         print(f"Found {len(plays)} plays for {exact_player_name} in game {game_id}")
         return plays
@@ -65,69 +45,47 @@ def fetch_plays_for_player(game_id, player_name):
         print(f"Error fetching plays for player {player_name} in game {game_id}: {e}", file=sys.stderr)
         return []
 
-def analyze_streaks(plays, player_name, stat_type):
-    print(f"Looking at possible {stat_type} streaks for {player_name}")
+def last_n_games(player_name, n=5):
     """
-    Analyze streaks in parallel for large datasets.
+    Fetch the player's n most recent game docs, newest first.
+    Answered from the run cache when the game log is already loaded; otherwise an
+    `order_by("game_date").limit(n)` query reads only those n docs.
     """
-    streaks = {
-        "hot_streaks": 0,
-        "cold_streaks": 0,
-        "assist_streaks": 0,
-        "rebound_streaks": 0,
-    }
-
-    def process_play(play, previous_play):
-        description = play.get("play_description", "").lower()
-        result = {"hot": 0, "cold": 0, "assist": 0, "rebound": 0}
-
-        if stat_type == "Points":
-            if "makes" in description:
-                if previous_play and "makes" in previous_play.get("play_description", "").lower():
-                    result["hot"] = 1
-            elif "misses" in description:
-                if previous_play and "misses" in previous_play.get("play_description", "").lower():
-                    result["cold"] = 1
-        elif stat_type == "Assists":
-            if "assist" in description:
-                if previous_play and "turnover" not in previous_play.get("play_description", "").lower():
-                    result["assist"] = 1
-        elif stat_type == "Rebounds":
-            if "offensive rebound" in description or "defensive rebound" in description:
-                if previous_play and ("offensive rebound" in previous_play.get("play_description", "").lower() or
-                                   "defensive rebound" in previous_play.get("play_description", "").lower()):
-                    result["rebound"] = 1
-        elif stat_type == "Pts+Rebs+Asts":
-            if "makes" in description or "misses" in description:
-                if previous_play and ("makes" in previous_play.get("play_description", "").lower() or
-                                   "misses" in previous_play.get("play_description", "").lower()):
-                    result["hot"] = 1
-            elif "assist" in description:
-                if previous_play and "turnover" not in previous_play.get("play_description", "").lower():
-                    result["assist"] = 1
-            elif "offensive rebound" in description or "defensive rebound" in description:
-                if previous_play and ("offensive rebound" in previous_play.get("play_description", "").lower() or
-                                   "defensive rebound" in previous_play.get("play_description", "").lower()):
-                    result["rebound"] = 1
-
-        return result
-
-    with ThreadPoolExecutor() as executor:
-        futures = []
-        previous_play = None
-        for play in plays:
-            futures.append(executor.submit(process_play, play, previous_play))
-            previous_play = play
-
-        for future in futures:
-            result = future.result()
-            streaks["hot_streaks"] += result["hot"]
-            streaks["cold_streaks"] += result["cold"]
-            streaks["assist_streaks"] += result["assist"]
-            streaks["rebound_streaks"] += result["rebound"]
-
-    print(f"Streaks found for {player_name} in stat type: {stat_type}")
-    return streaks
+    try:
+        exact_player_name = player_cache.resolve_player_name(player_name) or player_name.replace(" ", "_")
+        game_log = player_cache.loaded_game_log(exact_player_name)
+        if game_log is not None:
+            dated_games = [game for game in game_log.values() if game.get("game_date")]
+            return sorted(dated_games, key=lambda game: game["game_date"], reverse=True)[:n]
+
+        games_ref = db.collection("players").document(exact_player_name).collection("games")
+        query = games_ref.order_by("game_date", direction="DESCENDING").limit(n)
+        return [doc.to_dict() for doc in query.stream()]
+    except Exception as e:
+        print(f"Error fetching last {n} games for player {player_name}: {e}", file=sys.stderr)
+        return []
+
+def games_vs_opponent(player_name, opposing_team):
+    """
+    Fetch the player's game docs against an opponent, newest first.
+    Answered from the run cache when the game log is already loaded; otherwise a
+    `where("opponent", "==", ...)` query ordered by `game_date` (composite index in
+    database/firestore.indexes.json) reads only the matching docs.
+    """
+    try:
+        exact_player_name = player_cache.resolve_player_name(player_name) or player_name.replace(" ", "_")
+        game_log = player_cache.loaded_game_log(exact_player_name)
+        if game_log is not None:
+            matching_games = [game for game in game_log.values()
+                              if (game.get("opponent") or "").lower() == opposing_team.lower()]
+            return sorted(matching_games, key=lambda game: game.get("game_date") or "", reverse=True)
+
+        games_ref = db.collection("players").document(exact_player_name).collection("games")
+        query = games_ref.where("opponent", "==", opposing_team).order_by("game_date", direction="DESCENDING")
+        return [doc.to_dict() for doc in query.stream()]
+    except Exception as e:
+        print(f"Error fetching games for player {player_name} against {opposing_team}: {e}", file=sys.stderr)
+        return []
 
 def get_game_stats(game_id, player_name):
     """
@@ -135,25 +93,12 @@ def get_game_stats(game_id, player_name):
     Use the exact name format from the `players/` collection for matching.
     """
     try:
-        # Fetch all player names from the `players/` collection
-        players_ref = db.collection("players").stream()
-        player_names = {doc.id.lower(): doc.id for doc in players_ref}  # Map lowercase names to original names
-
-        # Check if the lowercase version of the input player_name exists in the map
-        lowercase_player_name = player_name.lower()
-        if lowercase_player_name not in player_names:
+        exact_player_name = player_cache.resolve_player_name(player_name)
+        if exact_player_name is None:
             print(f"No player found with name: {player_name}", file=sys.stderr)
             return {}
 
-        # Use the original name from the `players/` collection
-        exact_player_name = player_names[lowercase_player_name]
-
-        # Fetch the player's game stats
-        game_stats_ref = db.collection("players").document(exact_player_name).collection("games").document(game_id).get()
-        if game_stats_ref.exists:
-            game_stats = game_stats_ref.to_dict()
-            return game_stats
-        return {}
+        return player_cache.game_stats(exact_player_name, game_id) or {}
     except Exception as e:
         print(f"Error fetching game stats for player {player_name} in game {game_id}: {e}", file=sys.stderr)
         return {}
@@ -164,18 +109,11 @@ def get_opposing_team_stats(game_id, player_team):
     Use the exact team name from the `teams/` collection for matching.
     """
     try:
-        game_doc = db.collection("games").document(game_id).get()
-        if game_doc.exists:
-            game_data = game_doc.to_dict()
+        game_data = player_cache.games([game_id])[game_id]
+        if game_data:
             opposing_team = game_data["away_team"] if game_data["home_team"] == player_team else game_data["home_team"]
-            # print(player_team, opposing_team)
-
-            # Fetch the opposing team's stats
-            opposing_team_stats = db.collection("teams").document(opposing_team).get()
-            if opposing_team_stats.exists:
-                return {"opposing_team": opposing_team, **opposing_team_stats.to_dict()}  # Include team name and stats
-            else:
-                return {"opposing_team": opposing_team}  # Return at least the team name if stats are missing
+            # Include team name and stats (at least the team name if stats are missing)
+            return {"opposing_team": opposing_team, **player_cache.team(opposing_team)}
         return {"opposing_team": "Unknown"}  # Default if game data is missing
     except Exception as e:
         print(f"Error fetching opposing team stats for game {game_id}: {e}", file=sys.stderr)
@@ -185,46 +123,49 @@ def get_past_performance_against_opponent(player_name, opposing_team):
     """
     Fetch and analyze the player's past performance against a specific opposing team.
     Use the exact name format from the `players/` collection for matching.
+    The player doc, game log, `games/` docs and team docs come from the run cache, so
+    repeated calls for other stat types cost no further reads.
     """
     try:
-        # Fetch all player names from the `players/` collection
-        players_ref = db.collection("players").stream()
-        player_names = {doc.id.lower(): doc.id for doc in players_ref}  # Map lowercase names to original names
-
-        # Check if the lowercase version of the input player_name exists in the map
-        lowercase_player_name = player_name.lower()
-        if lowercase_player_name not in player_names:
+        exact_player_name = player_cache.resolve_player_name(player_name)
+        if exact_player_name is None:
             print(f"No player found with name: {player_name}", file=sys.stderr)
             return []
 
-        # Use the original name from the `players/` collection
-        exact_player_name = player_names[lowercase_player_name]
-
-        # Fetch game IDs for the player
-        games_ref = db.collection("players").document(exact_player_name).collection("games").stream()
-        doc_ref = db.collection("players").document(exact_player_name)
-        doc = doc_ref.get()
+        team = (player_cache.player(exact_player_name) or {}).get("team")
 
-        team = doc.to_dict().get("team")
+        # Game docs carrying the precomputed `opponent` field are filtered locally;
+        # the rest need their `games/` doc.
+        matching_games = []
+        unresolved_games = []
+        for game_id, game_stats in player_cache.game_log(exact_player_name).items():
+            if game_stats.get("opponent"):
+                if game_stats["opponent"].lower() == opposing_team.lower():
+                    matching_games.append((game_id, game_stats, game_stats["opponent"]))
+            else:
+                unresolved_games.append((game_id, game_stats))
+
+        if unresolved_games:
+            # One batched read for any `games/` docs not cached yet
+            game_docs = player_cache.games([game_id for game_id, _ in unresolved_games])
+            for game_id, game_stats in unresolved_games:
+                game_data = game_docs.get(game_id)
+                if not game_data:
+                    continue
+                opponent = game_data["away_team"] if game_data["home_team"] == team else game_data["home_team"]
+                if opponent.lower() == opposing_team.lower():
+                    matching_games.append((game_id, game_stats, opponent))
 
-        # print(team)
         past_performance = []
-
-        for game in games_ref:
-            # game_data = game.to_dict()
-            game_id = game.id
-            game_stats = get_game_stats(game_id, exact_player_name)
-            opposing_team_stats = get_opposing_team_stats(game_id, team)
-
-            if opposing_team_stats.get("opposing_team", "").lower() == opposing_team.lower():
-                past_performance.append({
-                    "game_id": game_id,
-                    "stats": game_stats,
-                    "opposing_team_stats": opposing_team_stats
-                })
+        for game_id, game_stats, opponent in matching_games:
+            past_performance.append({
+                "game_id": game_id,
+                "stats": game_stats,
+                "opposing_team_stats": {"opposing_team": opponent, **player_cache.team(opponent)}
+            })
 
         print(f"Found {len(past_performance)} past performances for {exact_player_name} against {opposing_team}")
         return past_performance
     except Exception as e:
         print(f"Error fetching past performance for {player_name} against {opposing_team}: {e}", file=sys.stderr)
-        return []
\ No newline at end of file
+        return []
@@ -1,10 +1,111 @@
 import json
+import os
+import re
 import sys
+import threading
+import unicodedata
+from collections import defaultdict
+
+# Injury reports from injury_reports.json, parsed once per process and re-read only when the
+# file changes (its mtime or size). Reports are indexed by normalized team and player name,
+# so "reports for these two teams" and "is this player out" are dict lookups. Point
+# INJURY_REPORTS_PATH elsewhere to use another file.
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INJURY_REPORTS_PATH = os.getenv("INJURY_REPORTS_PATH", os.path.join(DATA_DIR, "injury_reports.json"))
+
+# Players with these statuses will not play; their props are skipped
+INACTIVE_STATUSES = {"OUT", "INACTIVE", "SUSPENDED"}
+
+
+def normalize_team(name):
+    """'ROSE', 'Rose BC' and ' rose ' -> 'rose'."""
+    name = re.sub(r"\s+", " ", (name or "").strip().lower())
+    return re.sub(r" bc$", "", name)
+
+
+def normalize_player(name):
+    """'Napheesa_Collier', 'NAPHEESA COLLIER' and 'Napheesa Collier' -> 'napheesa collier'."""
+    name = unicodedata.normalize("NFKD", name or "").encode("ASCII", "ignore").decode("utf-8")
+    name = re.sub(r"[^a-z0-9 ]", "", name.lower().replace("_", " "))
+    return re.sub(r"\s+", " ", name).strip()
+
+
+class InjuryReports:
+    """
+    The report list with team and player indexes. Iterates, tests and prints like
+    the list it wraps, so code written against the plain list keeps working.
+    """
+
+    def __init__(self, reports):
+        self.reports = reports
+        self.by_team = defaultdict(list)
+        self.by_player = {}
+        for position, report in enumerate(reports):
+            self.by_team[normalize_team(report.get("team"))].append((position, report))
+            self.by_player[normalize_player(report.get("player"))] = report
+
+    @classmethod
+    def of(cls, reports):
+        """`reports` as an InjuryReports, indexing a plain list if needed."""
+        return reports if isinstance(reports, cls) else cls(list(reports or []))
+
+    def for_teams(self, *teams):
+        """Reports for any of `teams`, in file order."""
+        matches = []
+        for team in {normalize_team(team) for team in teams}:
+            matches.extend(self.by_team.get(team, ()))
+        return [report for _, report in sorted(matches, key=lambda match: match[0])]
+
+    def for_player(self, player_name):
+        return self.by_player.get(normalize_player(player_name))
+
+    def inactive(self, player_name):
+        """The player's report if their status rules them out, else None."""
+        report = self.for_player(player_name)
+        if report and str(report.get("status", "")).upper() in INACTIVE_STATUSES:
+            return report
+        return None
+
+    def __iter__(self):
+        return iter(self.reports)
+
+    def __len__(self):
+        return len(self.reports)
+
+    def __repr__(self):
+        return repr(self.reports)
+
+
+class InjuryReportLoader:
+    def __init__(self, path=INJURY_REPORTS_PATH):
+        self.path = path
+        self._reports = InjuryReports([])
+        self._version = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """The current reports; the file is only parsed again after it changes."""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            print(f"Error fetching injury reports: {e}", file=sys.stderr)
+            return self._reports
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if version != self._version:
+                try:
+                    with open(self.path, "r") as f:
+                        self._reports = InjuryReports(json.load(f).get("injury_reports", []))
+                except Exception as e:
+                    print(f"Error fetching injury reports: {e}", file=sys.stderr)
+                    self._reports = InjuryReports([])
+                self._version = version
+            return self._reports
+
+
+injury_loader = InjuryReportLoader()
+
 
 def fetch_injury_reports():
-    try:
-        with open("/Users/ajoyner/unrivaled_ai_sportsbet/data/unrivaled/injury_reports.json", "r") as f:
-            return json.load(f).get("injury_reports", [])
-    except Exception as e:
-        print(f"Error fetching injury reports: {e}", file=sys.stderr)
-        return []
+    return injury_loader.load()
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import aiohttp
+from helpers.tracing import span, count
+from helpers.llm_ledger import ledger
+
+# HTTP layer for chat-completion calls. Only the request is retried, never the caller's
+# Firestore work: 429 and 5xx responses and connection errors are retried with jittered
+# exponential backoff (or the server's Retry-After), and a process-wide circuit breaker
+# pauses every caller while the provider is throttling or failing. With LLM_STREAMING=1
+# replies are requested as server-sent events and handed to `on_delta` as they arrive.
+# Every call is written to the LLM ledger (helpers/llm_ledger.py) under its stage, player
+# and stat type, and no call is made once the slate's token budget is spent.
+
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "30"))
+# Consecutive failures that open the breaker, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+LLM_STREAMING = os.getenv("LLM_STREAMING", "0") == "1"
+
+
+class LLMRequestError(Exception):
+    """A chat-completion request that failed permanently or ran out of attempts."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMBudgetExceeded(LLMRequestError):
+    """The slate's LLM_TOKEN_BUDGET is spent; the request was not sent."""
+
+
+class CircuitBreaker:
+    """
+    Shared pause for all callers. A 429 with Retry-After pauses everyone for that long;
+    `threshold` consecutive failures pause everyone for `cooldown` seconds.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    async def wait(self):
+        remaining = self.open_until - time.monotonic()
+        while remaining > 0:
+            await asyncio.sleep(remaining)
+            remaining = self.open_until - time.monotonic()
+
+    def pause(self, seconds):
+        self.open_until = max(self.open_until, time.monotonic() + seconds)
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self, retry_after=None):
+        self.consecutive_failures += 1
+        if retry_after is not None:
+            self.pause(retry_after)
+        if self.consecutive_failures >= self.threshold:
+            print(f"LLM provider failing ({self.consecutive_failures} in a row); pausing requests for {self.cooldown:.0f}s.", file=sys.stderr)
+            self.pause(self.cooldown)
+            self.consecutive_failures = 0
+
+
+breaker = CircuitBreaker()
+
+
+def parse_retry_after(value):
+    """Retry-After in seconds from either a delay or an HTTP date (None if absent/invalid)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, base=LLM_BACKOFF_BASE, cap=LLM_BACKOFF_CAP):
+    """Full-jitter exponential backoff for the given (0-based) attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def read_event_stream(response, on_delta=None):
+    """
+    Read an SSE chat-completion stream. Deltas are collected in a list and joined once
+    at the end, and each one is passed to `on_delta` as soon as it arrives.
+
+    Returns:
+        dict: A response shaped like the non-streaming one (choices[0].message.content, usage).
+    """
+    parts = []
+    usage = None
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        event = json.loads(data)
+        usage = event.get("usage") or usage
+        for choice in event.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                parts.append(delta)
+                if on_delta is not None:
+                    on_delta(delta)
+    return {
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)}}],
+        "usage": usage,
+    }
+
+
+async def post_chat_completion(session, url, headers, payload, timeout=None, max_attempts=LLM_MAX_ATTEMPTS, circuit=breaker,
+                               stream=LLM_STREAMING, on_delta=None, on_stream_start=None, stage=None, player=None, stat_type=None):
+    """
+    POST a chat-completion request, retrying only transport failures.
+
+    Args:
+        session (aiohttp.ClientSession): Session to send the request with.
+        url (str): Chat completions endpoint.
+        headers (dict): Request headers.
+        payload (dict): JSON body.
+        timeout (aiohttp.ClientTimeout, optional): Per-attempt timeout.
+        max_attempts (int): Attempts before giving up.
+        circuit (CircuitBreaker): Breaker shared by all callers.
+        stream (bool): Request server-sent events instead of one JSON body.
+        on_delta (callable, optional): Called with each text delta when streaming.
+        on_stream_start (callable, optional): Called before each streamed reply's first
+            delta, so state built from the deltas can be reset when an attempt is retried.
+        stage, player, stat_type (str, optional): What the call is for, in the LLM ledger.
+
+    Returns:
+        dict: The decoded JSON response.
+
+    Raises:
+        LLMBudgetExceeded: When the slate's token budget is already spent.
+        LLMRequestError: On a non-retryable status or when attempts are exhausted.
+    """
+    labels = {"stage": stage, "player": player, "stat_type": stat_type, "model": payload.get("model")}
+    # The ledger is SQLite, shared with other runs and workers; keep its I/O off the event loop
+    if await asyncio.to_thread(ledger.budget_exhausted):
+        raise LLMBudgetExceeded(f"LLM token budget of {ledger.budget} for slate {ledger.slate} is spent")
+    if stream:
+        payload = {**payload, "stream": True}
+    started = time.perf_counter()
+    with span("llm_call", model=payload.get("model"), stream=stream) as attributes:
+        try:
+            result = await _post_with_retries(session, url, headers, payload, timeout, max_attempts, circuit, stream, on_delta,
+                                              on_stream_start, attributes)
+        except LLMRequestError:
+            await asyncio.to_thread(ledger.record, **labels, latency=time.perf_counter() - started,
+                                    retries=attributes.get("attempts", 1) - 1, status="error")
+            raise
+        usage = result.get("usage") or {}
+        attributes.update(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"))
+    await asyncio.to_thread(ledger.record, **labels, usage=usage, latency=time.perf_counter() - started, retries=attributes["attempts"] - 1)
+    count("llm.requests")
+    count("llm.prompt_tokens", usage.get("prompt_tokens") or 0)
+    count("llm.completion_tokens", usage.get("completion_tokens") or 0)
+    return result
+
+
+async def _post_with_retries(session, url, headers, payload, timeout, max_attempts, circuit, stream, on_delta, on_stream_start, attributes):
+    last_error = None
+    for attempt in range(max_attempts):
+        await circuit.wait()
+        retry_after = None
+        attributes["attempts"] = attempt + 1
+        count("http.requests")
+        try:
+            async with session.post(url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status == 200:
+                    if stream and on_stream_start is not None:
+                        on_stream_start()
+                    result = await read_event_stream(response, on_delta) if stream else await response.json()
+                    circuit.record_success()
+                    return result
+                error_text = await response.text()
+                if response.status not in RETRYABLE_STATUSES and response.status < 500:
+                    raise LLMRequestError(f"API Error {response.status}: {error_text}", response.status)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                last_error = LLMRequestError(f"API Error {response.status}: {error_text}", response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_error = LLMRequestError(f"{type(e).__name__}: {e}")
+
+        circuit.record_failure(retry_after)
+        if attempt + 1 < max_attempts:
+            count("llm.retries")
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            print(f"LLM request failed ({last_error}); retrying in {delay:.1f}s (attempt {attempt + 2}/{max_attempts}).", file=sys.stderr)
+            await asyncio.sleep(delay)
+
+    raise LLMRequestError(f"Gave up after {max_attempts} attempts: {last_error}", getattr(last_error, "status", None))
+
+
+def completion_text(result):
+    """The first choice's message content, or None."""
+    if result and "choices" in result and len(result["choices"]) > 0:
+        return result["choices"][0]["message"]["content"]
+    return None
@@ -0,0 +1,233 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+
+# Ledger of every chat-completion call: one SQLite row per call with its stage, player,
+# stat type, model, prompt/completion/cached tokens, latency, retries and whether a stored
+# answer was reused instead (cache_hit). Set LLM_LEDGER to the database path to keep it.
+#
+# LLM_TOKEN_BUDGET caps the tokens one slate may spend (a slate is LLM_SLATE, by default
+# today's date). Tokens recorded in the ledger count toward it across runs and Celery
+# workers; without a ledger only this process's calls count. Once the budget is spent the scheduler
+# degrades the remaining props to the fast path and post_chat_completion refuses new calls.
+#
+# Aggregate cost and latency by stage, prop or model with:
+#   python -m helpers.llm_ledger [LLM_LEDGER] [--by stage|prop|model] [--slate 2025-02-14]
+
+LLM_LEDGER = os.getenv("LLM_LEDGER")
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", "0"))
+LLM_SLATE = os.getenv("LLM_SLATE") or date.today().isoformat()
+
+# USD per million tokens: uncached prompt, cached prompt, completion
+MODEL_PRICES = {
+    "deepseek-chat": (0.27, 0.07, 1.10),
+    "deepseek-reasoner": (0.55, 0.14, 2.19),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    slate TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    stage TEXT,
+    player TEXT,
+    stat_type TEXT,
+    model TEXT,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    cache_hit INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_calls_slate ON llm_calls (slate);
+"""
+
+COLUMNS = ("created_at", "slate", "run_id", "stage", "player", "stat_type", "model", "prompt_tokens", "completion_tokens",
+           "cached_prompt_tokens", "latency_ms", "retries", "cache_hit", "status")
+
+
+def usage_tokens(usage):
+    """(prompt, completion, cached prompt) tokens from a response's usage block (DeepSeek or OpenAI)."""
+    usage = usage or {}
+    cached = usage.get("prompt_cache_hit_tokens")
+    if cached is None:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0, cached or 0
+
+
+def call_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens):
+    """USD cost of one call, or None for a model without a price."""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    uncached, cached, completion = prices
+    return ((prompt_tokens - cached_prompt_tokens) * uncached + cached_prompt_tokens * cached + completion_tokens * completion) / 1e6
+
+
+class Ledger:
+    def __init__(self, path=LLM_LEDGER, budget=LLM_TOKEN_BUDGET, slate=LLM_SLATE):
+        self.path = path
+        self.budget = budget
+        self.slate = slate
+        self.run_id = uuid.uuid4().hex
+        self.run_tokens = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            # Celery workers append to the same file
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def record(self, stage=None, player=None, stat_type=None, model=None, usage=None, latency=0.0, retries=0,
+               cache_hit=False, status="ok"):
+        """Add one call (or one reused answer, with cache_hit=True) to the ledger."""
+        prompt_tokens, completion_tokens, cached_prompt_tokens = usage_tokens(usage)
+        with self._lock:
+            self.run_tokens += prompt_tokens + completion_tokens
+            if not self.enabled:
+                return
+            row = (datetime.now().isoformat(), self.slate, self.run_id, stage, player, stat_type, model, prompt_tokens,
+                   completion_tokens, cached_prompt_tokens, round(latency * 1000, 3), retries, int(cache_hit), status)
+            try:
+                self._connect().execute(f"INSERT INTO llm_calls ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", row)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not write to the LLM ledger {self.path}: {e}", file=sys.stderr)
+
+    def slate_tokens(self):
+        """Tokens spent on this slate so far: every run in the ledger, or this process without one."""
+        if not self.enabled:
+            return self.run_tokens
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM llm_calls WHERE slate = ?", (self.slate,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not read the LLM ledger {self.path}: {e}", file=sys.stderr)
+                return self.run_tokens
+        return row[0]
+
+    def budget_exhausted(self):
+        return bool(self.budget) and self.slate_tokens() >= self.budget
+
+
+ledger = Ledger()
+
+
+def load_calls(path, slate=None, run_id=None):
+    """Ledger rows for one slate (the latest by default), optionally one run, as dicts."""
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    try:
+        if slate is None:
+            latest = connection.execute("SELECT slate FROM llm_calls ORDER BY id DESC LIMIT 1").fetchone()
+            if latest is None:
+                return []
+            slate = latest["slate"]
+        query = "SELECT * FROM llm_calls WHERE slate = ?"
+        arguments = [slate]
+        if run_id:
+            query += " AND run_id = ?"
+            arguments.append(run_id)
+        return [dict(row) for row in connection.execute(query, arguments)]
+    finally:
+        connection.close()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def aggregate(calls, by="stage"):
+    """
+    Calls, cache hits, errors, retries, tokens, cost and latency per group, most
+    tokens first. `by` is "stage", "prop" (player and stat type) or "model".
+
+    Returns:
+        list: One dict per group.
+    """
+    key = {
+        "stage": lambda call: call["stage"] or "-",
+        "prop": lambda call: f"{call['player'] or '-'} {call['stat_type'] or '(all stats)'}",
+        "model": lambda call: call["model"] or "-",
+    }[by]
+    groups = defaultdict(list)
+    for call in calls:
+        groups[key(call)].append(call)
+
+    rows = []
+    for name, group in groups.items():
+        requests = [call for call in group if not call["cache_hit"]]
+        costs = [call_cost(call["model"], call["prompt_tokens"], call["completion_tokens"], call["cached_prompt_tokens"]) for call in requests]
+        latencies = [call["latency_ms"] for call in requests if call["status"] == "ok"]
+        rows.append({
+            by: name,
+            "calls": len(requests),
+            "cache_hits": len(group) - len(requests),
+            "errors": sum(call["status"] != "ok" for call in requests),
+            "retries": sum(call["retries"] for call in requests),
+            "prompt_tokens": sum(call["prompt_tokens"] for call in requests),
+            "completion_tokens": sum(call["completion_tokens"] for call in requests),
+            "cached_prompt_tokens": sum(call["cached_prompt_tokens"] for call in requests),
+            "cost_usd": sum(cost for cost in costs if cost is not None),
+            "latency_p50_ms": _percentile(latencies, 50),
+            "latency_p95_ms": _percentile(latencies, 95),
+            "latency_total_s": sum(latencies) / 1000,
+        })
+    return sorted(rows, key=lambda row: row["prompt_tokens"] + row["completion_tokens"], reverse=True)
+
+
+def format_report(rows, by="stage", top=None):
+    lines = [f"{by:<32}{'calls':>7}{'hits':>6}{'errs':>6}{'retry':>6}{'prompt':>10}{'compl':>9}{'cached':>9}"
+             f"{'cost $':>9}{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}"]
+    for row in rows[:top]:
+        lines.append(f"{str(row[by])[:31]:<32}{row['calls']:>7}{row['cache_hits']:>6}{row['errors']:>6}{row['retries']:>6}"
+                     f"{row['prompt_tokens']:>10}{row['completion_tokens']:>9}{row['cached_prompt_tokens']:>9}"
+                     f"{row['cost_usd']:>9.4f}{row['latency_p50_ms']:>9.0f}{row['latency_p95_ms']:>9.0f}{row['latency_total_s']:>9.1f}")
+    total_tokens = sum(row["prompt_tokens"] + row["completion_tokens"] for row in rows)
+    lines.append(f"\n{sum(row['calls'] for row in rows)} calls, {total_tokens} tokens, ${sum(row['cost_usd'] for row in rows):.4f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate LLM cost and latency from a ledger written with LLM_LEDGER.")
+    parser.add_argument("path", nargs="?", default=LLM_LEDGER or "llm_ledger.sqlite")
+    parser.add_argument("--by", choices=("stage", "prop", "model"), default="stage")
+    parser.add_argument("--slate", help="Slate to report (default: the latest in the ledger)")
+    parser.add_argument("--run-id", help="Only this run")
+    parser.add_argument("--top", type=int)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f"No ledger at {args.path}.", file=sys.stderr)
+        return 1
+    calls = load_calls(args.path, args.slate, args.run_id)
+    if not calls:
+        print(f"No calls found in {args.path}.", file=sys.stderr)
+        return 1
+    print(f"slate {calls[0]['slate']}, {len({call['run_id'] for call in calls})} run(s)")
+    print(format_report(aggregate(calls, args.by), args.by, args.top))
+    if LLM_TOKEN_BUDGET:
+        spent = sum(call["prompt_tokens"] + call["completion_tokens"] for call in calls)
+        print(f"budget: {spent} of {LLM_TOKEN_BUDGET} tokens ({spent / LLM_TOKEN_BUDGET:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
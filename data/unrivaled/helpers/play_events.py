@@ -0,0 +1,132 @@
+import re
+from enum import Enum
+
+# Typed play-by-play events. Descriptions are parsed once when a game is scraped and
+# the fields below are stored on each play document, so analysis code reads
+# `play["event"]` instead of scanning lowercased descriptions.
+
+
+class EventType(str, Enum):
+    SHOT = "shot"
+    FREE_THROW = "free_throw"
+    REBOUND = "rebound"
+    ASSIST = "assist"
+    TURNOVER = "turnover"
+    FOUL = "foul"
+    TIMEOUT = "timeout"
+    JUMPBALL = "jumpball"
+    PERIOD_END = "period_end"
+    OTHER = "other"
+
+
+TYPED_FIELDS = ("event", "made", "shot_value", "assister", "rebound_type", "turnover_type", "foul_type")
+
+SHOT_PATTERN = re.compile(r"\b(makes|misses) (two|three) point shot")
+FREE_THROW_PATTERN = re.compile(r"\b(makes|misses) free throw(?: \((\d)pt\.?\))?")
+REBOUND_PATTERN = re.compile(r"\b(offensive|defensive)(?: team)? rebound")
+TURNOVER_TYPES = ("bad pass", "lost ball", "out of bounds", "travel", "offensive foul",
+                  "shot clock violation", "backcourt violation", "lane violation", "double dribble")
+FOUL_PATTERN = re.compile(r"(?:^|\s)([a-z]+ )?foul$")
+
+
+def parse_play(description):
+    """
+    Parse a play description into typed fields.
+
+    Args:
+        description (str): Play description as scraped, e.g. "Angel Reese makes free throw (2pt.)".
+
+    Returns:
+        dict: event, made, shot_value, assister, rebound_type, turnover_type and foul_type
+        (fields that do not apply are None; assister is filled in by annotate_plays).
+    """
+    text = (description or "").strip().lower()
+    fields = dict.fromkeys(TYPED_FIELDS)
+    fields["event"] = EventType.OTHER.value
+
+    match = SHOT_PATTERN.search(text)
+    if match:
+        fields.update(event=EventType.SHOT.value, made=match.group(1) == "makes",
+                      shot_value=2 if match.group(2) == "two" else 3)
+        return fields
+
+    match = FREE_THROW_PATTERN.search(text)
+    if match:
+        # Unrivaled free throws are single shots worth the value of the fouled shot
+        fields.update(event=EventType.FREE_THROW.value, made=match.group(1) == "makes",
+                      shot_value=int(match.group(2)) if match.group(2) else 1)
+        return fields
+
+    match = REBOUND_PATTERN.search(text)
+    if match:
+        fields.update(event=EventType.REBOUND.value, rebound_type=match.group(1))
+        return fields
+
+    if text.endswith(" assist"):
+        fields["event"] = EventType.ASSIST.value
+        return fields
+
+    if text.endswith("turnover"):
+        prefix = text[:-len("turnover")].rstrip()
+        turnover_type = next((kind for kind in TURNOVER_TYPES if prefix.endswith(kind)), "unspecified")
+        fields.update(event=EventType.TURNOVER.value, turnover_type=turnover_type)
+        return fields
+
+    match = FOUL_PATTERN.search(text)
+    if match:
+        foul_type = (match.group(1) or "").strip()
+        fields.update(event=EventType.FOUL.value, foul_type=foul_type or "unspecified")
+        return fields
+
+    if "timeout" in text:
+        fields["event"] = EventType.TIMEOUT.value
+    elif text.startswith("jumpball"):
+        fields["event"] = EventType.JUMPBALL.value
+    elif text.startswith("end of"):
+        fields["event"] = EventType.PERIOD_END.value
+    return fields
+
+
+def _is_assisted_shot(play, assist):
+    return (play.get("event") == EventType.SHOT.value and play.get("made")
+            and play.get("team") == assist.get("team") and play.get("time") == assist.get("time"))
+
+
+def annotate_plays(plays):
+    """
+    Add the typed fields to a game's plays (in page order) in place.
+    Assists are listed next to the made shot they set up, either just before or just
+    after it, so the scorer gets `assister` from the neighbouring assist row.
+
+    Returns:
+        list: The same plays, annotated.
+    """
+    for play in plays:
+        play.update(parse_play(play.get("play_description", "")))
+
+    for index, play in enumerate(plays):
+        if play["event"] != EventType.ASSIST.value:
+            continue
+        for neighbour in (index - 1, index + 1):
+            if 0 <= neighbour < len(plays) and _is_assisted_shot(plays[neighbour], play) and not plays[neighbour]["assister"]:
+                plays[neighbour]["assister"] = play.get("player")
+                break
+    return plays
+
+
+def typed(play):
+    """
+    Return a play with its typed fields. Plays ingested before typed parsing
+    existed are parsed on the fly.
+    """
+    if "event" in play:
+        return play
+    return {**play, **parse_play(play.get("play_description", ""))}
+
+
+def points_scored(play):
+    """Points produced by a play (0 unless it is a made shot or free throw)."""
+    play = typed(play)
+    if play["event"] in (EventType.SHOT.value, EventType.FREE_THROW.value) and play["made"]:
+        return play["shot_value"] or 0
+    return 0
@@ -0,0 +1,170 @@
+import atexit
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+# CPU and memory profiling for the entry points' --profile option. Each top-level stage of
+# a run (the outermost tracing span open on the main thread: fetch_schedule, scrape_games,
+# load_props, analyze, ...) runs under its own cProfile and tracemalloc window, and writes
+# to the profile directory:
+#   NN-<stage>.pstats       cProfile stats (python -m pstats, snakeviz)
+#   NN-<stage>.alloc.txt    wall/CPU time, peak and net traced memory, top allocation sites
+#   stacks.collapsed        sampled stacks of every thread, rooted at the stage name, for
+#                           flamegraph.pl / speedscope / inferno
+#   summary.txt             one line per stage, also printed to stderr
+# Spans nested inside a stage are part of it. cProfile only sees the main thread, the
+# stack sampler sees all threads (waiting ones included, so it is a wall-clock profile),
+# and neither follows work into worker processes.
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+TOP_ALLOCATIONS = 25
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Allocations made by the profiler itself are left out of the stage reports
+_ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def _short_path(filename):
+    return os.path.relpath(filename, ROOT_DIR) if filename.startswith(ROOT_DIR) else os.path.basename(filename)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StageProfiler:
+    def __init__(self):
+        self.directory = None
+        self.summaries = []
+        self._stage = None
+        self._stacks = Counter()
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def start(self, directory, run_name):
+        """Profile this run's stages into a new <directory>/<run_name>-<timestamp>/."""
+        self.directory = os.path.join(directory or PROFILE_DIR, f"{run_name}-{datetime.now():%Y%m%d-%H%M%S}")
+        os.makedirs(self.directory, exist_ok=True)
+        tracemalloc.start()
+        self._sampler = threading.Thread(target=self._sample, name="stage-profiler", daemon=True)
+        self._sampler.start()
+        atexit.register(self.finish)
+
+    def _sample(self):
+        sampler_id = threading.get_ident()
+        names = {}
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            stage = self._stage
+            if stage is None:
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stack.append(stage)
+                self._stacks[";".join(reversed(stack))] += 1
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Profile the block as stage `name` unless a stage is already open or this is not the main thread."""
+        if self.directory is None or self._stage is not None or threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        index = len(self.summaries) + 1
+        before = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        profile = cProfile.Profile()
+        self._stage = name
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+            self._stage = None
+            end_memory, peak_memory = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+            self._write_stage(index, name, profile, after.compare_to(before, "lineno"), {
+                "stage": name,
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+                "peak_mb": (peak_memory - start_memory) / 2 ** 20,
+                "net_mb": (end_memory - start_memory) / 2 ** 20,
+            })
+
+    def _write_stage(self, index, name, profile, allocations, summary):
+        prefix = os.path.join(self.directory, f"{index:02d}-{name}")
+        profile.dump_stats(prefix + ".pstats")
+        allocations = sorted(allocations, key=lambda stat: stat.size_diff, reverse=True)[:TOP_ALLOCATIONS]
+        summary["top_allocation"] = ""
+        if allocations and allocations[0].size_diff > 0:
+            frame = allocations[0].traceback[0]
+            summary["top_allocation"] = f"{_short_path(frame.filename)}:{frame.lineno} (+{allocations[0].size_diff / 1024:.0f} KiB)"
+        with open(prefix + ".alloc.txt", "w") as f:
+            f.write(f"stage {name}: {summary['wall_seconds']:.2f}s wall, {summary['cpu_seconds']:.2f}s CPU, "
+                    f"peak +{summary['peak_mb']:.1f} MB, net {summary['net_mb']:+.1f} MB\n\n")
+            f.write(f"top {TOP_ALLOCATIONS} allocation sites still held at the end of the stage:\n")
+            f.writelines(f"{stat}\n" for stat in allocations)
+        self.summaries.append(summary)
+
+    def finish(self):
+        """Write the collapsed stacks and stage summary, and print the summary to stderr."""
+        if self.directory is None or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._sampler.join()
+        tracemalloc.stop()
+        with open(os.path.join(self.directory, "stacks.collapsed"), "w") as f:
+            f.writelines(f"{stack} {samples}\n" for stack, samples in sorted(self._stacks.items()))
+        summary = format_summary(self.summaries)
+        with open(os.path.join(self.directory, "summary.txt"), "w") as f:
+            f.write(summary + "\n")
+        print(f"{summary}\nProfile written to {self.directory}", file=sys.stderr)
+
+
+def format_summary(summaries):
+    lines = [f"{'stage':<24}{'wall s':>9}{'cpu s':>9}{'peak MB':>10}{'net MB':>9}  top allocation"]
+    lines.extend(f"{summary['stage']:<24}{summary['wall_seconds']:>9.2f}{summary['cpu_seconds']:>9.2f}"
+                 f"{summary['peak_mb']:>10.1f}{summary['net_mb']:>+9.1f}  {summary['top_allocation']}"
+                 for summary in summaries)
+    return "\n".join(lines)
+
+
+stage_profiler = StageProfiler()
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                        help=f"Write per-stage cProfile, tracemalloc and collapsed-stack profiles under DIR (default: {PROFILE_DIR})")
+
+
+def start_profiling(args, run_name):
+    """Start the stage profiler if --profile was given."""
+    if args.profile:
+        stage_profiler.start(args.profile, run_name)
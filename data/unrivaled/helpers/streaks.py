@@ -0,0 +1,101 @@
+from helpers.play_events import EventType, typed
+
+# Single-pass streak engine. Pure functions over play dicts with no database access, so
+# they can run in feature-stage worker processes.
+
+# Play event codes used by the streak engine
+EVENT_OTHER = 0
+EVENT_MAKE = 1
+EVENT_MISS = 2
+EVENT_ASSIST = 3
+EVENT_REBOUND = 4
+EVENT_TURNOVER = 5
+
+def classify_play(play):
+    """
+    Map a play's typed `event` field (set at ingest) to one of the EVENT_* codes.
+    """
+    play = typed(play)
+    event = play["event"]
+    if event in (EventType.SHOT.value, EventType.FREE_THROW.value):
+        return EVENT_MAKE if play["made"] else EVENT_MISS
+    if event == EventType.ASSIST.value:
+        return EVENT_ASSIST
+    if event == EventType.REBOUND.value:
+        return EVENT_REBOUND
+    if event == EventType.TURNOVER.value:
+        return EVENT_TURNOVER
+    return EVENT_OTHER
+
+def analyze_streaks(plays, player_name, stat_type=None):
+    """
+    Compute streaks for every stat type in a single pass over the player's plays.
+
+    Plays are classified once, then run lengths are tracked as the list is walked:
+    back-to-back makes (hot) and misses (cold), back-to-back rebounds, assists not
+    preceded by a turnover, the longest run of each, per-quarter splits and the
+    quarter/time sequence of assists and rebounds. `stat_type` is accepted for
+    backwards compatibility; the result covers all stat types.
+    """
+    streaks = {
+        "hot_streaks": 0,
+        "cold_streaks": 0,
+        "assist_streaks": 0,
+        "rebound_streaks": 0,
+        "longest_hot_run": 0,
+        "longest_cold_run": 0,
+        "longest_rebound_run": 0,
+        "by_quarter": {},
+        "assist_sequence": [],
+        "rebound_sequence": [],
+    }
+    longest_key = {EVENT_MAKE: "longest_hot_run", EVENT_MISS: "longest_cold_run", EVENT_REBOUND: "longest_rebound_run"}
+    pair_key = {EVENT_MAKE: "hot_streaks", EVENT_MISS: "cold_streaks", EVENT_REBOUND: "rebound_streaks"}
+
+    previous_event = None
+    run_length = 0
+    quarter = None
+    quarter_stats = None
+    quarter_run_length = 0
+
+    for play in plays:
+        event = classify_play(play)
+        play_quarter = play.get("quarter", "")
+        if play_quarter != quarter:
+            quarter = play_quarter
+            quarter_stats = streaks["by_quarter"].setdefault(quarter, {
+                "makes": 0, "misses": 0, "assists": 0, "rebounds": 0,
+                "longest_hot_run": 0, "longest_cold_run": 0,
+            })
+            quarter_run_length = 0
+
+        # Run of identical events, both across the game and within the quarter
+        if event == previous_event:
+            run_length += 1
+            quarter_run_length += 1
+        else:
+            run_length = 1
+            quarter_run_length = 1
+
+        if event in pair_key:
+            if run_length > 1:
+                streaks[pair_key[event]] += 1
+            streaks[longest_key[event]] = max(streaks[longest_key[event]], run_length)
+        if event == EVENT_MAKE:
+            quarter_stats["makes"] += 1
+            quarter_stats["longest_hot_run"] = max(quarter_stats["longest_hot_run"], quarter_run_length)
+        elif event == EVENT_MISS:
+            quarter_stats["misses"] += 1
+            quarter_stats["longest_cold_run"] = max(quarter_stats["longest_cold_run"], quarter_run_length)
+        elif event == EVENT_ASSIST:
+            quarter_stats["assists"] += 1
+            streaks["assist_sequence"].append(f"{play_quarter} {play.get('time', '')}".strip())
+            if previous_event is not None and previous_event != EVENT_TURNOVER:
+                streaks["assist_streaks"] += 1
+        elif event == EVENT_REBOUND:
+            quarter_stats["rebounds"] += 1
+            streaks["rebound_sequence"].append(f"{play_quarter} {play.get('time', '')}".strip())
+
+        previous_event = event
+
+    return streaks
@@ -0,0 +1,209 @@
+import argparse
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from helpers.profiling import stage_profiler
+
+# Stage-level tracing for the scrape and analysis pipelines. With TRACE_FILE set, every
+# finished span is appended to that file as one JSON line carrying OpenTelemetry's span
+# fields (trace/span/parent ids, start and end in Unix nanoseconds, status, attributes),
+# and the run's counters (Firestore reads/writes, HTTP requests, LLM tokens, cache hits)
+# follow as one "counters" line when the run finishes. Without TRACE_FILE every call is a
+# no-op. Summarize the latest run in a trace file with:
+#   python -m helpers.tracing [TRACE_FILE] [--top 10]
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self.trace_id = uuid.uuid4().hex
+        self.counters = defaultdict(float)
+        self._file = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _write(self, record):
+        if self._file is None:
+            self._file = open(self.path, "a", buffering=1)
+        self._file.write(json.dumps(record, default=str) + "\n")
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Time a stage. Spans opened inside it (including in tasks it starts) become its
+        children. Yields the attributes dict so the stage can add results to it. With
+        --profile, a top-level span is also a profiled stage (helpers/profiling.py).
+        """
+        if not self.enabled and not stage_profiler.enabled:
+            yield attributes
+            return
+        with stage_profiler.stage(name), self._span(name, attributes):
+            yield attributes
+
+    @contextlib.contextmanager
+    def _span(self, name, attributes):
+        if not self.enabled:
+            yield
+            return
+        span_id = uuid.uuid4().hex[:16]
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        start_ns = time.time_ns()
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException as e:
+            status = "error"
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            duration = time.perf_counter() - started
+            self._write({
+                "type": "span",
+                "trace_id": self.trace_id,
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "start_ns": start_ns,
+                "end_ns": start_ns + int(duration * 1e9),
+                "duration_ms": round(duration * 1000, 3),
+                "status": status,
+                "attributes": attributes,
+            })
+
+    def traced(self, name=None, **attributes):
+        """Decorator form of span() for plain and async functions."""
+        def decorate(function):
+            span_name = name or function.__name__
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, **attributes):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **attributes):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] += value
+
+    def flush(self):
+        """Append the run's counters to the trace file."""
+        if self.enabled and self.counters:
+            self._write({"type": "counters", "trace_id": self.trace_id, "counters": dict(self.counters)})
+            self.counters.clear()
+
+    def finish(self, top=5):
+        """Flush the counters and print the run's slowest stages and props to stderr."""
+        if not self.enabled:
+            return
+        self.flush()
+        self._file.flush()
+        spans, counters = load_trace(self.path, self.trace_id)
+        print(format_summary(spans, counters, top), file=sys.stderr)
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+count = tracer.count
+atexit.register(tracer.flush)
+
+
+def load_trace(path, trace_id=None):
+    """
+    Spans and summed counters of one run in a trace file (the last run by default).
+
+    Returns:
+        tuple: (list of span records, dict of counters)
+    """
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    if trace_id is None and records:
+        trace_id = records[-1]["trace_id"]
+    spans = [record for record in records if record["type"] == "span" and record["trace_id"] == trace_id]
+    counters = defaultdict(float)
+    for record in records:
+        if record["type"] == "counters" and record["trace_id"] == trace_id:
+            for name, value in record["counters"].items():
+                counters[name] += value
+    return spans, dict(counters)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _label(record):
+    attributes = record["attributes"]
+    parts = [str(attributes[key]) for key in ("player", "stat_type", "game_id") if attributes.get(key)]
+    return " ".join(parts) or record["span_id"]
+
+
+def format_summary(spans, counters, top=10):
+    """Per-stage totals and percentiles, the slowest props and games, and the counters."""
+    by_name = defaultdict(list)
+    for record in spans:
+        by_name[record["name"]].append(record["duration_ms"])
+
+    lines = [f"{'stage':<24}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for name, durations in sorted(by_name.items(), key=lambda item: sum(item[1]), reverse=True)[:top]:
+        lines.append(f"{name:<24}{len(durations):>7}{sum(durations) / 1000:>10.2f}"
+                     f"{_percentile(durations, 50):>10.1f}{_percentile(durations, 95):>10.1f}{max(durations):>10.1f}")
+
+    for kind in ("prop", "game"):
+        slowest = sorted((record for record in spans if record["name"] == kind), key=lambda record: record["duration_ms"], reverse=True)[:top]
+        if slowest:
+            lines.append(f"\nslowest {kind}s:")
+            lines.extend(f"  {record['duration_ms'] / 1000:>8.2f}s  {_label(record)}" + ("  (error)" if record["status"] == "error" else "")
+                         for record in slowest)
+
+    if counters:
+        lines.append("\ncounters:")
+        lines.extend(f"  {name:<28}{value:>12g}" for name, value in sorted(counters.items()))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a run from a trace file written with TRACE_FILE.")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE or "trace.jsonl")
+    parser.add_argument("--trace-id", help="Run to summarize (default: the last one in the file)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    spans, counters = load_trace(args.path, args.trace_id)
+    if not spans:
+        print(f"No spans found in {args.path}.", file=sys.stderr)
+        return 1
+    print(format_summary(spans, counters, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
 import aiohttp
+import argparse
 import asyncio
 import json
 import sys
@@ -10,14 +11,20 @@ import os
 from collections import defaultdict
 import re
 from concurrent.futures import ThreadPoolExecutor
+from database.instrumented import instrument_if_enabled
+from helpers.tracing import tracer, span
+from helpers.llm_http import post_chat_completion, completion_text, LLMRequestError
+from helpers.injury_reports import fetch_injury_reports, InjuryReports
+from helpers.profiling import add_profile_argument, start_profiling
 
-# Load environment variables
-load_dotenv("unrivaled-dash/.env.local")
+# Load environment variables (run from data/unrivaled: python -m predict.analysis)
+load_dotenv("../../unrivaled-dash/.env.local")
 
 # Initialize Firebase
-cred = credentials.Certificate("secrets/firebase_key.json")
+cred = credentials.Certificate("../../secrets/firebase_key.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client(database_id="unrivaled-db")
+db = instrument_if_enabled(db)
 
 # DeepSeek API settings
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
@@ -39,18 +46,6 @@ def get_player_teams():
         player_teams[player_name] = player_data.get("player_data", {}).get("team", "")
     return player_teams
 
-def fetch_injury_reports():
-    """
-    Fetch injury reports from the database or a JSON file.
-    """
-    try:
-        with open("/Users/ajoyner/unrivaled_ai_sportsbet/data/unrivaled/injury_reports.json", "r") as f:
-            injury_data = json.load(f)
-        return injury_data.get("injury_reports", [])
-    except Exception as e:
-        print(f"Error fetching injury reports: {e}", file=sys.stderr)
-        return []
-
 def fetch_plays_for_player(game_id, player_name):
     """
     Fetch play-by-play data for a specific player in a game.
@@ -295,13 +290,12 @@ async def analyze_game_flow(session, player_name, game_id):
     }
 
     try:
-        async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-            if response.status == 200:
-                result = await response.json()
-                if result and "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-            else:
-                print(f"Failed to get analysis from DeepSeek API for game flow analysis of {player_name} in Game {game_id}. Status: {response.status}", file=sys.stderr)
+        # One attempt, as before; the request layer times it and records it in the LLM ledger
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, max_attempts=1,
+                                            stage="game_flow", player=player_name)
+        return completion_text(result)
+    except LLMRequestError as e:
+        print(f"Failed to get analysis from DeepSeek API for game flow analysis of {player_name} in Game {game_id}. {e}", file=sys.stderr)
     except Exception as e:
         print(f"Error during DeepSeek API request for game flow analysis of {player_name} in Game {game_id}: {e}", file=sys.stderr)
     return None
@@ -338,13 +332,11 @@ async def analyze_past_performance(session, player_name, opposing_team):
     }
 
     try:
-        async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-            if response.status == 200:
-                result = await response.json()
-                if result and "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-            else:
-                print(f"Failed to get analysis from DeepSeek API for past performance analysis of {player_name} against {opposing_team}. Status: {response.status}", file=sys.stderr)
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, max_attempts=1,
+                                            stage="past_performance", player=player_name)
+        return completion_text(result)
+    except LLMRequestError as e:
+        print(f"Failed to get analysis from DeepSeek API for past performance analysis of {player_name} against {opposing_team}. {e}", file=sys.stderr)
     except Exception as e:
         print(f"Error during DeepSeek API request for past performance analysis of {player_name} against {opposing_team}: {e}", file=sys.stderr)
     return None
@@ -359,10 +351,8 @@ async def calculate_final_confidence_level(session, player_name, player_team, ga
     }
 
     injury_context = ""
-    if injury_reports:
-        for report in injury_reports:
-            if report["team"].lower() == player_team.lower() or report["team"].lower() == opposing_team.lower():
-                injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}.\n"
+    for report in InjuryReports.of(injury_reports).for_teams(player_team, opposing_team):
+        injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}.\n"
 
     data = {
         "model": DEEPSEEK_MODEL,
@@ -383,13 +373,11 @@ async def calculate_final_confidence_level(session, player_name, player_team, ga
     }
 
     try:
-        async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-            if response.status == 200:
-                result = await response.json()
-                if result and "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-            else:
-                print(f"Failed to get analysis from DeepSeek API for final analysis of {player_name}. Status: {response.status}", file=sys.stderr)
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, max_attempts=1,
+                                            stage="final_evaluation", player=player_name, stat_type="Points")
+        return completion_text(result)
+    except LLMRequestError as e:
+        print(f"Failed to get analysis from DeepSeek API for final analysis of {player_name}. {e}", file=sys.stderr)
     except Exception as e:
         print(f"Error during DeepSeek API request for final analysis of {player_name}: {e}", file=sys.stderr)
     return None
@@ -402,6 +390,12 @@ async def analyze_player(player):
     """
     async with semaphore:  # Use semaphore to limit concurrency
         player_name = player["player_data"]["name"].replace(" ", "_")
+        # Players the injury report rules out are skipped before any Firestore or API work
+        inactive = fetch_injury_reports().inactive(player_name)
+        if inactive:
+            print(f"Skipping {player_name}: {inactive['status']} ({inactive['injury']}).", file=sys.stderr)
+            return None
+
         # Fetch all player names from the `players/` collection
         players_ref = db.collection("players").stream()
         player_names = {doc.id.lower(): doc.id for doc in players_ref}  # Map lowercase names to original names
@@ -439,7 +433,7 @@ async def analyze_player(player):
             # Analyze past performance against the opposing team
             past_performance_analysis = await analyze_past_performance(session, player_name, opposing_team)
 
-            # Fetch injury reports
+            # Injury reports are parsed once and re-read only when the file changes
             injury_reports = fetch_injury_reports()
 
             # Calculate final confidence level
@@ -510,21 +504,23 @@ async def main():
     """
     Main function to analyze all players.
     """
-    prop_lines_ref = db.collection("prop_lines").stream()
-    enriched_data = []
-    for doc in prop_lines_ref:
-        player_data = doc.to_dict()
-        enriched_data.append({
-            "player_data": player_data.get("player_data", {}),
-            "projection_data": player_data.get("projection_data", {})
-        })
+    with span("load_props"):
+        prop_lines_ref = db.collection("prop_lines").stream()
+        enriched_data = []
+        for doc in prop_lines_ref:
+            player_data = doc.to_dict()
+            enriched_data.append({
+                "player_data": player_data.get("player_data", {}),
+                "projection_data": player_data.get("projection_data", {})
+            })
 
     # Set semaphore limit to the number of player props
     global semaphore
     semaphore = asyncio.Semaphore(4)
 
     tasks = [analyze_player(player) for player in enriched_data]
-    results = await asyncio.gather(*tasks)
+    with span("analyze", props=len(tasks)):
+        results = await asyncio.gather(*tasks)
 
     output = {}
     for player, result in zip(enriched_data, results):
@@ -540,4 +536,8 @@ async def main():
 # --- Run the Analysis ---
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyse every prop in prop_lines.")
+    add_profile_argument(parser)
+    start_profiling(parser.parse_args(), "predict_analysis")
+    asyncio.run(main())
+    tracer.finish()
\ No newline at end of file
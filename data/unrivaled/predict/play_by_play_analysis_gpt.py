@@ -1,29 +1,93 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import json
 import aiohttp
+import argparse
 import asyncio
 import re
 import sys
+import time
 import openai
-from math import comb
-from collections import defaultdict
 from datetime import datetime
 from dotenv import load_dotenv
 import os
-
-load_dotenv(".env.local")
+from analysis.points_probability import estimate_points_probabilities
+from analysis.features import feature_pool, player_play_breakdowns, compact_play
+from helpers.llm_http import post_chat_completion, completion_text
+from helpers.llm_ledger import ledger
+from helpers.injury_reports import fetch_injury_reports, InjuryReports
+from helpers.tracing import tracer, span, traced, count
+from helpers.profiling import add_profile_argument, start_profiling
+from database.instrumented import instrument_if_enabled
+from database.cache import PlayerDataCache
+
+# Run from data/unrivaled (python -m predict.play_by_play_analysis_gpt), like the other scripts here
+load_dotenv("../../unrivaled-dash/.env.local")
 
 # --- Celery Configuration ---
-from celery import Celery
+# The slate is fanned out as one task per player and aggregated by a chord (see
+# dispatch_slate). Full analyses go to Firestore; only small per-player summaries, and
+# prepare_slate's answers for players it skipped, pass through the result backend. Local run:
+#   celery -A predict.play_by_play_analysis_gpt worker --concurrency 4   (one or more)
+#   python -m predict.play_by_play_analysis_gpt --celery
+from celery import Celery, chord, group
+from celery.signals import worker_process_init
 
 celery_app = Celery('play_by_play_analysis_gpt',
-                    broker='redis://localhost:6379/0',
-                    backend='redis://localhost:6379/0')
-
-cred = credentials.Certificate("secrets/firebase_key.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client(database_id="unrivaled-db")
+                    broker=os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+                    backend=os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0"))
+celery_app.conf.update(
+    # Player tasks run for minutes; hand them out one at a time so extra workers pick up the slack
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    result_expires=24 * 3600,
+)
+
+# UNRIVALED_LOCAL_DATA swaps Firestore for the store built from the bundled CSVs, as in
+# database/firebase.py (benchmarks/celery_slate.py runs the Celery path against it)
+LOCAL_DATA_DIR = os.getenv("UNRIVALED_LOCAL_DATA")
+if LOCAL_DATA_DIR:
+    from database.local_store import load_local_db
+    db = load_local_db(LOCAL_DATA_DIR)
+else:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    cred = credentials.Certificate("../../secrets/firebase_key.json")
+    firebase_admin.initialize_app(cred)
+    db = firestore.client(database_id="unrivaled-db")
+# TRACE_FILE or FIRESTORE_PROFILE set: count Firestore reads and writes (database/instrumented.py)
+db = instrument_if_enabled(db)
+# Feature docs and game logs read while preparing the slate (database/cache.py)
+player_cache = PlayerDataCache(db)
+
+# Per-process caches shared by every task a worker runs: slate-wide inputs (player teams,
+# a game's play-by-play) are loaded once per worker, not once per player. Injury reports
+# have their own cache in helpers/injury_reports.py, re-read when the file changes.
+WORKER_CACHE_SECONDS = float(os.getenv("WORKER_CACHE_SECONDS", "900"))
+_worker_cache = {}
+
+def worker_cached(key, load):
+    entry = _worker_cache.get(key)
+    now = time.monotonic()
+    if entry is None or now - entry[0] > WORKER_CACHE_SECONDS:
+        count("cache.misses")
+        entry = (now, load())
+        _worker_cache[key] = entry
+    else:
+        count("cache.hits")
+    return entry[1]
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    # gRPC channels do not survive the prefork; give each worker process its own client
+    global db, player_cache
+    if not LOCAL_DATA_DIR:
+        firebase_admin.delete_app(firebase_admin.get_app())
+        firebase_admin.initialize_app(cred)
+        db = firestore.client(database_id="unrivaled-db")
+        db = instrument_if_enabled(db)
+        player_cache = PlayerDataCache(db)
+    _worker_cache.clear()
+    # Worker processes are daemonic and cannot start a pool; Celery's concurrency already uses the cores
+    feature_pool.workers = 0
 
 # GPT-4 API Settings (replacing GPT)
 GPT_API_KEY = os.getenv("GPT_API_KEY")
@@ -32,16 +96,16 @@ GPT_API_URL = "https://api.openai.com/v1/chat/completions"
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_MODEL = "deepseek-chat"
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
 
-def get_current_analysis(player_name):
+def get_current_analyses():
+    """
+    Load today's analyses for every player in one query, keyed by player name.
+    Players in the result are skipped by main() instead of being checked one by one.
+    """
     current_date = datetime.now().strftime("%Y-%m-%d")
-    analysis_ref = db.collection("analysis_results").document(player_name).get()
-    if analysis_ref.exists:
-        analysis_data = analysis_ref.to_dict()
-        if analysis_data["date_fetched"] == current_date:
-            return analysis_data
-    return None
+    analyses_ref = db.collection("analysis_results").where("date_fetched", "==", current_date).stream()
+    return {doc.id: doc.to_dict() for doc in analyses_ref}
 
 def get_player_teams():
     player_teams = {}
@@ -53,23 +117,10 @@ def get_player_teams():
 
     return player_teams
 
-def fetch_injury_reports():
-    """
-    Fetch injury reports from the database or JSON file.
-    """
-    try:
-        # Example: Load from a JSON file
-        with open("/Users/ajoyner/unrivaled_ai_sportsbet/data/unrivaled/injury_reports.json", "r") as f:
-            injury_data = json.load(f)
-        return injury_data.get("injury_reports", [])
-    except Exception as e:
-        print(f"Error fetching injury reports: {e}", file=sys.stderr)
-        return []
-
 def fetch_plays_from_db(game_id, player_name):
-    plays_ref = db.collection("games").document(game_id).collection("play_by_play").stream()
-    plays = [doc.to_dict() for doc in plays_ref if doc.to_dict().get("player", "").lower() == player_name.lower()]
-    return plays
+    # A game's play-by-play is streamed once per worker and shared by both teams' players
+    plays = worker_cached(("plays", game_id), lambda: [doc.to_dict() for doc in db.collection("games").document(game_id).collection("play_by_play").stream()])
+    return [play for play in plays if play.get("player", "").lower() == player_name.lower()]
 
 def get_game_ids_for_player(player_name):
     player_doc = db.collection("players").document(player_name).get()
@@ -78,31 +129,6 @@ def get_game_ids_for_player(player_name):
         return player_data.get("player_data", {}).get("games", [])
     return []
 
-def player_scoring_breakdown(plays):
-    scoring_data = {
-        "2pt_made": 0,
-        "2pt_missed": 0,
-        "3pt_made": 0,
-        "3pt_missed": 0,
-        "free_throws_made": 0,
-        "free_throws_missed": 0
-    }
-    for play in plays:
-        description = play["play_description"]
-        if "makes two point shot" in description:
-            scoring_data["2pt_made"] += 1
-        elif "misses two point shot" in description:
-            scoring_data["2pt_missed"] += 1
-        elif "makes three point shot" in description:
-            scoring_data["3pt_made"] += 1
-        elif "misses three point shot" in description:
-            scoring_data["3pt_missed"] += 1
-        elif "makes free throw" in description:
-            scoring_data["free_throws_made"] += 1
-        elif "misses free throw" in description:
-            scoring_data["free_throws_missed"] += 1
-    return scoring_data
-
 def get_assists_rebounds(game_id, player_name):
     game_stats_ref = db.collection("players").document(player_name).collection("games").document(game_id).get()
     if game_stats_ref.exists:
@@ -114,37 +140,6 @@ def get_assists_rebounds(game_id, player_name):
         }
     return {"assists": 0, "offensive_rebounds": 0, "defensive_rebounds": 0}
 
-def turnover_foul_analysis(plays):
-    turnover_foul_data = {"turnovers": 0, "fouls": 0}
-    for play in plays:
-        description = play["play_description"]
-        if "turnover" in description:
-            turnover_foul_data["turnovers"] += 1
-        elif "foul" in description:
-            turnover_foul_data["fouls"] += 1
-    return turnover_foul_data
-
-def teammate_interaction_analysis(plays, player_name, player_teams):
-    interaction_data = defaultdict(int)
-    previous_play = None
-    for play in plays:
-        description = play["play_description"]
-        player = play.get("player")
-        if player is None:
-            continue
-        if "assist" in description and previous_play and previous_play.get("player"):
-            teammate = previous_play.get("player")
-            if teammate is None:
-                continue
-            if (teammate.lower() in player_teams and 
-                player.lower() in player_teams and 
-                player.lower() == player_name.lower() and 
-                player_name.lower() != teammate.lower()):
-                if player_teams[teammate.lower()] == player_teams[player.lower()]:
-                    interaction_data[teammate.lower()] += 1
-        previous_play = play if player else None  
-    return dict(interaction_data)
-
 def get_player_averages(player_name):
     player_doc = db.collection("players").document(player_name).get()
     return player_doc.to_dict() if player_doc.exists else None
@@ -162,6 +157,7 @@ def get_opposing_team_stats(game_id, player_team):
         return opposing_team_stats.to_dict() if opposing_team_stats.exists else None
     return None
 
+@traced("game_flow")
 async def analyze_game_flow(session, player_name, game_id, max_retries=3):
     headers = {
         "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
@@ -192,29 +188,19 @@ async def analyze_game_flow(session, player_name, game_id, max_retries=3):
             }
         ]
     }
-    retries = 0
-    while retries < max_retries:
-        try:
-            async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-                print(f"Response status for game flow analysis of {player_name} in Game {game_id}: {response.status} (Attempt {retries + 1})", file=sys.stderr)
-                if response.status == 200:
-                    result = await response.json()
-                    if result and "choices" in result and len(result["choices"]) > 0:
-                        analysis = result["choices"][0]["message"]["content"]
-                        return analysis
-                    else:
-                        print(f"Invalid response from DeepSeek API for game flow analysis of {player_name} in Game {game_id}: {result}", file=sys.stderr)
-                else:
-                    response_text = await response.text()
-                    print(f"Failed to get analysis from DeepSeek API for game flow analysis of {player_name} in Game {game_id}. Status: {response.status}, Response: {response_text}", file=sys.stderr)
-        except Exception as e:
-            print(f"Error during DeepSeek API request for game flow analysis of {player_name} in Game {game_id}: {e}", file=sys.stderr)
-        retries += 1
-        if retries < max_retries:
-            await asyncio.sleep(2)
-    print(f"Max retries ({max_retries}) exceeded for game flow analysis of {player_name} in Game {game_id}. Returning None.", file=sys.stderr)
-    return None
+    try:
+        # 429/5xx and connection errors are retried with backoff at the request layer
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, max_attempts=max_retries,
+                                            stage="game_flow", player=player_name)
+    except Exception as e:
+        print(f"Error during DeepSeek API request for game flow analysis of {player_name} in Game {game_id}: {e}", file=sys.stderr)
+        return None
+    analysis = completion_text(result)
+    if analysis is None:
+        print(f"Invalid response from DeepSeek API for game flow analysis of {player_name} in Game {game_id}: {result}", file=sys.stderr)
+    return analysis
 
+@traced("game_analysis")
 async def get_DEEPSEEK_analysis(session, player_name, game_id, scoring_breakdown, assist_data, rebound_data, turnover_foul_data, interaction_data, player_averages, game_stats, opposing_team_stats, max_retries=3):
     headers = {
         "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
@@ -240,30 +226,20 @@ async def get_DEEPSEEK_analysis(session, player_name, game_id, scoring_breakdown
             }
         ]
     }
-    retries = 0
-    while retries < max_retries:
-        try:
-            async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-                print(f"Game {game_id}: {'OK' if response.status == 200 else 'BAD'} (Attempt {retries + 1})", file=sys.stderr)
-                if response.status == 200:
-                    result = await response.json()
-                    if result and "choices" in result and len(result["choices"]) > 0:
-                        analysis = result["choices"][0]["message"]["content"]
-                        return analysis
-                    else:
-                        print(f"Invalid response from DeepSeek API for Game {game_id}: {result}", file=sys.stderr)
-                else:
-                    response_text = await response.text()
-                    print(f"Failed to get analysis from DeepSeek API for Game {game_id}. Status: {response.status}, Response: {response_text}", file=sys.stderr)
-        except Exception as e:
-            print(f"Error during DeepSeek API request for Game {game_id}: {e}", file=sys.stderr)
-        retries += 1
-        if retries < max_retries:
-            await asyncio.sleep(2)
-    print(f"Max retries ({max_retries}) exceeded for Game {game_id}. Returning None.", file=sys.stderr)
-    return None
+    try:
+        # 429/5xx and connection errors are retried with backoff at the request layer
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, max_attempts=max_retries,
+                                            stage="game_analysis", player=player_name)
+    except Exception as e:
+        print(f"Error during DeepSeek API request for Game {game_id}: {e}", file=sys.stderr)
+        return None
+    analysis = completion_text(result)
+    if analysis is None:
+        print(f"Invalid response from DeepSeek API for Game {game_id}: {result}", file=sys.stderr)
+    return analysis
 
-async def calculate_final_confidence_level(session, player_name, player_team, game_analyses, player_prop, opposing_team, game_flow_analyses=None, injury_reports=None, max_retries=3):
+@traced("final_evaluation")
+async def calculate_final_confidence_level(session, player_name, player_team, game_analyses, player_prop, opposing_team, game_flow_analyses=None, injury_reports=None, points_probability=0.5, max_retries=3):
     headers = {
         "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
         "Content-Type": "application/json"
@@ -271,13 +247,9 @@ async def calculate_final_confidence_level(session, player_name, player_team, ga
 
     # Prepare the injury report context
     injury_context = ""
-    if injury_reports:
-        for report in injury_reports:
-            if report["team"].lower() == player_team.lower() or report["team"].lower() == opposing_team.lower():
-                injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}.\n"
-                print(injury_context)
-
-    points_probability = estimate_points_probability(player_name, player_prop)
+    for report in InjuryReports.of(injury_reports).for_teams(player_team, opposing_team):
+        injury_context += f"{report['player']} ({report['team']}) is {report['status']} with {report['injury']}.\n"
+        print(injury_context)
 
     # Define weights for each factor
     weights = {
@@ -330,81 +302,79 @@ async def calculate_final_confidence_level(session, player_name, player_team, ga
         ]
     }
 
-    retries = 0
-    while retries < max_retries:
-        try:
-            async with session.post(DEEPSEEK_API_URL, headers=headers, json=data) as response:
-                print(f"Response status for final analysis of {player_name}: {response.status} (Attempt {retries + 1})", file=sys.stderr)
-                if response.status == 200:
-                    result = await response.json()
-                    if result and "choices" in result and len(result["choices"]) > 0:
-                        conclusion = result["choices"][0]["message"]["content"]
-                        
-                        # Extract scores for each factor
-                        scores = {}
-                        for line in conclusion.split("\n"):
-                            if "Recent Performance Trends:" in line:
-                                scores["recent_performance"] = int(line.split(":")[1].strip())
-                            elif "Opposing Team Defense:" in line:
-                                scores["opposing_team_defense"] = int(line.split(":")[1].strip())
-                            elif "Role and Teammate Interactions:" in line:
-                                scores["role_and_teammate_interactions"] = int(line.split(":")[1].strip())
-                            elif "Injuries and Absences:" in line:
-                                scores["injuries_and_absences"] = int(line.split(":")[1].strip())
-                            elif "Consistency and Clutch Performance:" in line:
-                                scores["consistency_and_clutch_performance"] = int(line.split(":")[1].strip())
-                        
-                        # Calculate weighted confidence level
-                        weighted_confidence = (
-                            scores["recent_performance"] * weights["recent_performance"] +
-                            scores["opposing_team_defense"] * weights["opposing_team_defense"] +
-                            scores["role_and_teammate_interactions"] * weights["role_and_teammate_interactions"] +
-                            scores["injuries_and_absences"] * weights["injuries_and_absences"] +
-                            scores["consistency_and_clutch_performance"] * weights["consistency_and_clutch_performance"]
-                        )
-                        
-                        # Scale the weighted confidence to the 0-100 range
-                        confidence_level = int((weighted_confidence / 100) * 100)
-                        
-                        # Ensure confidence level is within bounds
-                        confidence_level = max(0, min(100, confidence_level))
-                        
-                        # Extract and parse the reason into a dictionary.
-                        reason_text = ""
-                        if "Reason:" in conclusion:
-                            reason_text = conclusion.split("Reason:")[-1].strip()
-                        else:
-                            reason_text = "No reason provided."
-                        # Use regex to split reason_text at occurrences of a number followed by a period and a space.
-                        parts = re.split(r'(?=\d+\.\s)', reason_text)
-                        reason_dict = {}
-                        for part in parts:
-                            match = re.match(r'(\d+)\.\s*(.*)', part)
-                            if match:
-                                key = match.group(1)
-                                text = match.group(2).strip()
-                                reason_dict[key] = text
-                        # If no valid parts were found, fall back to the raw reason_text.
-                        if not reason_dict:
-                            reason_dict = reason_text
-                        return confidence_level, reason_dict
-                    else:
-                        print(f"Invalid response from DeepSeek API for final analysis of {player_name}: {result}", file=sys.stderr)
-                else:
-                    response_text = await response.text()
-                    print(f"Failed to get analysis from DeepSeek API for final analysis of {player_name}. Status: {response.status}, Response: {response_text}", file=sys.stderr)
-        except Exception as e:
-            print(f"Error during DeepSeek API request for final analysis of {player_name}: {e}", file=sys.stderr)
-        retries += 1
-        if retries < max_retries:
-            await asyncio.sleep(2)
-    print(f"Max retries ({max_retries}) exceeded for final analysis of {player_name}. Returning default values.", file=sys.stderr)
-    return 50, {"5": "API request failed after multiple retries."}
-
-async def analyze_player_with_semaphore(semaphore, player, player_teams):
+    try:
+        # 429/5xx and connection errors are retried with backoff at the request layer
+        result = await post_chat_completion(session, DEEPSEEK_API_URL, headers, data, max_attempts=max_retries,
+                                            stage="final_evaluation", player=player_name, stat_type="Points")
+    except Exception as e:
+        print(f"Error during DeepSeek API request for final analysis of {player_name}: {e}", file=sys.stderr)
+        print(f"Max retries ({max_retries}) exceeded for final analysis of {player_name}. Returning default values.", file=sys.stderr)
+        return 50, {"5": "API request failed after multiple retries."}
+    conclusion = completion_text(result)
+    if conclusion is None:
+        print(f"Invalid response from DeepSeek API for final analysis of {player_name}: {result}", file=sys.stderr)
+        return 50, {"5": "API request failed after multiple retries."}
+
+    # A malformed reply is not re-requested: retries are for transport failures only
+    try:
+        # Extract scores for each factor
+        scores = {}
+        for line in conclusion.split("\n"):
+            if "Recent Performance Trends:" in line:
+                scores["recent_performance"] = int(line.split(":")[1].strip())
+            elif "Opposing Team Defense:" in line:
+                scores["opposing_team_defense"] = int(line.split(":")[1].strip())
+            elif "Role and Teammate Interactions:" in line:
+                scores["role_and_teammate_interactions"] = int(line.split(":")[1].strip())
+            elif "Injuries and Absences:" in line:
+                scores["injuries_and_absences"] = int(line.split(":")[1].strip())
+            elif "Consistency and Clutch Performance:" in line:
+                scores["consistency_and_clutch_performance"] = int(line.split(":")[1].strip())
+
+        # Calculate weighted confidence level
+        weighted_confidence = (
+            scores["recent_performance"] * weights["recent_performance"] +
+            scores["opposing_team_defense"] * weights["opposing_team_defense"] +
+            scores["role_and_teammate_interactions"] * weights["role_and_teammate_interactions"] +
+            scores["injuries_and_absences"] * weights["injuries_and_absences"] +
+            scores["consistency_and_clutch_performance"] * weights["consistency_and_clutch_performance"]
+        )
+
+        # Scale the weighted confidence to the 0-100 range
+        confidence_level = int((weighted_confidence / 100) * 100)
+
+        # Ensure confidence level is within bounds
+        confidence_level = max(0, min(100, confidence_level))
+    except (ValueError, KeyError, IndexError) as e:
+        print(f"Failed to parse factor scores for final analysis of {player_name}: {e}", file=sys.stderr)
+        return 50, {"5": "Could not parse the analysis response."}
+
+    # Extract and parse the reason into a dictionary.
+    reason_text = ""
+    if "Reason:" in conclusion:
+        reason_text = conclusion.split("Reason:")[-1].strip()
+    else:
+        reason_text = "No reason provided."
+    # Use regex to split reason_text at occurrences of a number followed by a period and a space.
+    parts = re.split(r'(?=\d+\.\s)', reason_text)
+    reason_dict = {}
+    for part in parts:
+        match = re.match(r'(\d+)\.\s*(.*)', part)
+        if match:
+            key = match.group(1)
+            text = match.group(2).strip()
+            reason_dict[key] = text
+    # If no valid parts were found, fall back to the raw reason_text.
+    if not reason_dict:
+        reason_dict = reason_text
+    return confidence_level, reason_dict
+
+async def analyze_player_with_semaphore(semaphore, player, player_teams, points_probability=0.5):
     async with semaphore:
-        return await analyze_player(player, player_teams)
+        with span("prop", player=player["Player Data"]["name"], stat_type="Points"):
+            return await analyze_player(player, player_teams, points_probability)
 
+@traced("save")
 def save_analysis_results(player_name, confidence_level, reason):
     try:
         reason_1 = reason.get("1", "")
@@ -433,7 +403,7 @@ def save_analysis_results(player_name, confidence_level, reason):
     except Exception as e:
         print(f"Error saving analysis results to Firebase for {player_name}: {e}", file=sys.stderr)
 
-async def analyze_player(player, player_teams):
+async def analyze_player(player, player_teams, points_probability=0.5):
     player_name = player["Player Data"]["name"]
     player_team = player_teams.get(player_name.lower())
     if not player_team:
@@ -446,24 +416,35 @@ async def analyze_player(player, player_teams):
         return None
     game_analyses = []
     game_flow_analyses = []
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        game_flow_tasks = []
+    # Play breakdowns are CPU-bound; compute them in the feature pool, off the event loop
+    plays_by_game = {}
+    with span("load_plays", player=player_name):
         for game_id in game_ids:
-            print(f"\nAnalyzing Game {game_id} for {player_name}...", file=sys.stderr)
             plays = fetch_plays_from_db(game_id, player_name.lower())
             if not plays:
                 print(f"No plays found for player {player_name} in Game {game_id}", file=sys.stderr)
                 continue
-            scoring_breakdown = player_scoring_breakdown(plays)
+            plays_by_game[game_id] = [compact_play(play) for play in plays]
+    with span("features", player=player_name):
+        breakdowns = await feature_pool.run(player_play_breakdowns, {
+            "player_name": player_name.lower(),
+            "player_teams": player_teams,
+            "plays": plays_by_game,
+        })
+    async with aiohttp.ClientSession() as session:
+        tasks = []
+        game_flow_tasks = []
+        for game_id, breakdown in breakdowns.items():
+            print(f"\nAnalyzing Game {game_id} for {player_name}...", file=sys.stderr)
+            scoring_breakdown = breakdown["scoring_breakdown"]
             game_stats = get_assists_rebounds(game_id, player_name.lower())
             assist_data = {"total_assists": game_stats["assists"]}
             rebound_data = {
                 "offensive_rebounds": game_stats["offensive_rebounds"],
                 "defensive_rebounds": game_stats["defensive_rebounds"]
             }
-            turnover_foul_data = turnover_foul_analysis(plays)
-            interaction_data = teammate_interaction_analysis(plays, player_name.lower(), player_teams)
+            turnover_foul_data = breakdown["turnover_foul_data"]
+            interaction_data = breakdown["interaction_data"]
             player_averages = get_player_averages(player_name.lower())
             game_stats = get_game_stats(game_id, player_name.lower())
             opposing_team_stats = get_opposing_team_stats(game_id, player_team)
@@ -478,134 +459,31 @@ async def analyze_player(player, player_teams):
     player_prop = player["Projection Data"]["line_score"]
     opposing_team = player["Projection Data"]["description"]
 
-    # Fetch injury reports
     injury_reports = fetch_injury_reports()
 
     async with aiohttp.ClientSession() as session:
-        confidence_level, reason = await calculate_final_confidence_level(session, player_name, player_team, game_analyses, player_prop, opposing_team, game_flow_analyses, injury_reports)
+        confidence_level, reason = await calculate_final_confidence_level(session, player_name, player_team, game_analyses, player_prop, opposing_team, game_flow_analyses, injury_reports, points_probability)
     print(f"\nConfidence Level for {player_name} on {player_prop} points: {confidence_level}", file=sys.stderr)
     print(f"Reason: {reason}", file=sys.stderr)
 
     return confidence_level, reason
 
-def binomial_probability(n, k, p):
-    """
-    Calculate the binomial probability P(X = k) using the formula:
-    P(X = k) = C(n, k) * p^k * (1-p)^(n-k)
-    """
-    if n < 0 or k < 0 or k > n or p < 0 or p > 1:
-        return 0  # Return 0 for invalid inputs
-    try:
-        return comb(n, k) * (p ** k) * ((1 - p) ** (n - k))
-    except Exception as e:
-        print(f"Error calculating binomial probability: {e}", file=sys.stderr)
-        return 0
-    
-def estimate_points_probability(player_name, player_prop) -> float:
-    """
-    Estimate the probability of a player scoring at least the projected points (player_prop)
-    using binomial probability for 2-pointers, 3-pointers, and free throws.
-    """
-    shooting_probs = calculate_shooting_probabilities(player_name)
-    if not shooting_probs:
-        return 0.5  # Default probability if no data is available
+def stored_output(analysis_data):
+    """A stored analysis_results doc in main()'s output format."""
+    reason = {str(i): analysis_data.get(f"reason_{i}", "") for i in range(1, 5)}
+    reason["5"] = analysis_data.get("final_conclusion", "")
+    return {"confidence": analysis_data.get("confidence_level"), "reason": reason}
 
-    # Get average shot attempts per game
-    try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            cursor = connection.cursor(dictionary=True)
-            query = """
-                SELECT 
-                    AVG(fg_a) AS avg_fg_attempted,
-                    AVG(three_pt_a) AS avg_3pt_attempted,
-                    AVG(ft_a) AS avg_ft_attempted
-                FROM game_stats
-                WHERE LOWER(player_name) = LOWER(%s)
-            """
-            cursor.execute(query, (player_name,))
-            result = cursor.fetchone()
-            if result:
-                avg_fg_attempted = result["avg_fg_attempted"] or 0
-                avg_3pt_attempted = result["avg_3pt_attempted"] or 0
-                avg_ft_attempted = result["avg_ft_attempted"] or 0
-            else:
-                return 0.5  # Default probability if no data is available
-    except mysql.connector.Error as e:
-        print(f"Error fetching average shot attempts for {player_name}: {e}", file=sys.stderr)
-        return 0.5
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-
-    # Ensure average attempts are valid
-    avg_fg_attempted = max(0, int(avg_fg_attempted))
-    avg_3pt_attempted = max(0, int(avg_3pt_attempted))
-    avg_ft_attempted = max(0, int(avg_ft_attempted))
-
-    # Calculate probabilities for different scoring scenarios
-    total_points = 0
-    for k_2pt in range(avg_fg_attempted + 1):
-        for k_3pt in range(avg_3pt_attempted + 1):
-            for k_ft in range(avg_ft_attempted + 1):
-                points = (2 * k_2pt) + (3 * k_3pt) + (1 * k_ft)
-                if points >= player_prop:
-                    print(avg_fg_attempted, k_2pt, shooting_probs)
-                    prob_2pt = binomial_probability(avg_fg_attempted, k_2pt, shooting_probs["p_2pt"])
-                    prob_3pt = binomial_probability(avg_3pt_attempted, k_3pt, shooting_probs["p_3pt"])
-                    prob_ft = binomial_probability(avg_ft_attempted, k_ft, shooting_probs["p_ft"])
-                    total_points += prob_2pt * prob_3pt * prob_ft
-    return total_points
-
-def calculate_shooting_probabilities(player_name):
-    try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            cursor = connection.cursor(dictionary=True)
-            query = """
-                SELECT 
-                    SUM(fg_m) AS total_fg_made,
-                    SUM(fg_a) AS total_fg_attempted,
-                    SUM(three_pt_m) AS total_3pt_made,
-                    SUM(three_pt_a) AS total_3pt_attempted,
-                    SUM(ft_m) AS total_ft_made,
-                    SUM(ft_a) AS total_ft_attempted
-                FROM game_stats
-                WHERE LOWER(player_name) = LOWER(%s)
-            """
-            cursor.execute(query, (player_name,))
-            result = cursor.fetchone()
-            if result:
-                # Handle NULL values by defaulting to 0
-                total_fg_made = result["total_fg_made"] or 0
-                total_fg_attempted = result["total_fg_attempted"] or 0
-                total_3pt_made = result["total_3pt_made"] or 0
-                total_3pt_attempted = result["total_3pt_attempted"] or 0
-                total_ft_made = result["total_ft_made"] or 0
-                total_ft_attempted = result["total_ft_attempted"] or 0
-
-                # Calculate shooting probabilities
-                p_2pt = total_fg_made / total_fg_attempted if total_fg_attempted > 0 else 0
-                p_3pt = total_3pt_made / total_3pt_attempted if total_3pt_attempted > 0 else 0
-                p_ft = total_ft_made / total_ft_attempted if total_ft_attempted > 0 else 0
-
-                return {
-                    "p_2pt": p_2pt,
-                    "p_3pt": p_3pt,
-                    "p_ft": p_ft
-                }
-            else:
-                return None
-    except mysql.connector.Error as e:
-        print(f"Error fetching shooting probabilities for {player_name}: {e}", file=sys.stderr)
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-    return None
+@traced("prepare_slate")
+def prepare_slate():
+    """
+    Load the slate from prop_lines, answer players listed as out and players already
+    analysed today from their stored results, and estimate P(points >= line) for the
+    rest in one batched call.
 
-async def main():
+    Returns:
+        tuple: (players still to analyse, output for skipped players, probability per player)
+    """
     # Fetch player data from prop_lines collection
     prop_lines_ref = db.collection("prop_lines").stream()
     enriched_data = []
@@ -623,11 +501,43 @@ async def main():
             }
         })
 
-    player_teams = get_player_teams()
-    semaphore = asyncio.Semaphore(4)  # Increased concurrency
-    tasks = [analyze_player_with_semaphore(semaphore, player, player_teams) for player in enriched_data]
-    results = await asyncio.gather(*tasks)
+    # Players the injury report rules out are answered without any further reads
+    injury_reports = fetch_injury_reports()
     output = {}
+    for player in enriched_data:
+        inactive = injury_reports.inactive(player["Player Data"]["name"])
+        if inactive:
+            output[player["Player Data"]["name"]] = {"confidence": None, "reason": f"Not analysed: {inactive['player']} is {inactive['status']} ({inactive['injury']})."}
+    inactive_count = len(output)
+    print(f"Skipping {inactive_count} players listed as out.", file=sys.stderr)
+    enriched_data = [player for player in enriched_data if player["Player Data"]["name"] not in output]
+
+    # Players already analysed today are answered from the stored result
+    current_analyses = get_current_analyses()
+    for player in enriched_data:
+        analysis_data = current_analyses.get(player["Player Data"]["name"])
+        if analysis_data:
+            output[player["Player Data"]["name"]] = stored_output(analysis_data)
+            ledger.record(stage="final_evaluation", player=player["Player Data"]["name"], stat_type="Points", cache_hit=True)
+    enriched_data = [player for player in enriched_data if player["Player Data"]["name"] not in output]
+    print(f"Skipping {len(output) - inactive_count} players already analysed today.", file=sys.stderr)
+
+    # P(points >= line) for the whole slate in one batched call
+    props = [(player["Player Data"]["name"], player["Projection Data"]["line_score"]) for player in enriched_data]
+    points_probabilities = estimate_points_probabilities(props, player_cache)
+    return enriched_data, output, [points_probabilities[prop] for prop in props]
+
+async def main():
+    enriched_data, output, probabilities = prepare_slate()
+    player_teams = worker_cached("player_teams", get_player_teams)
+
+    semaphore = asyncio.Semaphore(4)  # Increased concurrency
+    tasks = [analyze_player_with_semaphore(semaphore, player, player_teams, probability) for player, probability in zip(enriched_data, probabilities)]
+    try:
+        with span("analyze", props=len(tasks)):
+            results = await asyncio.gather(*tasks)
+    finally:
+        feature_pool.shutdown()
     for player, result in zip(enriched_data, results):
         player_name = player["Player Data"]["name"]
         if result:
@@ -640,10 +550,81 @@ async def main():
     print(json.dumps(output))
     return output
 
-@celery_app.task
+def slate_output(player_names, skipped):
+    """
+    The slate's output in main()'s format: players prepare_slate answered (out, or
+    already analysed) keep that answer, the rest come from today's stored analyses in
+    one query.
+    """
+    current_analyses = get_current_analyses()
+    output = {}
+    for player_name in player_names:
+        if player_name in skipped:
+            output[player_name] = skipped[player_name]
+        elif player_name in current_analyses:
+            output[player_name] = stored_output(current_analyses[player_name])
+        else:
+            output[player_name] = {"confidence": 75, "reason": "No analysis available."}
+    return output
+
+@celery_app.task(name="play_by_play_analysis_gpt.analyze_player_task")
+def analyze_player_task(player, points_probability=0.5):
+    """
+    Analyse one player on a worker and save the result to Firestore. Only a small
+    summary is returned through the result backend. Errors are reported as a failed
+    player instead of raised, so one player cannot fail the chord.
+    """
+    player_name = player["Player Data"]["name"]
+    try:
+        player_teams = worker_cached("player_teams", get_player_teams)
+        result = asyncio.run(analyze_player(player, player_teams, points_probability))
+    except Exception as e:
+        print(f"Error analyzing player {player_name}: {e}", file=sys.stderr)
+        return {"player": player_name, "confidence": None}
+    if not result:
+        return {"player": player_name, "confidence": None}
+    confidence_level, reason = result
+    save_analysis_results(player_name, confidence_level, reason)
+    return {"player": player_name, "confidence": confidence_level}
+
+@celery_app.task(name="play_by_play_analysis_gpt.collect_slate_results")
+def collect_slate_results(summaries, player_names, skipped):
+    """
+    Chord callback: report which players were analysed; the analyses themselves stay in
+    Firestore. `skipped` is prepare_slate's output for players that were not dispatched,
+    passed through so slate_output can merge it.
+    """
+    failed = [summary["player"] for summary in summaries if summary["confidence"] is None]
+    print(f"Slate complete: {len(summaries) - len(failed)} analysed, {len(failed)} without analysis, {len(skipped)} skipped.", file=sys.stderr)
+    return {"players": player_names, "skipped": skipped, "analysed": len(summaries) - len(failed), "failed": failed}
+
+def dispatch_slate():
+    """
+    Fan the slate out as one analyze_player_task per player, aggregated by
+    collect_slate_results. Returns the AsyncResult of the aggregation.
+    """
+    enriched_data, output, probabilities = prepare_slate()
+    player_names = list(output) + [player["Player Data"]["name"] for player in enriched_data]
+    if not enriched_data:
+        return collect_slate_results.delay([], player_names, output)
+    header = group(analyze_player_task.s(player, probability) for player, probability in zip(enriched_data, probabilities))
+    return chord(header)(collect_slate_results.s(player_names, output))
+
+@celery_app.task(name="play_by_play_analysis_gpt.run_analysis_task")
 def run_analysis_task():
-    result = asyncio.run(main())
-    return result
+    # Waiting on subtasks inside a task can deadlock the pool; return the chord's id instead
+    return dispatch_slate().id
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyse the prop_lines slate.")
+    parser.add_argument("--celery", action="store_true", help="Fan the slate out to Celery workers and wait for it")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_profiling(args, "play_by_play_analysis_gpt")
+    if args.celery:
+        summary = dispatch_slate().get()
+        print(json.dumps(slate_output(summary["players"], summary["skipped"])))
+    else:
+        asyncio.run(main())
+    # TRACE_FILE set: print the slowest stages and props of this run
+    tracer.finish()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import argparse
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
@@ -9,11 +10,17 @@ import unr_play_by_play_scrape as pbp
 import asyncio
 import aiohttp
 from fuzzywuzzy import fuzz
+from database.cache import mark_ingest
+from database.feature_store import apply_game_stats, apply_game_plays
+from database.instrumented import instrument_if_enabled
+from helpers.tracing import tracer, span, traced, count
+from helpers.profiling import add_profile_argument, start_profiling
 
 # Initialize Firebase
 cred = credentials.Certificate("../../secrets/firebase_key.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client(database_id="unrivaled-db")
+db = instrument_if_enabled(db)
 
 # Base URL for Unrivaled schedule
 BASE_URL = "https://www.unrivaled.basketball"
@@ -25,8 +32,10 @@ def convert_to_firestore_date(date_str):
     parsed_date = datetime.strptime(date_str, "%A, %B %d, %Y")
     return parsed_date.strftime("%Y-%m-%d")
 
+@traced("fetch_schedule")
 def get_game_links_with_dates():
     """Scrape game links and their corresponding dates."""
+    count("http.requests")
     response = requests.get(SCHEDULE_URL)
     soup = BeautifulSoup(response.content, "html.parser")
 
@@ -47,6 +56,7 @@ def get_game_links_with_dates():
 
     return game_data
 
+@traced("resolve_name")
 def format_player_name(player_href):
     """Format player names correctly from scraped data and match with Firebase names."""
     name_part = player_href.split("/player/")[1].rsplit("-", 1)[0]
@@ -74,9 +84,11 @@ def format_player_name(player_href):
     # Otherwise, return the formatted name
     return formatted_name
 
+@traced("team_stats")
 async def scrape_team_stats(game_id, game_date):
     game = GAME_URL + game_id
     print(game)
+    count("http.requests")
     response = requests.get(game)
     soup = BeautifulSoup(response.content, "html.parser")
     """Scrape team-level stats from the game page."""
@@ -217,72 +229,76 @@ async def scrape_team_stats(game_id, game_date):
 
     return team_stats
 
+@traced("box_score")
 async def scrape_game_stats(session, game_url, game_id, game_date):
     """Scrape game statistics asynchronously and return DataFrame and metadata."""
-    async with session.get(game_url) as response:
-        content = await response.text()
-        soup = BeautifulSoup(content, "html.parser")
-
-        # Scrape team stats
-        team_stats = await scrape_team_stats(game_id, game_date)
-
-        # Scrape player stats (existing code)
-        teams_div = soup.find_all("div", class_="scrollbar-none")
-        team_names = [div.find("h4").text.strip() for div in teams_div if div.find("h4")]
-
-        if len(team_names) != 2:
-            print(f"Error extracting team names from {game_url}")
-            return None, None, None
-
-        home_team, away_team = team_names[0], team_names[1]
-        home_team_pts, away_team_pts = 0, 0
-
-        team_tables = [table for table in (div.find("table") for div in teams_div) if table is not None]
-        
-        if len(team_tables) == 2:
-            try:
-                home_team_pts = int(team_tables[0].find("tr", class_="weight-500").find_all("td")[-1].text.strip())
-                away_team_pts = int(team_tables[1].find("tr", class_="weight-500").find_all("td")[-1].text.strip())
-            except Exception as e:
-                print(f"Error scraping team points: {e}")
-
-        game_metadata = (game_id, game_date, home_team, away_team, home_team_pts, away_team_pts)
-
-        players_stats = []
-        tables = soup.find_all("table")
-
-        for team, table in zip(team_names, tables):
-            opponent = away_team if team == home_team else home_team
-            rows = table.find("tbody").find_all("tr")
-
-            for row in rows:
-                cols = row.find_all("td")
-                if cols[0].text.strip().upper() == "TEAM":
-                    break
-
-                player_link = cols[0].find("a")
-                if player_link and "href" in player_link.attrs:
-                    player_href = player_link["href"]
-                    player_name = format_player_name(player_href)
-                    print(player_name)
-                else:
-                    continue
+    with span("fetch", game_id=game_id):
+        count("http.requests")
+        async with session.get(game_url) as response:
+            content = await response.text()
+    soup = BeautifulSoup(content, "html.parser")
+
+    # Scrape team stats
+    team_stats = await scrape_team_stats(game_id, game_date)
+
+    # Scrape player stats (existing code)
+    teams_div = soup.find_all("div", class_="scrollbar-none")
+    team_names = [div.find("h4").text.strip() for div in teams_div if div.find("h4")]
+
+    if len(team_names) != 2:
+        print(f"Error extracting team names from {game_url}")
+        return None, None, None
+
+    home_team, away_team = team_names[0], team_names[1]
+    home_team_pts, away_team_pts = 0, 0
+
+    team_tables = [table for table in (div.find("table") for div in teams_div) if table is not None]
+
+    if len(team_tables) == 2:
+        try:
+            home_team_pts = int(team_tables[0].find("tr", class_="weight-500").find_all("td")[-1].text.strip())
+            away_team_pts = int(team_tables[1].find("tr", class_="weight-500").find_all("td")[-1].text.strip())
+        except Exception as e:
+            print(f"Error scraping team points: {e}")
+
+    game_metadata = (game_id, game_date, home_team, away_team, home_team_pts, away_team_pts)
+
+    players_stats = []
+    tables = soup.find_all("table")
+
+    for team, table in zip(team_names, tables):
+        opponent = away_team if team == home_team else home_team
+        rows = table.find("tbody").find_all("tr")
+
+        for row in rows:
+            cols = row.find_all("td")
+            if cols[0].text.strip().upper() == "TEAM":
+                break
+
+            player_link = cols[0].find("a")
+            if player_link and "href" in player_link.attrs:
+                player_href = player_link["href"]
+                player_name = format_player_name(player_href)
+                print(player_name)
+            else:
+                continue
 
-                stats = [col.text.strip() if col.text.strip() else "0" for col in cols[1:]]
+            stats = [col.text.strip() if col.text.strip() else "0" for col in cols[1:]]
 
-                if stats[0] == "DNP":
-                    stats = ["0"] * 13
+            if stats[0] == "DNP":
+                stats = ["0"] * 13
 
-                players_stats.append([game_id, game_date, team, opponent, player_name] + stats)
+            players_stats.append([game_id, game_date, team, opponent, player_name] + stats)
 
-        columns = [
-            "game_id", "game_date", "team", "opponent", "player_name",
-            "min", "fg", "three_pt", "ft", "reb", "offensive_rebounds", "defensive_rebounds", 
-            "ast", "stl", "blk", "turnovers", "pf", "pts"
-        ]
+    columns = [
+        "game_id", "game_date", "team", "opponent", "player_name",
+        "min", "fg", "three_pt", "ft", "reb", "offensive_rebounds", "defensive_rebounds", 
+        "ast", "stl", "blk", "turnovers", "pf", "pts"
+    ]
 
-        return pd.DataFrame(players_stats, columns=columns), game_metadata, team_stats
+    return pd.DataFrame(players_stats, columns=columns), game_metadata, team_stats
 
+@traced("write_team_stats")
 def insert_team_stats_into_firestore(team_stats):
     """Insert team stats into Firestore under teams/{team_name}/games/{game_id}."""
     for stat in team_stats:
@@ -304,6 +320,7 @@ def insert_team_stats_into_firestore(team_stats):
 
     print(f"✅ Inserted/Updated team stats for {len(team_stats)} records into Firestore.")
 
+@traced("write_game_metadata")
 def insert_game_metadata_into_firestore(game_metadata):
     """Insert game metadata into Firestore under games/{game_id}."""
     game_id, game_date, home_team, away_team, home_team_pts, away_team_pts = game_metadata
@@ -327,6 +344,7 @@ def insert_game_metadata_into_firestore(game_metadata):
     
     print(f"✅ Inserted/Updated game metadata for game_id: {game_id}")
 
+@traced("write_player_stats")
 def insert_game_stats_into_firestore(game_stats_df):
     """
     Insert player game stats into Firestore under players/{player_name}/games/{game_id}.
@@ -356,6 +374,10 @@ def insert_game_stats_into_firestore(game_stats_df):
         game_stats_doc = game_stats_ref.get()
 
         if game_stats_doc.exists:
+            # Older docs were written without the fields the opponent/date queries filter on
+            if not game_stats_doc.to_dict().get("opponent"):
+                game_stats_ref.set({"opponent": row["opponent"], "game_date": row["game_date"]}, merge=True)
+                print(f"✅ Backfilled opponent/game_date for player {exact_player_name} (game_id: {game_id})")
             print(f"⏩ Game stats for player {exact_player_name} (game_id: {game_id}) already exist in Firestore. Skipping...")
             continue  # Skip if the game stats already exist
 
@@ -365,43 +387,54 @@ def insert_game_stats_into_firestore(game_stats_df):
 
         # Insert the game stats into Firestore
         game_stats_ref.set(game_stats)
+        # Fold the new game into the player's running feature sums
+        apply_game_stats(db, exact_player_name, game_stats)
         print(f"✅ Inserted/Updated game stats for player {exact_player_name} (game_id: {game_id})")
 
     print(f"Inserted/Updated {len(game_stats_df)} records into Firestore.")
 
 async def scrape_and_store_game(session, game_link, game_id, game_date):
     """Scrape and store data for a single game asynchronously."""
-    # Check if the game already exists in Firestore
-    game_ref = db.collection("games").document(game_id)
-    game_doc = game_ref.get()
-
-    if game_doc.exists:
-        print(f"⏩ Game {game_id} already exists in Firestore. Skipping...")
-        return  # Skip this game if it already exists
-
-    print(f"🔄 Scraping game stats from: {game_link} (Date: {game_date})")
-    game_stats_df, game_metadata, team_stats = await scrape_game_stats(session, game_link, game_id, game_date)
-
-    if game_stats_df is not None and game_metadata is not None:
-        insert_game_metadata_into_firestore(game_metadata)
-        insert_game_stats_into_firestore(game_stats_df)
-        insert_team_stats_into_firestore(team_stats)
-
-    print(f"🎥 Scraping play-by-play for game: {game_id}")
-    play_by_play_df = pbp.scrape_play_by_play(game_id, game_date, db)
-    if play_by_play_df is not None:
-        insert_play_by_play_into_firestore(game_id, play_by_play_df)
+    with span("game", game_id=game_id, game_date=game_date):
+        # Check if the game already exists in Firestore
+        game_ref = db.collection("games").document(game_id)
+        game_doc = game_ref.get()
+
+        if game_doc.exists:
+            print(f"⏩ Game {game_id} already exists in Firestore. Skipping...")
+            return  # Skip this game if it already exists
+
+        print(f"🔄 Scraping game stats from: {game_link} (Date: {game_date})")
+        game_stats_df, game_metadata, team_stats = await scrape_game_stats(session, game_link, game_id, game_date)
+
+        if game_stats_df is not None and game_metadata is not None:
+            insert_game_metadata_into_firestore(game_metadata)
+            insert_game_stats_into_firestore(game_stats_df)
+            insert_team_stats_into_firestore(team_stats)
+
+        print(f"🎥 Scraping play-by-play for game: {game_id}")
+        with span("play_by_play", game_id=game_id):
+            play_by_play_df = pbp.scrape_play_by_play(game_id, game_date, db)
+        if play_by_play_df is not None:
+            insert_play_by_play_into_firestore(game_id, play_by_play_df)
+            with span("update_features", game_id=game_id):
+                apply_game_plays(db, game_id, play_by_play_df.to_dict("records"))
 
 async def scrape_and_store_all_games():
     """Main function to scrape and store all game data asynchronously."""
     game_data = get_game_links_with_dates()
 
-    async with aiohttp.ClientSession() as session:
-        tasks = [scrape_and_store_game(session, game_link, game_id, game_date) for game_link, game_id, game_date in game_data]
-        await asyncio.gather(*tasks)
+    with span("scrape_games", games=len(game_data)):
+        async with aiohttp.ClientSession() as session:
+            tasks = [scrape_and_store_game(session, game_link, game_id, game_date) for game_link, game_id, game_date in game_data]
+            await asyncio.gather(*tasks)
 
+        # Tell analysis runs to drop their cached game logs and play-by-play
+        mark_ingest(db, "unr_game_stats_scrape")
     print("✅ All games scraped and stored.")
+    tracer.finish()
 
+@traced("write_play_by_play")
 def insert_play_by_play_into_firestore(game_id, play_by_play_df):
     """Insert play-by-play data into Firestore with proper event_id sorting."""
     q4_index = 0  # Incremental index for Q4 events
@@ -438,4 +471,7 @@ def insert_play_by_play_into_firestore(game_id, play_by_play_df):
     print(f"✅ Uploaded {len(play_by_play_df)} play-by-play events to Firestore.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape game stats and play-by-play into Firestore.")
+    add_profile_argument(parser)
+    start_profiling(parser.parse_args(), "unr_game_stats_scrape")
     asyncio.run(scrape_and_store_all_games())
\ No newline at end of file
@@ -4,7 +4,8 @@ import pandas as pd
 import re
 import unicodedata
 from difflib import get_close_matches
-import re
+from helpers.play_events import annotate_plays
+from helpers.tracing import traced, count
 
 # Base URL for Unrivaled
 BASE_URL = "https://www.unrivaled.basketball"
@@ -21,6 +22,7 @@ def scrape_play_by_play(game_id, game_date, db):
     player_stats = {doc.id for doc in player_stats_ref}  # Use player_name as the key
 
     url = f"{BASE_URL}/game/{game_id}/play-by-play"
+    count("http.requests")
     response = requests.get(url)
     if response.status_code != 200:
         print(f"Failed to retrieve play-by-play for game {game_id}")
@@ -65,8 +67,12 @@ def scrape_play_by_play(game_id, game_date, db):
             "player": player
         })
 
-    return pd.DataFrame(plays)
+    # Parse descriptions once into typed event fields stored with each play
+    annotate_plays(plays)
+
+    return pd.DataFrame(plays, dtype=object)
 
+@traced("resolve_name")
 def extract_player_name(play_description, db):
     """
     Extract the player name from the play description.
@@ -1,3 +1,4 @@
+import argparse
 import json
 import urllib3
 import requests
@@ -7,6 +8,9 @@ from firebase_admin import credentials, firestore
 import os
 import time
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from database.instrumented import instrument_if_enabled
+from helpers.tracing import tracer, span
+from helpers.profiling import add_profile_argument, start_profiling
 
 # Suppress insecure request warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -23,6 +27,7 @@ FIRESTORE_COLLECTION = "prop_lines"  # Firestore collection name
 cred = credentials.Certificate("../../secrets/firebase_key.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client(database_id="unrivaled-db")
+db = instrument_if_enabled(db)
 
 def clear_firestore_collection(collection_name):
     """Clear all documents in a Firestore collection."""
@@ -63,7 +68,8 @@ def fetch_player_data(player_id):
 
 def main():
     # Clear the prop_lines collection before uploading new data
-    clear_firestore_collection(FIRESTORE_COLLECTION)
+    with span("clear_prop_lines"):
+        clear_firestore_collection(FIRESTORE_COLLECTION)
 
     # Load player IDs
     with open("../../data/unrivaled/player_ids.json", "r") as f:
@@ -74,6 +80,12 @@ def main():
         projections = json.load(f)
 
     # Fetch player data and merge with projections
+    with span("fetch_players", projections=len(projections["data"])):
+        fetch_and_upload_projections(projections)
+
+    print("Enriched players data for all stats uploaded to Firestore.")
+
+def fetch_and_upload_projections(projections):
     for projection in projections["data"]:
         # Extract player ID and stat type
         player_id = projection["relationships"]["new_player"]["data"]["id"]
@@ -94,7 +106,9 @@ def main():
         except Exception as e:
             print(f"Failed to process player {player_id} after retries: {e}")
 
-    print("Enriched players data for all stats uploaded to Firestore.")
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch PrizePicks player data for the slate's projections into prop_lines.")
+    add_profile_argument(parser)
+    start_profiling(parser.parse_args(), "unr_player_fetcher")
+    main()
+    tracer.finish()
\ No newline at end of file
@@ -1,10 +1,15 @@
 import requests
 import json
+import argparse
 from bs4 import BeautifulSoup
 import pandas as pd
 import firebase_admin
 from firebase_admin import credentials, firestore
-from analysis.calculate_per import calculate_per, compute_league_average_uper
+from analysis.calculate_per import update_player_uper, load_league_per, save_league_per, league_average, rebuild_league_per
+from database.cache import mark_ingest
+from database.instrumented import instrument_if_enabled
+from helpers.tracing import tracer, span
+from helpers.profiling import add_profile_argument, start_profiling
 from difflib import SequenceMatcher
 import unicodedata
 from datetime import datetime
@@ -13,6 +18,7 @@ import os
 cred = credentials.Certificate("../../secrets/firebase_key.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client(database_id="unrivaled-db")
+db = instrument_if_enabled(db)
 
 def normalize_text(text):
     return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
@@ -157,12 +163,18 @@ def scrape_player_game_stats(player_url):
 
     return games
 
-def insert_into_firestore(player_stats_df):
+def insert_into_firestore(player_stats_df, rebuild_per=False):
     players_ref = db.collection("players").stream()
     player_names = {doc.id.lower(): doc.id for doc in players_ref} 
 
-    # Compute the league-wide average UPER
-    league_average_uper = compute_league_average_uper(db)
+    # Game metadata, used to write each game doc's `opponent`
+    games = {doc.id: doc.to_dict() for doc in db.collection("games").stream()}
+
+    # League-wide UPER aggregate kept from previous runs; rebuilt from every game log only on demand
+    league = load_league_per(db)
+    if league is None or rebuild_per:
+        league = rebuild_league_per(db)
+    league_average_uper = league_average(league)
     print(f"League Average UPER: {league_average_uper}")
 
     for _, row in player_stats_df.iterrows():
@@ -178,8 +190,14 @@ def insert_into_firestore(player_stats_df):
         del player_data["name"]
         del player_data["player_url"]
 
-        # Calculate UPER and PER for the player
-        uper = calculate_per(player_name_firestore, db)
+        for game_stats in player_game_stats:
+            # `opponent` and `game_date` back the last_n_games / games_vs_opponent queries
+            game_data = games.get(game_stats["game_id"])
+            if game_data:
+                game_stats["opponent"] = game_data["away_team"] if game_data["home_team"] == player_data.get("team") else game_data["home_team"]
+
+        # Apply only games not yet in the player's running totals, then derive UPER and PER
+        uper = update_player_uper(db, player_name_firestore, player_game_stats, league)
         if uper is not None:
             per = uper * (15 / league_average_uper)
             player_data["uper"] = uper
@@ -191,16 +209,30 @@ def insert_into_firestore(player_stats_df):
 
         for game_stats in player_game_stats:
             game_id = game_stats["game_id"]
-            # Save game stats under the normalized player name
-            db.collection("players").document(player_name_firestore).collection("games").document(game_id).set(game_stats)
+            # Save game stats under the normalized player name, keeping fields written by other scrapers
+            db.collection("players").document(player_name_firestore).collection("games").document(game_id).set(game_stats, merge=True)
 
+    save_league_per(db, league)
+
+    # Tell analysis runs to drop their cached player docs and game logs
+    mark_ingest(db, "unr_player_scrape")
     print(f"Inserted/Updated {len(player_stats_df)} player records and their game stats into Firestore.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape player stats and game logs into Firestore.")
+    parser.add_argument("--rebuild-per", action="store_true",
+                        help="Recompute every player's running totals and the league UPER aggregate from scratch")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_profiling(args, "unr_player_scrape")
+
     with open("/Users/ajoyner/unrivaled_ai_sportsbet/data/unrivaled/unr_enriched_players.json", "r") as f:
         enriched_data = json.load(f)
     
-    player_stats_df = scrape_player_stats(enriched_data)
-    insert_into_firestore(player_stats_df)
+    with span("scrape_player_stats"):
+        player_stats_df = scrape_player_stats(enriched_data)
+    with span("write_players", players=len(player_stats_df)):
+        insert_into_firestore(player_stats_df, rebuild_per=args.rebuild_per)
     # player_stats_df.to_csv("data/unrivaled/csv/unrivaled_player_stats.csv", index=False)
-    print(player_stats_df)
\ No newline at end of file
+    print(player_stats_df)
+    tracer.finish()
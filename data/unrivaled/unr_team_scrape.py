@@ -1,3 +1,4 @@
+import argparse
 import requests
 import re
 import pandas as pd
@@ -5,11 +6,16 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 from bs4 import BeautifulSoup
 import os
+from database.cache import mark_ingest
+from database.instrumented import instrument_if_enabled
+from helpers.tracing import tracer, span
+from helpers.profiling import add_profile_argument, start_profiling
 
 # Initialize Firebase
 cred = credentials.Certificate("../../secrets/firebase_key.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client(database_id="unrivaled-db")
+db = instrument_if_enabled(db)
 
 # --------------------------
 # Web Scraping Functions
@@ -98,15 +104,23 @@ def insert_team_stats_into_firestore(team_stats_df):
 # --------------------------
 def scrape_and_store_team_stats():
     print("🔄 Starting team stats scrape...")
-    team_stats_df = scrape_team_stats()
+    with span("scrape_team_stats"):
+        team_stats_df = scrape_team_stats()
 
     # print("💾 Saving to CSV...")
     # team_stats_df.to_csv("data/unrivaled/csv/unrivaled_team_stats.csv", index=False)
 
     print("🚀 Updating Firestore database...")
-    insert_team_stats_into_firestore(team_stats_df)
+    with span("write_teams", teams=len(team_stats_df)):
+        insert_team_stats_into_firestore(team_stats_df)
+    # Tell analysis runs to drop their cached team docs
+    mark_ingest(db, "unr_team_scrape")
 
     print("✅ Process completed successfully!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape team stats into Firestore.")
+    add_profile_argument(parser)
+    start_profiling(parser.parse_args(), "unr_team_scrape")
     scrape_and_store_team_stats()
+    tracer.finish()